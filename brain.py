@@ -1,18 +1,25 @@
-import calendar
 import json
 import os
 import random
 import re
 from datetime import date as date_type
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import openai
 from openai import OpenAI
 
+from config import (
+    get_llm_max_concurrency,
+    get_llm_shed_queue_depth,
+    get_memory_compact_monthly_after_days,
+    get_memory_compact_weekly_after_days,
+)
 from db import get_user_profile
+from llm_admission import get_admission
 from prompts import (
+    load_compaction_prompt,
     load_dream_prompt,
     load_loop_followup_prompt,
     load_reminiscence_prompt,
@@ -20,7 +27,7 @@ from prompts import (
     load_spontaneous_prompt,
 )
 from emotional_core import EmotionalCore
-from memory_engine import MemoryEngine
+from memory_engine import LEVEL_MONTH, LEVEL_WEEK, MemoryEngine
 
 # Pattern definitions
 THINK_TAG_PATTERN = re.compile(r"<think>(.*?)</think>", re.DOTALL | re.IGNORECASE)
@@ -29,6 +36,17 @@ NEEDS_CHECK_PATTERN = re.compile(r"\[NEEDS CHECK:.*?\]", re.DOTALL | re.IGNORECA
 EOT_TOKEN_PATTERN = re.compile(r"<\|eot_id\|>", re.IGNORECASE)
 EOS_TOKEN_PATTERN = re.compile(r"</s>", re.IGNORECASE)
 
+# Spontaneous messaging rules (decide_to_message and next_eligible_check_time)
+QUIET_HOURS_START = 23
+QUIET_HOURS_END = 8
+MIN_GAP_HOURS = 4.0
+LONG_GAP_HOURS = 24.0
+
+
+def now_iso() -> str:
+    """Current time as an aware UTC ISO string, the form _parse_timestamp reads back."""
+    return datetime.now(timezone.utc).isoformat()
+
 
 class Brain:
     def __init__(
@@ -45,6 +63,12 @@ class Brain:
             api_key=api_key or os.getenv("OPENAI_API_KEY", "local-dev-key"),
             timeout=300.0,
         )
+        # Shared per backend: arbitrates interactive vs background calls.
+        self.admission = get_admission(
+            base_url,
+            max_concurrent=get_llm_max_concurrency(),
+            shed_queue_depth=get_llm_shed_queue_depth(),
+        )
         self.memory_engine = memory_engine or MemoryEngine()
         self.emotional_core = emotional_core or EmotionalCore()
         # Load prompts from files at init
@@ -57,13 +81,17 @@ class Brain:
             location = profile.get("location", "").strip()
             if not location:
                 return "Unknown location (User hasn't told me where they live yet)"
-            from tools import get_current_weather
-            weather_data = get_current_weather(location)
+            from tools import weather_service
+            weather_data = weather_service.get(location)
             return f"{weather_data} in {location}"
         except Exception:
             return "Unknown weather"
 
     def _parse_timestamp(self, value: str | None) -> Optional[datetime]:
+        """Parse a stored timestamp as an aware UTC datetime.
+
+        Naive values come from SQLite's CURRENT_TIMESTAMP, which is UTC.
+        """
         if not value:
             return None
         text = str(value).strip()
@@ -73,14 +101,14 @@ class Brain:
             if text.endswith("Z"):
                 text = text[:-1] + "+00:00"
             parsed = datetime.fromisoformat(text)
-            if parsed.tzinfo is not None:
-                parsed = parsed.astimezone().replace(tzinfo=None)
-            return parsed
+            if parsed.tzinfo is None:
+                return parsed.replace(tzinfo=timezone.utc)
+            return parsed.astimezone(timezone.utc)
         except ValueError:
             pass
         for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f"):
             try:
-                return datetime.strptime(text, fmt)
+                return datetime.strptime(text, fmt).replace(tzinfo=timezone.utc)
             except ValueError:
                 continue
         return None
@@ -121,7 +149,7 @@ class Brain:
         delivery_mode: str = "text",
         user_length_hint: str = "medium",
     ) -> List[Dict[str, str]]:
-        now = datetime.now()
+        now = datetime.now().astimezone()
         time_since_last_interaction = self._format_time_since_last_interaction(history, now)
         current_date = now.strftime("%A, %B %d, %Y").replace(" 0", " ")
         emotional_state = self.emotional_core.load()
@@ -232,13 +260,14 @@ class Brain:
         return cleaned.strip()
 
     def _chat(self, messages: List[Dict[str, str]], temperature: float = 0.8) -> str:
-        completion = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            stop=["<|im_end|>", "<|eot_id|>"],
-            temperature=temperature,
-            timeout=300.0,
-        )
+        with self.admission.slot():
+            completion = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stop=["<|im_end|>", "<|eot_id|>"],
+                temperature=temperature,
+                timeout=300.0,
+            )
         message = completion.choices[0].message
         return message.content or message.reasoning or ""
 
@@ -332,16 +361,17 @@ class Brain:
         retries = 0
         while retries < 2:
             try:
-                completion = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=0.85,
-                    presence_penalty=0.3,
-                    frequency_penalty=0.6,
-                    max_tokens=2500,
-                    stop=["<|im_end|>", "<|eot_id|>"],
-                    timeout=300.0,
-                )
+                with self.admission.slot():
+                    completion = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.85,
+                        presence_penalty=0.3,
+                        frequency_penalty=0.6,
+                        max_tokens=2500,
+                        stop=["<|im_end|>", "<|eot_id|>"],
+                        timeout=300.0,
+                    )
                 message = completion.choices[0].message
                 raw_output = message.content or message.reasoning or ""
                 print(f"[DEBUG] Pulled from reasoning: {bool(message.reasoning and not message.content)}")
@@ -468,8 +498,9 @@ class Brain:
         previous_attachment = float(previous_state.get("attachment_level", 5.0))
         updated_state = self.emotional_core.update(mood=mood, attachment_delta=attachment_delta)
         new_attachment = float(updated_state.get("attachment_level", previous_attachment))
+        loop_owner = user_id if user_id and user_id != "default" else ""
         for loop in open_loops:
-            self.emotional_core.add_loop(topic=str(loop.get("topic", "")).strip(), time_hint=str(loop.get("expected_time", "soon")).strip() or "soon")
+            self.emotional_core.add_loop(topic=str(loop.get("topic", "")).strip(), time_hint=str(loop.get("expected_time", "soon")).strip() or "soon", user_id=loop_owner)
         if int(new_attachment) > int(previous_attachment) and user_id and user_id != "default":
             relationship_messages = [
                 {"role": "system", "content": f"Our attachment level just reached {int(new_attachment)}. Define our relationship status in 1 sentence based on our history. Return plain text only."},
@@ -485,34 +516,64 @@ class Brain:
                 pass
         return diary_entry
 
-    def _is_loop_due_or_close(self, expected_time: str) -> bool:
-        hint = (expected_time or "").strip().lower()
-        if not hint:
-            return False
-        immediate_tokens = ("today", "tonight", "this evening", "this afternoon", "this morning", "now", "soon", "in an hour", "later today", "tomorrow", "tmr")
-        if any(token in hint for token in immediate_tokens):
-            return True
-        weekday_map = {day.lower(): idx for idx, day in enumerate(calendar.day_name)}
-        weekday_map.update({day.lower()[:3]: idx for idx, day in enumerate(calendar.day_name)})
-        for token, day_idx in weekday_map.items():
-            if token in hint:
-                now = datetime.now()
-                delta = (day_idx - now.weekday()) % 7
-                return delta <= 1
-        return False
-
-    def get_due_open_loop(self) -> Optional[Dict[str, str]]:
-        loops = self.emotional_core.get_pending_loops()
-        for loop in loops:
-            if self._is_loop_due_or_close(str(loop.get("expected_time", ""))):
-                return loop
-        return None
+    def summarize_journals(self, entries: List[str], period: str) -> str:
+        """Condense several diary entries into one, with the Compaction.md prompt."""
+        if not entries:
+            return ""
+        prompt = load_compaction_prompt().format(period=period)
+        messages = [{"role": "system", "content": prompt}, {"role": "user", "content": "\n\n".join(entries)}]
+        return self._clean_model_output(self._chat(messages=messages, temperature=0.4).strip())
 
-    def decide_to_message(self, last_interaction_time: datetime | str | None, attachment_level: float) -> bool:
-        if self.get_due_open_loop():
+    def compact_journals(self, user_id: str, today: date_type | None = None) -> Dict[str, int]:
+        """Roll a user's old daily journals into weekly, then monthly, summaries.
+
+        Journals from weeks (cut at month ends) that ended over
+        MEMORY_COMPACT_WEEKLY_AFTER_DAYS ago become one weekly entry each. Everything from months that ended over
+        MEMORY_COMPACT_MONTHLY_AFTER_DAYS ago becomes one monthly entry. The
+        originals move to the memory engine's cold journal_archive.
+        """
+        today = today or datetime.now().date()
+        stats = {LEVEL_WEEK: 0, LEVEL_MONTH: 0, "archived": 0}
+        for level, after_days in (
+            (LEVEL_WEEK, get_memory_compact_weekly_after_days()),
+            (LEVEL_MONTH, get_memory_compact_monthly_after_days()),
+        ):
+            if after_days <= 0:
+                continue
+            cutoff = today - timedelta(days=after_days)
+            for group in self.memory_engine.compaction_groups(user_id, level, cutoff):
+                if level == LEVEL_WEEK:
+                    period = f"the week of {group['start'].isoformat()} to {group['end'].isoformat()}"
+                else:
+                    period = group["start"].strftime("%B %Y")
+                entries = [
+                    f"[{metadata.get('date', '')}] {document}"
+                    for document, metadata in zip(group["documents"], group["metadatas"])
+                ]
+                summary = self.summarize_journals(entries, period)
+                if not summary:
+                    continue
+                stats["archived"] += self.memory_engine.store_rollup(user_id, level, group, summary)
+                stats[level] += 1
+        return stats
+
+    def get_due_open_loop(self, user_id: str | None = None) -> Optional[Dict[str, str]]:
+        """Earliest pending loop whose parsed due time has passed (optionally for one user)."""
+        due = self.emotional_core.get_due_loops(user_id=user_id)
+        return due[0] if due else None
+
+    def decide_to_message(
+        self,
+        last_interaction_time: datetime | str | None,
+        attachment_level: float,
+        now: datetime | None = None,
+        user_id: str | None = None,
+    ) -> bool:
+        """Whether to send a check-in now. ``now`` and ``last_interaction_time`` must be aware."""
+        if self.get_due_open_loop(user_id=user_id):
             return True
-        now = datetime.now()
-        if now.hour >= 23 or now.hour < 8:
+        now = now or datetime.now().astimezone()
+        if now.hour >= QUIET_HOURS_START or now.hour < QUIET_HOURS_END:
             return False
         last_time: Optional[datetime] = None
         if isinstance(last_interaction_time, datetime):
@@ -522,14 +583,30 @@ class Brain:
         if last_time is None:
             return False
         gap_hours = max((now - last_time).total_seconds(), 0.0) / 3600.0
-        if gap_hours < 4:
+        if gap_hours < MIN_GAP_HOURS:
             return False
         probability = 0.05 + (float(attachment_level) * 0.02)
-        if gap_hours > 24:
+        if gap_hours > LONG_GAP_HOURS:
             probability += 0.20
         probability = max(0.0, min(0.95, probability))
         return random.random() < probability
 
+    def next_eligible_check_time(
+        self,
+        last_interaction_time: datetime | None,
+        now: datetime | None = None,
+    ) -> datetime:
+        """Earliest time decide_to_message could say yes: past the minimum gap and outside quiet hours."""
+        now = now or datetime.now()
+        candidate = now
+        if last_interaction_time is not None:
+            candidate = max(candidate, last_interaction_time + timedelta(hours=MIN_GAP_HOURS))
+        if candidate.hour >= QUIET_HOURS_START:
+            candidate = (candidate + timedelta(days=1)).replace(hour=QUIET_HOURS_END, minute=0, second=0, microsecond=0)
+        elif candidate.hour < QUIET_HOURS_END:
+            candidate = candidate.replace(hour=QUIET_HOURS_END, minute=0, second=0, microsecond=0)
+        return candidate
+
     def generate_loop_followup(self, topic: str, expected_time: str = "soon") -> str:
         # Use loop followup prompt from file
         prompt_template = load_loop_followup_prompt()
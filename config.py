@@ -136,6 +136,278 @@ def get_allowed_user_id() -> str:
     return get_config("ALLOWED_USER_ID", "")
 
 
+def get_telegram_update_mode() -> str:
+    """Get how the bot receives updates: 'polling' (default) or 'webhook'."""
+    return get_config("TELEGRAM_UPDATE_MODE", "polling").strip().lower() or "polling"
+
+
+def get_telegram_api_base_url() -> str:
+    """Get the Telegram Bot API base URL (override to point at a local/fake server)."""
+    return get_config("TELEGRAM_API_BASE_URL", "")
+
+
+def get_webhook_public_url() -> str:
+    """Get the public HTTPS URL Telegram should POST updates to (without the bot path)."""
+    return get_config("TELEGRAM_WEBHOOK_URL", "")
+
+
+def get_webhook_listen_host() -> str:
+    """Get the local interface the webhook server binds to."""
+    return get_config("TELEGRAM_WEBHOOK_HOST", "127.0.0.1")
+
+
+def get_webhook_listen_port() -> int:
+    """Get the local port the webhook server binds to."""
+    return int(get_config("TELEGRAM_WEBHOOK_PORT", "8443"))
+
+
+def get_webhook_secret() -> str:
+    """Get the secret token Telegram echoes in X-Telegram-Bot-Api-Secret-Token."""
+    return get_config("TELEGRAM_WEBHOOK_SECRET", "")
+
+
+def get_webhook_max_connections() -> int:
+    """Get the max simultaneous webhook connections (Telegram side and local server)."""
+    return int(get_config("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", "40"))
+
+
+def get_concurrent_updates() -> int:
+    """Get how many Telegram updates the Application may process at once (1 = sequential)."""
+    return max(1, int(get_config("TELEGRAM_CONCURRENT_UPDATES", "1")))
+
+
+def get_background_workers() -> int:
+    """Get how many background jobs (dream cycles) may run at once."""
+    return max(1, int(get_config("BACKGROUND_WORKERS", "1")))
+
+
+def get_weather_ttl_minutes() -> float:
+    """Get how long a fetched weather report is served from cache."""
+    return float(get_config("WEATHER_TTL_MINUTES", "20"))
+
+
+def get_weather_refresh_minutes() -> float:
+    """Get how often cached weather for known locations is refreshed in the background."""
+    return float(get_config("WEATHER_REFRESH_MINUTES", "15"))
+
+
+def get_spontaneity_concurrency() -> int:
+    """Get how many users the spontaneity job evaluates at once."""
+    return max(1, int(get_config("SPONTANEITY_CONCURRENCY", "4")))
+
+
+def get_spontaneity_user_timeout() -> float:
+    """Get the per-user time budget (seconds) for one spontaneity evaluation."""
+    return float(get_config("SPONTANEITY_USER_TIMEOUT_SECONDS", "180"))
+
+
+def get_spontaneity_recheck_minutes() -> float:
+    """Get how long to wait before re-rolling a user who was eligible but not messaged."""
+    return float(get_config("SPONTANEITY_RECHECK_MINUTES", "60"))
+
+
+def get_reminder_arm_horizon_hours() -> float:
+    """Get how far ahead one-off reminders are loaded into the scheduler."""
+    return max(1.0, float(get_config("REMINDER_ARM_HORIZON_HOURS", "6")))
+
+
+def get_scheduler_timezone() -> str:
+    """Get the scheduler's time zone (used for cron jobs like the 4 AM dream cycle)."""
+    return get_config("SCHEDULER_TIMEZONE", "America/Los_Angeles")
+
+
+def get_consolidation_window_minutes() -> float:
+    """Get the window after 4 AM over which nightly dream cycles are spread."""
+    return float(get_config("CONSOLIDATION_WINDOW_MINUTES", "120"))
+
+
+def get_consolidation_concurrency() -> int:
+    """Get how many nightly dream cycles may run at once."""
+    return max(1, int(get_config("CONSOLIDATION_CONCURRENCY", "2")))
+
+
+def get_consolidation_jitter() -> float:
+    """Get the random jitter (fraction of each user's slot) added to nightly start times."""
+    return max(0.0, min(1.0, float(get_config("CONSOLIDATION_JITTER", "0.5"))))
+
+
+def get_llm_max_concurrency() -> int:
+    """Get how many LLM requests may run at once against one backend."""
+    return max(1, int(get_config("LLM_MAX_CONCURRENCY", "2")))
+
+
+def get_llm_shed_queue_depth() -> int:
+    """Get the LLM queue depth at which optional work (spontaneity) is dropped."""
+    return max(0, int(get_config("LLM_SHED_QUEUE_DEPTH", "4")))
+
+
+def get_embedding_model() -> str:
+    """Get the sentence-transformers model used for memory embeddings."""
+    return get_config("EMBEDDING_MODEL", "nomic-ai/nomic-embed-text-v1.5")
+
+
+EMBEDDING_BACKENDS = ("sentence-transformers", "torch-int8", "onnx")
+
+
+def get_embedding_backend() -> str:
+    """Get the embedding backend: sentence-transformers, torch-int8 or onnx."""
+    backend = get_config("EMBEDDING_BACKEND", "sentence-transformers").strip().lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Use one of: {', '.join(EMBEDDING_BACKENDS)}")
+    return backend
+
+
+def get_embedding_threads() -> int:
+    """Get the CPU threads used for embedding (0 = library default)."""
+    return max(0, int(get_config("EMBEDDING_THREADS", "0")))
+
+
+def get_embedding_onnx_file() -> str:
+    """Get the ONNX file (in the model's HF repo) used by the onnx backend."""
+    return get_config("EMBEDDING_ONNX_FILE", "onnx/model_quantized.onnx")
+
+
+def get_embedding_dim() -> int:
+    """Get the Matryoshka embedding width (0 = full; nomic v1.5 supports 512/256/128/64)."""
+    return max(0, int(get_config("EMBEDDING_DIM", "0")))
+
+
+def get_embedding_batch_size() -> int:
+    """Get how many texts MemoryEngine embeds per model call on bulk writes."""
+    return max(1, int(get_config("EMBEDDING_BATCH_SIZE", "32")))
+
+
+def get_embedding_cache_enabled() -> bool:
+    """Check if embeddings are cached by content hash (memory LRU + SQLite)."""
+    return get_config("EMBEDDING_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+
+
+def get_embedding_cache_memory_items() -> int:
+    """Get how many embeddings the in-memory LRU holds."""
+    return max(0, int(get_config("EMBEDDING_CACHE_MEMORY_ITEMS", "2048")))
+
+
+def get_embedding_cache_max_mb() -> float:
+    """Get the on-disk embedding cache size budget in MB."""
+    return max(1.0, float(get_config("EMBEDDING_CACHE_MAX_MB", "256")))
+
+
+def get_embedding_service_url() -> str:
+    """Get the shared embedding service URL (empty = embed in-process)."""
+    return get_config("EMBEDDING_SERVICE_URL", "").strip()
+
+
+def get_embedding_service_timeout() -> float:
+    """Get the timeout in seconds for one embedding service request."""
+    return max(0.5, float(get_config("EMBEDDING_SERVICE_TIMEOUT", "10")))
+
+
+def get_embedding_service_max_batch() -> int:
+    """Get the most texts the embedding service encodes in one model call."""
+    return max(1, int(get_config("EMBEDDING_SERVICE_MAX_BATCH", "64")))
+
+
+def get_embedding_service_batch_wait_ms() -> float:
+    """Get how long the embedding service waits to gather requests into one batch."""
+    return max(0.0, float(get_config("EMBEDDING_SERVICE_BATCH_WAIT_MS", "5")))
+
+
+def get_memory_retrieval_mode() -> str:
+    """Get how memories are stored/queried: 'unified' (one collection) or 'split'."""
+    mode = get_config("MEMORY_RETRIEVAL_MODE", "unified").strip().lower()
+    return mode if mode in ("unified", "split") else "unified"
+
+
+def get_memory_hybrid_search() -> bool:
+    """Check if memory retrieval fuses BM25 keyword hits with vector hits."""
+    return get_config("MEMORY_HYBRID_SEARCH", "true").lower() in ("true", "1", "yes")
+
+
+def get_memory_rrf_k() -> int:
+    """Get the reciprocal-rank-fusion constant (higher = flatter rank weighting)."""
+    return max(1, int(get_config("MEMORY_RRF_K", "60")))
+
+
+def get_memory_dedup_threshold() -> float:
+    """Get the cosine similarity at which a new fact counts as already stored (0 = off)."""
+    return max(0.0, min(1.0, float(get_config("MEMORY_DEDUP_THRESHOLD", "0.92"))))
+
+
+def get_memory_rerank() -> bool:
+    """Check if retrieved memories are reranked for recency and diversity (MMR)."""
+    return get_config("MEMORY_RERANK", "true").lower() in ("true", "1", "yes")
+
+
+def get_memory_rerank_overfetch() -> int:
+    """Get how many candidates per returned memory are fetched before reranking."""
+    return max(1, int(get_config("MEMORY_RERANK_OVERFETCH", "4")))
+
+
+def get_memory_recency_half_life_days() -> float:
+    """Get the age in days at which a memory's recency weight halves (0 = no decay)."""
+    return max(0.0, float(get_config("MEMORY_RECENCY_HALF_LIFE_DAYS", "45")))
+
+
+def get_memory_recency_floor() -> float:
+    """Get the minimum recency weight kept by very old memories."""
+    return max(0.0, min(1.0, float(get_config("MEMORY_RECENCY_FLOOR", "0.3"))))
+
+
+def get_memory_mmr_lambda() -> float:
+    """Get the MMR trade-off: 1.0 = relevance only, lower = more diverse."""
+    return max(0.0, min(1.0, float(get_config("MEMORY_MMR_LAMBDA", "0.7"))))
+
+
+def get_memory_result_cache_size() -> int:
+    """Get how many retrieval results are cached across users (0 = off)."""
+    return max(0, int(get_config("MEMORY_RESULT_CACHE_SIZE", "256")))
+
+
+def get_memory_result_cache_ttl_seconds() -> float:
+    """Get how long a cached retrieval result may be reused."""
+    return max(0.0, float(get_config("MEMORY_RESULT_CACHE_TTL_SECONDS", "300")))
+
+
+def get_memory_result_cache_similarity() -> float:
+    """Get the query-embedding cosine at which a cached result is reused (0 = exact text only)."""
+    return max(0.0, min(1.0, float(get_config("MEMORY_RESULT_CACHE_SIMILARITY", "0.97"))))
+
+
+def get_memory_compaction_enabled() -> bool:
+    """Check if old daily journals are rolled up into weekly and monthly summaries."""
+    return get_config("MEMORY_COMPACTION_ENABLED", "true").lower() in ("true", "1", "yes")
+
+
+def get_memory_compact_weekly_after_days() -> int:
+    """Get the age in days after which daily journals are rolled into weekly summaries (0 = never)."""
+    return max(0, int(get_config("MEMORY_COMPACT_WEEKLY_AFTER_DAYS", "30")))
+
+
+def get_memory_compact_monthly_after_days() -> int:
+    """Get the age in days after which journals are rolled into monthly summaries (0 = never)."""
+    return max(0, int(get_config("MEMORY_COMPACT_MONTHLY_AFTER_DAYS", "180")))
+
+
+def get_vector_store() -> str:
+    """Get the vector store behind MemoryEngine: chroma or npy."""
+    return get_config("VECTOR_STORE", "chroma").strip().lower()
+
+
+def get_memory_workers() -> int:
+    """Get the number of threads dedicated to memory embedding and search."""
+    return max(1, int(get_config("MEMORY_WORKERS", "2")))
+
+
+def get_memory_batch_wait_ms() -> float:
+    """Get how long a retrieval waits for others to share its embedding batch."""
+    return max(0.0, float(get_config("MEMORY_BATCH_WAIT_MS", "5")))
+
+
+def get_memory_max_batch() -> int:
+    """Get the max retrievals embedded together in one batch."""
+    return max(1, int(get_config("MEMORY_MAX_BATCH", "16")))
+
+
 def get_senses_base_url() -> str:
     """Get the senses service base URL."""
     return get_config("SENSES_BASE_URL", "http://localhost:8081")
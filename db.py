@@ -74,6 +74,7 @@ def init_db() -> None:
                 day_summary TEXT NOT NULL DEFAULT '',
                 location TEXT NOT NULL DEFAULT '',
                 relationship_status TEXT NOT NULL DEFAULT 'We are getting to know each other.',
+                timezone TEXT NOT NULL DEFAULT '',
                 updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
             )
             """
@@ -101,6 +102,26 @@ def init_db() -> None:
             )
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_activity (
+                user_id TEXT PRIMARY KEY,
+                last_interaction_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_logs_user_created ON chat_logs (user_id, created_at)"
+        )
+        has_activity = conn.execute("SELECT 1 FROM user_activity LIMIT 1").fetchone()
+        if not has_activity:
+            # One-off backfill for databases created before user_activity existed.
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO user_activity (user_id, last_interaction_at)
+                SELECT user_id, MAX(created_at) FROM chat_logs GROUP BY user_id
+                """
+            )
         columns = {
             row["name"]
             for row in conn.execute("PRAGMA table_info(user_profiles)").fetchall()
@@ -113,6 +134,27 @@ def init_db() -> None:
             conn.execute(
                 "ALTER TABLE user_profiles ADD COLUMN relationship_status TEXT NOT NULL DEFAULT 'We are getting to know each other.'"
             )
+        if "timezone" not in columns:
+            conn.execute(
+                "ALTER TABLE user_profiles ADD COLUMN timezone TEXT NOT NULL DEFAULT ''"
+            )
+        reminder_columns = {
+            row["name"]
+            for row in conn.execute("PRAGMA table_info(reminders)").fetchall()
+        }
+        if "chat_id" not in reminder_columns:
+            conn.execute("ALTER TABLE reminders ADD COLUMN chat_id INTEGER")
+        if "recurrence" not in reminder_columns:
+            conn.execute("ALTER TABLE reminders ADD COLUMN recurrence TEXT")
+        if "bot_name" not in reminder_columns:
+            conn.execute("ALTER TABLE reminders ADD COLUMN bot_name TEXT NOT NULL DEFAULT ''")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reminders_user_status_time ON reminders (user_id, status, trigger_time)"
+        )
+        conn.execute("DROP INDEX IF EXISTS idx_reminders_status_bot")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reminders_status_bot_time ON reminders (status, bot_name, trigger_time)"
+        )
         conn.commit()
 
     seed_personas()
@@ -280,6 +322,15 @@ def log_chat(user_id: str, role: str, content: str) -> None:
             "INSERT INTO chat_logs (user_id, role, content) VALUES (?, ?, ?)",
             (user_id, role, content),
         )
+        conn.execute(
+            """
+            INSERT INTO user_activity (user_id, last_interaction_at)
+            VALUES (?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                last_interaction_at = excluded.last_interaction_at
+            """,
+            (user_id,),
+        )
         conn.commit()
 
 
@@ -319,14 +370,139 @@ def get_chat_logs_for_day(user_id: str, day_iso: str) -> List[Dict[str, str]]:
 
 def list_users_with_logs() -> List[str]:
     with get_connection() as conn:
-        rows = conn.execute("SELECT DISTINCT user_id FROM chat_logs").fetchall()
+        rows = conn.execute("SELECT user_id FROM user_activity").fetchall()
     return [row["user_id"] for row in rows]
 
 
+def get_user_last_activity() -> Dict[str, str]:
+    """Map every user with chat logs to their latest chat_logs created_at.
+
+    Reads the user_activity table that log_chat keeps current, so this is
+    O(users) instead of a scan over chat_logs.
+    """
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT user_id, last_interaction_at FROM user_activity"
+        ).fetchall()
+    return {row["user_id"]: row["last_interaction_at"] for row in rows}
+
+
+REMINDER_COLUMNS = "id, user_id, chat_id, bot_name, reminder_text, trigger_time, recurrence, job_id, status, created_at"
+
+
+def add_reminder(
+    user_id: str,
+    chat_id: int,
+    reminder_text: str,
+    trigger_time: str,
+    recurrence: Optional[str] = None,
+    bot_name: str = "",
+) -> Dict[str, Any]:
+    """Insert a scheduled reminder and return the stored row (job_id = reminder:<id>)."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            """
+            INSERT INTO reminders (user_id, chat_id, bot_name, reminder_text, trigger_time, recurrence, status)
+            VALUES (?, ?, ?, ?, ?, ?, 'scheduled')
+            """,
+            (user_id, chat_id, bot_name, reminder_text, trigger_time, recurrence),
+        )
+        reminder_id = cursor.lastrowid
+        conn.execute(
+            "UPDATE reminders SET job_id = ? WHERE id = ?",
+            (f"reminder:{reminder_id}", reminder_id),
+        )
+        conn.commit()
+        row = conn.execute(
+            f"SELECT {REMINDER_COLUMNS} FROM reminders WHERE id = ?", (reminder_id,)
+        ).fetchone()
+    return dict(row)
+
+
+def get_reminder(reminder_id: int) -> Optional[Dict[str, Any]]:
+    with get_connection() as conn:
+        row = conn.execute(
+            f"SELECT {REMINDER_COLUMNS} FROM reminders WHERE id = ?", (reminder_id,)
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def list_reminders(user_id: str, status: str = "scheduled") -> List[Dict[str, Any]]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {REMINDER_COLUMNS}
+            FROM reminders
+            WHERE user_id = ? AND status = ?
+            ORDER BY trigger_time ASC
+            """,
+            (user_id, status),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_scheduled_reminders(
+    bot_name: Optional[str] = None,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Reminders still to fire (optionally for one bot), in trigger order.
+
+    ``after``/``before`` bound one-off trigger times (ISO strings, exclusive
+    and inclusive); daily reminders are returned only when ``after`` is unset.
+    """
+    query = f"SELECT {REMINDER_COLUMNS} FROM reminders WHERE status = 'scheduled'"
+    params: tuple = ()
+    if bot_name is not None:
+        query += " AND bot_name = ?"
+        params += (bot_name,)
+    if after is not None:
+        query += " AND COALESCE(recurrence, '') = '' AND trigger_time > ?"
+        params += (after,)
+    if before is not None:
+        query += " AND (COALESCE(recurrence, '') != '' OR trigger_time <= ?)"
+        params += (before,)
+    with get_connection() as conn:
+        rows = conn.execute(query + " ORDER BY trigger_time ASC", params).fetchall()
+    return [dict(row) for row in rows]
+
+
+def update_reminder(
+    reminder_id: int,
+    status: Optional[str] = None,
+    trigger_time: Optional[str] = None,
+) -> None:
+    with get_connection() as conn:
+        conn.execute(
+            """
+            UPDATE reminders
+            SET status = COALESCE(?, status),
+                trigger_time = COALESCE(?, trigger_time)
+            WHERE id = ?
+            """,
+            (status, trigger_time, reminder_id),
+        )
+        conn.commit()
+
+
+def cancel_reminder(user_id: str, reminder_id: int) -> bool:
+    """Cancel one of the user's scheduled reminders. Returns False if none matched."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            """
+            UPDATE reminders SET status = 'cancelled'
+            WHERE id = ? AND user_id = ? AND status = 'scheduled'
+            """,
+            (reminder_id, user_id),
+        )
+        conn.commit()
+    return cursor.rowcount > 0
+
+
 def get_user_profile(user_id: str) -> Dict[str, str]:
     with get_connection() as conn:
         row = conn.execute(
-            "SELECT bot_name, user_name, summary, emotional_notes, day_summary, location, relationship_status FROM user_profiles WHERE user_id = ?",
+            "SELECT bot_name, user_name, summary, emotional_notes, day_summary, location, relationship_status, timezone FROM user_profiles WHERE user_id = ?",
             (user_id,),
         ).fetchone()
 
@@ -339,6 +515,7 @@ def get_user_profile(user_id: str) -> Dict[str, str]:
             "day_summary": "",
             "location": "",
             "relationship_status": "We are getting to know each other.",
+            "timezone": "",
         }
     return dict(row)
 
@@ -398,6 +575,18 @@ def update_user_location(user_id: str, location: str) -> None:
     upsert_user_profile(user_id=user_id, location=location)
 
 
+def update_user_timezone(user_id: str, timezone: str) -> None:
+    """Set the user's IANA time zone (empty = server local time)."""
+    now = datetime.utcnow().isoformat()
+    with get_connection() as conn:
+        conn.execute("INSERT OR IGNORE INTO user_profiles (user_id) VALUES (?)", (user_id,))
+        conn.execute(
+            "UPDATE user_profiles SET timezone = ?, updated_at = ? WHERE user_id = ?",
+            (timezone, now, user_id),
+        )
+        conn.commit()
+
+
 def clear_user_names(user_id: str) -> None:
     """Clear bot_name and user_name so bot will ask for names again."""
     upsert_user_profile(user_id=user_id, bot_name="", user_name="")
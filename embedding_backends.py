@@ -0,0 +1,277 @@
+"""Pluggable embedding backends for MemoryEngine and embedding_service.
+
+Every backend runs the same model and returns L2-normalized float32 rows, so
+existing collections can be queried with any of them; the benchmark reports
+how closely a backend's neighbours match the fp32 reference.
+
+- ``sentence-transformers``: fp32 torch, the default.
+- ``torch-int8``: the same model with its Linear layers dynamically quantized
+  to int8. Runs faster on CPU-only hosts.
+- ``onnx``: ONNX Runtime on the model's published ONNX export (the quantized
+  one by default). Needs ``pip install onnxruntime``.
+
+Compare backends on this machine with:
+
+    python embedding_backends.py --benchmark
+"""
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from config import (
+    EMBEDDING_BACKENDS,
+    get_embedding_backend,
+    get_embedding_model,
+    get_embedding_onnx_file,
+    get_embedding_threads,
+)
+
+
+BACKEND_NAMES = EMBEDDING_BACKENDS
+DEFAULT_BACKEND = "sentence-transformers"
+
+
+def _set_torch_threads(threads: int) -> None:
+    if threads > 0:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+class EmbeddingBackend(ABC):
+    name = ""
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """L2-normalized float32 rows, one per text."""
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    name = "sentence-transformers"
+
+    def __init__(self, model_id: str, threads: int = 0) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        _set_torch_threads(threads)
+        self.model = SentenceTransformer(model_id, trust_remote_code=True)
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(
+            list(texts),
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
+
+
+class TorchInt8Backend(SentenceTransformerBackend):
+    name = "torch-int8"
+
+    def __init__(self, model_id: str, threads: int = 0) -> None:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        _set_torch_threads(threads)
+        model = SentenceTransformer(model_id, trust_remote_code=True, device="cpu")
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend(EmbeddingBackend):
+    name = "onnx"
+
+    def __init__(self, model_id: str, threads: int = 0, onnx_file: str = "onnx/model_quantized.onnx") -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("EMBEDDING_BACKEND=onnx needs onnxruntime. Run: pip install onnxruntime")
+        from huggingface_hub import hf_hub_download
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            hf_hub_download(model_id, onnx_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {item.name for item in self.session.get_inputs()}
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        rows: List[np.ndarray] = []
+        for start in range(0, len(texts), batch_size):
+            batch = list(texts[start : start + batch_size])
+            tokens = self.tokenizer(batch, padding=True, truncation=True, max_length=8192, return_tensors="np")
+            feed = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+            if "token_type_ids" in self.input_names and "token_type_ids" not in feed:
+                feed["token_type_ids"] = np.zeros_like(tokens["input_ids"], dtype=np.int64)
+            hidden = self.session.run(None, feed)[0]
+            # Mean pooling over real tokens, as in the model's sentence-transformers config.
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            rows.append(pooled)
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32)
+        matrix = np.concatenate(rows).astype(np.float32)
+        return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+def truncate_embeddings(matrix: np.ndarray, dim: int) -> np.ndarray:
+    """Matryoshka truncation as in the nomic v1.5 model card.
+
+    Layer-norm each full vector, keep the first ``dim`` values and L2
+    re-normalize. Returns ``matrix`` unchanged when ``dim`` is 0 or not smaller.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if not dim or matrix.ndim != 2 or dim >= matrix.shape[1]:
+        return matrix
+    centered = matrix - matrix.mean(axis=1, keepdims=True)
+    normed = centered / np.clip(centered.std(axis=1, keepdims=True), 1e-12, None)
+    cut = normed[:, :dim]
+    return cut / np.clip(np.linalg.norm(cut, axis=1, keepdims=True), 1e-12, None)
+
+
+def load_backend(name: str | None = None, model_id: str | None = None, threads: int | None = None) -> EmbeddingBackend:
+    """Build the configured backend (EMBEDDING_BACKEND, EMBEDDING_MODEL, EMBEDDING_THREADS)."""
+    name = (name or get_embedding_backend()).strip().lower()
+    if name not in BACKEND_NAMES:
+        raise ValueError(f"Unknown embedding backend '{name}'. Use one of: {', '.join(BACKEND_NAMES)}")
+    model_id = model_id or get_embedding_model()
+    threads = get_embedding_threads() if threads is None else threads
+
+    started = time.perf_counter()
+    if name == "torch-int8":
+        backend: EmbeddingBackend = TorchInt8Backend(model_id, threads=threads)
+    elif name == "onnx":
+        backend = OnnxBackend(model_id, threads=threads, onnx_file=get_embedding_onnx_file())
+    else:
+        backend = SentenceTransformerBackend(model_id, threads=threads)
+    print(f"[Embeddings] Loaded {backend.name} backend for {model_id} in {time.perf_counter() - started:.1f}s")
+    return backend
+
+
+SAMPLE_TEXTS = [
+    "We talked about my sister's wedding next month and how nervous I am about the speech.",
+    "I started running again, three miles before work on Tuesday.",
+    "My cat Miso knocked the plant off the windowsill again.",
+    "Work has been stressful since the reorg; my new manager micromanages everything.",
+    "I want to learn Spanish before the trip to Mexico City in the spring.",
+    "Had a long call with mom about dad's surgery, it went well.",
+    "Finished the first draft of my thesis chapter on coral reef bleaching.",
+    "I hate mornings, coffee is the only thing that gets me going.",
+    "Booked the dentist for Friday at 3pm, dreading it.",
+    "We adopted a rescue dog named Pickle, she's a terrier mix.",
+    "I'm trying to cut back on sugar and cook at home more.",
+    "Band practice went great, we finally nailed the bridge of the new song.",
+    "Feeling lonely since Sam moved to Seattle.",
+    "Got promoted to senior engineer today!",
+    "My goal this year is to read 30 books; I'm on number 12.",
+    "The landlord still hasn't fixed the heating and it's freezing.",
+]
+SAMPLE_QUERIES = [
+    "how is the wedding speech going",
+    "any news about your pet",
+    "how's your job",
+    "did you go running",
+    "are you still learning a language",
+    "how is your family doing",
+    "what are you reading",
+    "how's the apartment",
+]
+
+
+def _recall_at_k(reference: np.ndarray, candidate: np.ndarray, corpus_ref: np.ndarray, corpus_cand: np.ndarray, k: int) -> float:
+    k = min(k, corpus_ref.shape[0])
+    ref_top = np.argsort(-(reference @ corpus_ref.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(candidate @ corpus_cand.T), axis=1)[:, :k]
+    overlaps = [len(set(a) & set(b)) / k for a, b in zip(ref_top.tolist(), cand_top.tolist())]
+    return float(np.mean(overlaps)) if overlaps else 0.0
+
+
+def benchmark(names: Sequence[str], texts: Sequence[str], queries: Sequence[str], k: int = 5, threads: int | None = None) -> List[Dict[str, object]]:
+    """Latency, throughput and recall@k (vs the first backend) for each backend."""
+    results: List[Dict[str, object]] = []
+    reference: Dict[str, np.ndarray] = {}
+    for name in names:
+        backend = load_backend(name, threads=threads)
+        backend.encode(["warm up"])
+
+        started = time.perf_counter()
+        corpus = backend.encode(texts)
+        corpus_seconds = time.perf_counter() - started
+
+        latencies = []
+        query_rows = []
+        for query in queries:
+            started = time.perf_counter()
+            query_rows.append(backend.encode([query])[0])
+            latencies.append((time.perf_counter() - started) * 1000)
+        query_matrix = np.vstack(query_rows)
+
+        row: Dict[str, object] = {
+            "backend": name,
+            "query_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "query_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+            "corpus_emb_per_sec": round(len(texts) / corpus_seconds, 1) if corpus_seconds else 0.0,
+        }
+        if not reference:
+            reference = {"corpus": corpus, "queries": query_matrix}
+            row["recall_at_k"] = 1.0
+            row["mean_cosine"] = 1.0
+        else:
+            row["recall_at_k"] = round(
+                _recall_at_k(reference["queries"], query_matrix, reference["corpus"], corpus, k), 3
+            )
+            row["mean_cosine"] = round(float(np.mean(np.sum(reference["corpus"] * corpus, axis=1))), 4)
+        results.append(row)
+        del backend
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embedding backend tools")
+    parser.add_argument("--benchmark", action="store_true", help="Compare backends on latency and recall")
+    parser.add_argument(
+        "--backends",
+        default=",".join(BACKEND_NAMES),
+        help="Comma-separated backends; the first is the recall reference",
+    )
+    parser.add_argument("--from-memory", action="store_true", help="Use stored memories as the corpus")
+    parser.add_argument("--limit", type=int, default=500, help="Max stored memories to use")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=None, help="Override EMBEDDING_THREADS")
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        raise SystemExit(0)
+
+    texts: List[str] = list(SAMPLE_TEXTS)
+    queries: List[str] = list(SAMPLE_QUERIES)
+    if args.from_memory:
+        from memory_engine import MemoryEngine
+        from vector_store import StoreInUseError
+
+        engine = MemoryEngine()
+        try:
+            collection = engine.memories if engine.unified else engine.facts_and_goals
+        except StoreInUseError as e:
+            raise SystemExit(f"[Embeddings] {e}")
+        stored = [str(doc) for doc in (collection.get(limit=args.limit).get("documents") or []) if str(doc).strip()]
+        if len(stored) > args.k:
+            texts = stored
+            # Use the start of each memory as a short query against the rest.
+            queries = [doc[:60] for doc in stored[:: max(1, len(stored) // 50)]]
+
+    names = [name.strip() for name in args.backends.split(",") if name.strip()]
+    print(f"Corpus: {len(texts)} texts, {len(queries)} queries, recall@{args.k} vs {names[0]}")
+    for row in benchmark(names, texts, queries, k=args.k, threads=args.threads):
+        print("  " + ", ".join(f"{key}={value}" for key, value in row.items()))
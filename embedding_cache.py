@@ -0,0 +1,233 @@
+"""Content-addressed embedding cache.
+
+Vectors are keyed by (model tag, output dimension, sha256(text)), so the same
+string is only ever embedded once per model/backend/width. The tag names the
+model and, for quantized backends, the backend (see cache_tag), since int8 and
+ONNX vectors differ slightly from full precision ones. Lookups hit an in-memory
+LRU first, then a SQLite table of float32 BLOBs. The table is trimmed to a
+size budget by evicting the least recently used rows.
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedding_backends import DEFAULT_BACKEND
+
+
+BASE_DIR = Path(__file__).resolve().parent
+CACHE_PATH = BASE_DIR / "data" / "embedding_cache.db"
+
+# When over budget, trim to this fraction so eviction doesn't run on every write.
+EVICT_TO_FRACTION = 0.9
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_tag(model_id: str, backend: str) -> str:
+    """Model column for vectors from this model/backend; full precision keeps the bare model id."""
+    return model_id if backend == DEFAULT_BACKEND else f"{model_id}#{backend}"
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        model_id: str,
+        dim: int = 0,
+        path: Path | None = None,
+        memory_items: int = 2048,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            model_id: Default tag for vectors (see cache_tag); get_many and
+                put_many can name another one, e.g. the embedding service's.
+            dim: Output width requested from the model (0 = its native width).
+            path: SQLite file for the on-disk tier.
+            memory_items: Max vectors held in the in-memory LRU.
+            max_disk_bytes: Size budget for stored vectors on disk.
+        """
+        self.model_id = model_id
+        self.dim = int(dim)
+        self.path = path or CACHE_PATH
+        self.memory_items = max(0, int(memory_items))
+        self.max_disk_bytes = max(0, int(max_disk_bytes))
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, dim, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache (last_used)"
+        )
+        self._conn.commit()
+        row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embedding_cache").fetchone()
+        self._disk_bytes = int(row[0])
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]) -> None:
+        if not self.memory_items:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: Sequence[str], tag: str | None = None) -> List[Optional[List[float]]]:
+        """Cached vectors in input order, None where the text isn't cached under ``tag``."""
+        tag = tag or self.model_id
+        keys = [text_hash(text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        with self._lock:
+            to_load: Dict[str, List[int]] = {}
+            for idx, key in enumerate(keys):
+                vector = self._memory.get((tag, key))
+                if vector is not None:
+                    self._memory.move_to_end((tag, key))
+                    results[idx] = vector
+                    self.stats["memory_hits"] += 1
+                else:
+                    to_load.setdefault(key, []).append(idx)
+
+            if to_load:
+                found: Dict[str, List[float]] = {}
+                pending = list(to_load)
+                # Stay under SQLite's bound-parameter limit.
+                for start in range(0, len(pending), 500):
+                    chunk = pending[start : start + 500]
+                    placeholders = ",".join("?" for _ in chunk)
+                    rows = self._conn.execute(
+                        f"""
+                        SELECT text_hash, vector FROM embedding_cache
+                        WHERE model = ? AND dim = ? AND text_hash IN ({placeholders})
+                        """,
+                        (tag, self.dim, *chunk),
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+                if found:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND dim = ? AND text_hash = ?",
+                        [(now, tag, self.dim, key) for key in found],
+                    )
+                    self._conn.commit()
+
+                for key, indices in to_load.items():
+                    vector = found.get(key)
+                    if vector is None:
+                        self.stats["misses"] += len(indices)
+                        continue
+                    self._remember((tag, key), vector)
+                    self.stats["disk_hits"] += len(indices)
+                    for idx in indices:
+                        results[idx] = vector
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]], tag: str | None = None) -> None:
+        if not texts:
+            return
+        tag = tag or self.model_id
+        now = time.time()
+        rows: Dict[str, Tuple[str, int, str, bytes, float]] = {}
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = text_hash(text)
+                values = [float(v) for v in vector]
+                self._remember((tag, key), values)
+                rows[key] = (tag, self.dim, key, np.asarray(values, dtype=np.float32).tobytes(), now)
+
+            # Only new rows add bytes; existing ones just get last_used bumped.
+            existing = set()
+            keys = list(rows)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                existing.update(
+                    key
+                    for (key,) in self._conn.execute(
+                        f"""
+                        SELECT text_hash FROM embedding_cache
+                        WHERE model = ? AND dim = ? AND text_hash IN ({placeholders})
+                        """,
+                        (tag, self.dim, *chunk),
+                    )
+                )
+
+            self._conn.executemany(
+                """
+                INSERT INTO embedding_cache (model, dim, text_hash, vector, last_used)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(model, dim, text_hash) DO UPDATE SET last_used = excluded.last_used
+                """,
+                list(rows.values()),
+            )
+            self._conn.commit()
+            self.stats["writes"] += len(rows)
+            self._disk_bytes += sum(len(row[3]) for key, row in rows.items() if key not in existing)
+            if self.max_disk_bytes and self._disk_bytes > self.max_disk_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used rows until the store is back under budget."""
+        target = int(self.max_disk_bytes * EVICT_TO_FRACTION)
+        removed = 0
+        while self._disk_bytes > target:
+            rows = self._conn.execute(
+                "SELECT rowid, LENGTH(vector) FROM embedding_cache ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                break
+            batch: List[int] = []
+            for rowid, size in rows:
+                batch.append(rowid)
+                self._disk_bytes -= int(size)
+                if self._disk_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM embedding_cache WHERE rowid = ?", [(rowid,) for rowid in batch])
+            removed += len(batch)
+        self._conn.commit()
+        self.stats["evictions"] += removed
+        print(f"[Embedding Cache] Evicted {removed} vector(s), {self._disk_bytes / 1e6:.1f} MB on disk")
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                "model": self.model_id,
+                "dim": self.dim,
+                "memory_items": len(self._memory),
+                "disk_mb": round(self._disk_bytes / 1e6, 2),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                **self.stats,
+            }
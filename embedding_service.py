@@ -0,0 +1,128 @@
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from config import (
+    get_embedding_backend,
+    get_embedding_model,
+    get_embedding_service_batch_wait_ms,
+    get_embedding_service_max_batch,
+)
+from embedding_backends import EmbeddingBackend, load_backend
+
+
+app = FastAPI(title="Pebble Embedding Service", version="1.0.0")
+
+
+EMBEDDING_MODEL_ID = get_embedding_model()
+MAX_BATCH = get_embedding_service_max_batch()
+BATCH_WAIT_SECONDS = get_embedding_service_batch_wait_ms() / 1000.0
+
+
+# One model per machine; every bot and the control panel share it.
+EMBEDDER: Optional[EmbeddingBackend] = None
+PENDING: Optional["asyncio.Queue[Tuple[List[str], asyncio.Future]]"] = None
+STATS = {"requests": 0, "texts": 0, "batches": 0, "encode_seconds": 0.0}
+
+
+def _load_model() -> EmbeddingBackend:
+    global EMBEDDER
+    if EMBEDDER is None:
+        EMBEDDER = load_backend(model_id=EMBEDDING_MODEL_ID)
+    return EMBEDDER
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    return _load_model().encode(texts, batch_size=MAX_BATCH)
+
+
+async def _batch_worker() -> None:
+    """Coalesce concurrent /embed requests into one encode call."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await PENDING.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + BATCH_WAIT_SECONDS
+        while size < MAX_BATCH:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(PENDING.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        texts = [text for item_texts, _ in batch for text in item_texts]
+        started = time.perf_counter()
+        try:
+            vectors = await asyncio.to_thread(_encode, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        STATS["batches"] += 1
+        STATS["encode_seconds"] += time.perf_counter() - started
+
+        offset = 0
+        for item_texts, future in batch:
+            if not future.done():
+                future.set_result(vectors[offset : offset + len(item_texts)])
+            offset += len(item_texts)
+
+
+@app.on_event("startup")
+async def startup_event() -> None:
+    global PENDING
+    PENDING = asyncio.Queue()
+    await asyncio.to_thread(_load_model)
+    asyncio.create_task(_batch_worker())
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+
+@app.get("/")
+async def root() -> dict:
+    encode_seconds = STATS["encode_seconds"]
+    return {
+        "service": "pebble-embeddings",
+        "model": EMBEDDING_MODEL_ID,
+        "backend": get_embedding_backend(),
+        "loaded": EMBEDDER is not None,
+        "queued": PENDING.qsize() if PENDING is not None else 0,
+        **STATS,
+        "texts_per_second": round(STATS["texts"] / encode_seconds, 1) if encode_seconds else 0.0,
+    }
+
+
+@app.post("/embed")
+async def embed(payload: EmbedRequest) -> dict:
+    if not payload.texts:
+        raise HTTPException(status_code=400, detail="texts is required")
+    if PENDING is None:
+        raise HTTPException(status_code=503, detail="model still loading")
+
+    future: asyncio.Future = asyncio.get_running_loop().create_future()
+    await PENDING.put((list(payload.texts), future))
+    try:
+        vectors = await future
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"embed failed: {e}")
+
+    STATS["requests"] += 1
+    STATS["texts"] += len(payload.texts)
+    return {
+        "model": EMBEDDING_MODEL_ID,
+        # Clients key their embedding caches on model + backend.
+        "backend": EMBEDDER.name if EMBEDDER is not None else get_embedding_backend(),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "embeddings": vectors.tolist(),
+    }
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import heapq
 import json
+import re
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+
+import dateparser
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -16,9 +21,53 @@ DEFAULT_STATE: Dict[str, Any] = {
 }
 
 
+# Vague hints dateparser can't resolve, as (hour of day | None, fallback offset).
+VAGUE_TIME_HINTS: List[Tuple[str, Optional[int], timedelta]] = [
+    ("tonight", 20, timedelta(hours=3)),
+    ("this evening", 18, timedelta(hours=3)),
+    ("this afternoon", 14, timedelta(hours=3)),
+    ("this morning", 9, timedelta(hours=1)),
+    ("later today", None, timedelta(hours=4)),
+    ("in an hour", None, timedelta(hours=1)),
+    ("soon", None, timedelta(hours=3)),
+    ("now", None, timedelta(0)),
+    ("tmr", None, timedelta(days=1)),
+]
+DEFAULT_LOOP_DELAY = timedelta(days=1)
+
+
+def parse_due_time(time_hint: str, base: datetime) -> datetime:
+    """Resolve a loop's free-text expected_time to an absolute due time.
+
+    Uses dateparser relative to ``base`` (when the loop was created), with a
+    few hand-mapped vague phrases and a one-day default for anything else.
+    """
+    hint = (time_hint or "").strip().lower()
+    if hint:
+        for phrase, hour, offset in VAGUE_TIME_HINTS:
+            if re.search(rf"\b{re.escape(phrase)}\b", hint):
+                if hour is not None:
+                    target = base.replace(hour=hour, minute=0, second=0, microsecond=0)
+                    return target if target > base else base + offset
+                return base + offset
+        parsed = dateparser.parse(
+            hint,
+            settings={"PREFER_DATES_FROM": "future", "RELATIVE_BASE": base},
+        )
+        if parsed is not None:
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone().replace(tzinfo=None)
+            return max(parsed, base)
+    return base + DEFAULT_LOOP_DELAY
+
+
 class EmotionalCore:
     def __init__(self, state_path: Path | None = None) -> None:
         self.state_path = state_path or STATE_PATH
+        # Min-heap of (due_at ISO, topic key), rebuilt only when the state file changes.
+        self._due_heap: List[Tuple[str, str]] = []
+        self._loops_by_key: Dict[str, Dict[str, str]] = {}
+        self._index_mtime: int | None = None
 
     def _ensure_file(self) -> None:
         self.state_path.parent.mkdir(parents=True, exist_ok=True)
@@ -38,10 +87,36 @@ class EmotionalCore:
             "recent_memories": list(raw.get("recent_memories", DEFAULT_STATE["recent_memories"])),
             "open_loops": list(raw.get("open_loops", DEFAULT_STATE["open_loops"])),
         }
+        if self._backfill_due_times(state["open_loops"]):
+            self._write(state)
         return state
 
+    @staticmethod
+    def _backfill_due_times(loops: List[Dict[str, str]]) -> bool:
+        """Give loops saved before due_at existed a fixed due time; True if any changed.
+
+        Resolved once from the loop's created_at (or now, if that is missing
+        too) and persisted, so the due time doesn't move on later reloads.
+        """
+        changed = False
+        now = datetime.now()
+        for loop in loops:
+            if not isinstance(loop, dict) or loop.get("due_at"):
+                continue
+            try:
+                created = datetime.fromisoformat(str(loop.get("created_at", "")))
+            except ValueError:
+                created = now
+                loop["created_at"] = now.isoformat()
+            if created.tzinfo is not None:
+                created = created.astimezone().replace(tzinfo=None)
+            loop["due_at"] = parse_due_time(str(loop.get("expected_time", "")), created).isoformat()
+            changed = True
+        return changed
+
     def _write(self, state: Dict[str, Any]) -> None:
         self.state_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        self._index_mtime = None
 
     def update(self, mood: str, attachment_delta: float) -> Dict[str, Any]:
         state = self.load()
@@ -58,33 +133,106 @@ class EmotionalCore:
         self._write(state)
         return state
 
-    def add_loop(self, topic: str, time_hint: str) -> Dict[str, Any]:
+    def add_loop(
+        self,
+        topic: str,
+        time_hint: str,
+        user_id: str = "",
+        created_at: datetime | None = None,
+    ) -> Dict[str, Any]:
         clean_topic = (topic or "").strip()
         if not clean_topic:
             return self.load()
 
+        created = created_at or datetime.now()
         state = self.load()
         loops: List[Dict[str, str]] = list(state.get("open_loops", []))
 
         for loop in loops:
             if str(loop.get("topic", "")).strip().lower() == clean_topic.lower():
                 loop["expected_time"] = (time_hint or loop.get("expected_time", "soon")).strip() or "soon"
+                loop["created_at"] = created.isoformat()
+                loop["due_at"] = parse_due_time(loop["expected_time"], created).isoformat()
                 loop["status"] = "pending"
+                if user_id:
+                    loop["user_id"] = user_id
                 state["open_loops"] = loops
                 self._write(state)
                 return state
 
+        expected_time = (time_hint or "soon").strip() or "soon"
         loops.append(
             {
                 "topic": clean_topic,
-                "expected_time": (time_hint or "soon").strip() or "soon",
+                "expected_time": expected_time,
                 "status": "pending",
+                "user_id": user_id,
+                "created_at": created.isoformat(),
+                "due_at": parse_due_time(expected_time, created).isoformat(),
             }
         )
         state["open_loops"] = loops[-50:]
         self._write(state)
         return state
 
+    def _loop_index(self) -> List[Tuple[str, str]]:
+        """Due-time heap over pending loops, rebuilt only when the file changed."""
+        self._ensure_file()
+        try:
+            mtime = self.state_path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._index_mtime is not None and mtime == self._index_mtime:
+            return self._due_heap
+
+        heap: List[Tuple[str, str]] = []
+        by_key: Dict[str, Dict[str, str]] = {}
+        for loop in self.get_pending_loops():
+            key = str(loop.get("topic", "")).strip().lower()
+            if not key:
+                continue
+            # load() has already backfilled due_at for legacy loops.
+            due_at = str(loop.get("due_at", "") or "")
+            if not due_at:
+                continue
+            by_key[key] = loop
+            heap.append((due_at, key))
+        heapq.heapify(heap)
+        self._due_heap = heap
+        self._loops_by_key = by_key
+        self._index_mtime = mtime
+        return heap
+
+    def next_due_time(self) -> Optional[datetime]:
+        """Due time of the earliest pending loop (O(1) once indexed)."""
+        heap = self._loop_index()
+        if not heap:
+            return None
+        return datetime.fromisoformat(heap[0][0])
+
+    def get_due_loops(self, now: datetime | None = None, user_id: str | None = None) -> List[Dict[str, str]]:
+        """Pending loops whose due time has passed, earliest first.
+
+        With ``user_id``, only that user's loops and legacy loops with no owner.
+        Walks the heap in order and stops at the first loop not yet due.
+        """
+        cutoff = (now or datetime.now()).isoformat()
+        heap = self._loop_index()
+        due: List[Dict[str, str]] = []
+        # Ordered walk of the heap without mutating it: O(k log k) for k due loops.
+        frontier: List[Tuple[str, int]] = [(heap[0][0], 0)] if heap else []
+        while frontier and frontier[0][0] <= cutoff:
+            _, idx = heapq.heappop(frontier)
+            loop = self._loops_by_key.get(heap[idx][1])
+            if loop:
+                owner = str(loop.get("user_id", "") or "")
+                if user_id is None or not owner or owner == user_id:
+                    due.append(loop)
+            for child in (2 * idx + 1, 2 * idx + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child][0], child))
+        return due
+
     def get_pending_loops(self) -> List[Dict[str, str]]:
         state = self.load()
         loops: List[Dict[str, str]] = list(state.get("open_loops", []))
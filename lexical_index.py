@@ -0,0 +1,148 @@
+"""SQLite FTS5 keyword index kept next to the Chroma memory collections.
+
+Dense retrieval misses exact names, places and dates ("Tuesday dentist",
+a friend's name). This index stores the same documents under the same ids
+and ranks them with BM25, and MemoryEngine fuses both rankings with
+reciprocal-rank fusion (see ``rrf_fuse``).
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+
+BASE_DIR = Path(__file__).resolve().parent
+INDEX_PATH = BASE_DIR / "data" / "memory_fts.db"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Very common words only add noise to an OR query.
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "but", "by", "did", "do", "for", "from", "had", "has",
+    "have", "how", "i", "in", "is", "it", "its", "me", "my", "of", "on", "or", "so", "that",
+    "the", "to", "was", "we", "what", "when", "with", "you", "your",
+}
+
+
+def build_match_query(text: str) -> str:
+    """Turn free text into a safe FTS5 OR query of quoted terms ('' if nothing usable)."""
+    terms: List[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS or len(token) < 2 or token in terms:
+            continue
+        terms.append(token)
+    return " OR ".join(f'"{term}"' for term in terms[:32])
+
+
+def rrf_fuse(rankings: Iterable[Sequence[str]], k: int = 60) -> Dict[str, float]:
+    """Reciprocal-rank fusion: score(id) = sum over rankings of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+class LexicalIndex:
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or INDEX_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+                doc_id UNINDEXED,
+                user_id UNINDEXED,
+                kind UNINDEXED,
+                date UNINDEXED,
+                document,
+                tokenize = 'porter unicode61'
+            )
+            """
+        )
+        # doc_id is UNINDEXED in the FTS table, so deleting by it scans every row.
+        # This maps each id to its FTS rowid; writes delete by rowid instead.
+        has_ids = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_fts_ids'"
+        ).fetchone()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_fts_ids (doc_id TEXT PRIMARY KEY, fts_rowid INTEGER NOT NULL)"
+        )
+        if not has_ids:
+            self._conn.execute("INSERT OR REPLACE INTO memory_fts_ids SELECT doc_id, rowid FROM memory_fts")
+        self._conn.commit()
+
+    def _delete_locked(self, ids: Iterable[str]) -> None:
+        params = [(doc_id,) for doc_id in ids]
+        self._conn.executemany(
+            "DELETE FROM memory_fts WHERE rowid = (SELECT fts_rowid FROM memory_fts_ids WHERE doc_id = ?)", params
+        )
+        self._conn.executemany("DELETE FROM memory_fts_ids WHERE doc_id = ?", params)
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM memory_fts").fetchone()[0])
+
+    def add(self, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[dict]) -> None:
+        if not ids:
+            return
+        # Last write wins for ids repeated within one call.
+        rows = {doc_id: (document, metadata or {}) for doc_id, document, metadata in zip(ids, documents, metadatas)}
+        with self._lock:
+            # FTS5 has no upsert; replace any existing rows for these ids.
+            self._delete_locked(rows)
+            for doc_id, (document, metadata) in rows.items():
+                cursor = self._conn.execute(
+                    "INSERT INTO memory_fts (doc_id, user_id, kind, date, document) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        doc_id,
+                        str(metadata.get("user_id", "")),
+                        str(metadata.get("kind", "")),
+                        str(metadata.get("date", "")),
+                        str(document),
+                    ),
+                )
+                self._conn.execute(
+                    "INSERT INTO memory_fts_ids (doc_id, fts_rowid) VALUES (?, ?)", (doc_id, cursor.lastrowid)
+                )
+            self._conn.commit()
+
+    def delete(self, ids: Sequence[str]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            self._delete_locked(ids)
+            self._conn.commit()
+
+    def search(self, query: str, user_id: str | None = None, limit: int = 10) -> List[Dict[str, object]]:
+        """BM25-ranked hits (best first) as dicts shaped like MemoryEngine hits."""
+        match = build_match_query(query)
+        if not match:
+            return []
+        sql = "SELECT doc_id, user_id, kind, date, document, bm25(memory_fts) FROM memory_fts WHERE memory_fts MATCH ?"
+        params: List[object] = [match]
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params.append(user_id)
+        sql += " ORDER BY bm25(memory_fts) LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                print(f"[Lexical Index] Search failed: {e}")
+                return []
+        return [
+            {
+                "id": doc_id,
+                "user_id": row_user,
+                "kind": kind,
+                "date": date,
+                "document": document,
+                "bm25": float(score),
+            }
+            for doc_id, row_user, kind, date, document, score in rows
+        ]
@@ -0,0 +1,168 @@
+"""Priority-aware admission control in front of the LLM backend.
+
+Every Brain call goes through an AdmissionController for its backend URL.
+Callers tag work with a priority class via ``llm_priority(...)``; the tag is a
+ContextVar, so it follows ``asyncio.to_thread`` into the worker thread that
+actually makes the request.
+
+- At most ``max_concurrent`` requests run per backend.
+- Waiters are admitted strictly by priority, so queued background work is
+  deferred whenever a live reply is waiting.
+- One slot is reserved for interactive work when the limit allows it.
+- Optional (sheddable) work is rejected up front with LLMShedError when the
+  backend is busy, instead of queueing behind everything else.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REMINDER = 1
+PRIORITY_LOOP_FOLLOWUP = 2
+PRIORITY_SPONTANEITY = 3
+PRIORITY_CONSOLIDATION = 4
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_REMINDER: "reminder",
+    PRIORITY_LOOP_FOLLOWUP: "loop_followup",
+    PRIORITY_SPONTANEITY: "spontaneity",
+    PRIORITY_CONSOLIDATION: "consolidation",
+}
+
+# Work that can simply be skipped when the backend is under load.
+SHEDDABLE_PRIORITIES = {PRIORITY_SPONTANEITY}
+
+_current_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+class LLMShedError(RuntimeError):
+    """Raised when optional LLM work is dropped because the backend is busy."""
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Tag LLM calls made in this context (including to_thread calls) with a priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_concurrent: int = 2, shed_queue_depth: int = 4) -> None:
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.shed_queue_depth = max(0, int(shed_queue_depth))
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._active: Dict[int, int] = {}  # priority -> running count
+        self.stats: Dict[str, int] = {"admitted": 0, "shed": 0, "deferred": 0}
+        self._wait_seconds: Dict[int, float] = {}
+
+    def _running(self) -> int:
+        return sum(self._active.values())
+
+    def _capacity_for(self, priority: int) -> int:
+        # Keep one slot free for live replies when there is more than one.
+        if priority == PRIORITY_INTERACTIVE or self.max_concurrent == 1:
+            return self.max_concurrent
+        return self.max_concurrent - 1
+
+    def _should_shed(self, priority: int) -> bool:
+        if priority not in SHEDDABLE_PRIORITIES:
+            return False
+        waiting_ahead = sum(1 for p, _ in self._waiting if p < priority)
+        if waiting_ahead:
+            return True
+        return len(self._waiting) >= self.shed_queue_depth or self._running() >= self._capacity_for(priority)
+
+    @contextmanager
+    def slot(self, priority: Optional[int] = None) -> Iterator[None]:
+        """Block until this request may run; raise LLMShedError for shed work.
+
+        Must not be entered on an event-loop thread: waiting here would stall
+        every other update. Run LLM calls via asyncio.to_thread instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                f"LLM call to {self.name} made on the event loop thread; run it with asyncio.to_thread"
+            )
+        priority = current_priority() if priority is None else priority
+        entry = (priority, next(self._seq))
+        queued_at = time.monotonic()
+
+        with self._cond:
+            if self._should_shed(priority):
+                self.stats["shed"] += 1
+                raise LLMShedError(
+                    f"{PRIORITY_NAMES.get(priority, priority)} request shed ({self.name} busy)"
+                )
+            heapq.heappush(self._waiting, entry)
+            deferred = False
+            while not (self._waiting[0] == entry and self._running() < self._capacity_for(priority)):
+                if not deferred and self._waiting[0] != entry:
+                    deferred = True
+                    self.stats["deferred"] += 1
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self._active[priority] = self._active.get(priority, 0) + 1
+            self.stats["admitted"] += 1
+            self._wait_seconds[priority] = self._wait_seconds.get(priority, 0.0) + (time.monotonic() - queued_at)
+            # The next waiter may also fit.
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[priority] -= 1
+                self._cond.notify_all()
+
+    def status(self) -> Dict[str, object]:
+        with self._cond:
+            waiting: Dict[str, int] = {}
+            for priority, _ in self._waiting:
+                label = PRIORITY_NAMES.get(priority, str(priority))
+                waiting[label] = waiting.get(label, 0) + 1
+            return {
+                "backend": self.name,
+                "max_concurrent": self.max_concurrent,
+                "running": {PRIORITY_NAMES.get(p, str(p)): n for p, n in self._active.items() if n},
+                "waiting": waiting,
+                "wait_seconds": {PRIORITY_NAMES.get(p, str(p)): round(s, 1) for p, s in self._wait_seconds.items()},
+                **self.stats,
+            }
+
+
+_controllers: Dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_admission(backend: str, max_concurrent: int = 2, shed_queue_depth: int = 4) -> AdmissionController:
+    """Shared controller per backend URL (all Brains on one backend share limits)."""
+    key = (backend or "default").rstrip("/")
+    with _controllers_lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = AdmissionController(key, max_concurrent=max_concurrent, shed_queue_depth=shed_queue_depth)
+            _controllers[key] = controller
+        return controller
@@ -3,13 +3,15 @@ import random
 import tempfile
 import signal
 import sys
+import time
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 import asyncio
 from collections import defaultdict, deque
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Deque, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import dateparser
 import httpx
@@ -28,38 +30,76 @@ from telegram.ext import (
 )
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-from brain import Brain
+from brain import Brain, now_iso
 from config import (
     ALLOWED_USER_ID,
     OPENAI_API_KEY,
     OPENAI_BASE_URL,
     OPENAI_MODEL,
     TELEGRAM_BOT_TOKEN,
+    get_background_workers,
+    get_concurrent_updates,
+    get_consolidation_concurrency,
+    get_consolidation_jitter,
+    get_consolidation_window_minutes,
+    get_memory_batch_wait_ms,
+    get_memory_compaction_enabled,
+    get_memory_max_batch,
+    get_memory_workers,
     get_provider,
+    get_reminder_arm_horizon_hours,
+    get_scheduler_timezone,
+    get_spontaneity_concurrency,
+    get_spontaneity_recheck_minutes,
+    get_spontaneity_user_timeout,
+    get_telegram_api_base_url,
+    get_telegram_update_mode,
+    get_webhook_listen_host,
+    get_webhook_listen_port,
+    get_webhook_max_connections,
+    get_webhook_public_url,
+    get_webhook_secret,
+    get_weather_refresh_minutes,
     reload_env,
 )
 from db import (
+    add_reminder,
+    cancel_reminder,
     get_active_mode,
     get_chat_logs_for_day,
     get_persona_by_mode,
     get_personas,
     get_recent_chat_logs,
+    get_reminder,
+    get_scheduled_reminders,
+    get_user_last_activity,
     get_user_profile,
     get_voice_settings,
     init_db,
+    list_reminders,
     list_users_with_logs,
     log_chat,
     set_active_mode,
     update_voice_setting,
     upsert_voice_settings,
     update_persona_prompt,
+    update_reminder,
     upsert_user_profile,
     update_user_location,
+    update_user_timezone,
     clear_user_names,
 )
+from llm_admission import (
+    PRIORITY_CONSOLIDATION,
+    PRIORITY_LOOP_FOLLOWUP,
+    PRIORITY_SPONTANEITY,
+    LLMShedError,
+    llm_priority,
+)
 from memory_engine import MemoryEngine
+from memory_worker import AsyncMemory
 from emotional_core import EmotionalCore
-from tools import get_weather, get_voice_config
+from tools import get_voice_config, weather_service
 from voice_engine import (
     extract_emotion_tag,
     load_voice_configs,
@@ -231,14 +271,16 @@ def resolve_delivery_preferences(user_id: str) -> Tuple[str, bool, bool]:
     return "text", True, False
 
 
-def now_iso() -> str:
-    return datetime.now().isoformat()
+async def to_thread_with_priority(priority: int, func, /, *args, **kwargs):
+    """asyncio.to_thread with LLM calls in ``func`` tagged as ``priority`` work."""
+    with llm_priority(priority):
+        return await asyncio.to_thread(func, *args, **kwargs)
 
 
 def format_gap_since(last_time: datetime | None) -> str:
     if not last_time:
         return "a while"
-    seconds = max(int((datetime.now() - last_time).total_seconds()), 0)
+    seconds = max(int((datetime.now(timezone.utc) - last_time).total_seconds()), 0)
     if seconds >= 86400:
         days = seconds // 86400
         return f"{days} day" + ("s" if days != 1 else "")
@@ -259,7 +301,251 @@ def get_last_interaction_time(user_id: str) -> datetime | None:
     return brain._parse_timestamp(str(latest))
 
 
+class BackgroundWorkRunner:
+    """Bounded asyncio worker pool for slow background work (dream cycles).
+
+    Jobs are keyed (e.g. ``dream:<user_id>``); at most one job per key runs at a
+    time. A job submitted while its key is busy is either dropped (``dedupe``)
+    or deferred until the running one finishes, so per-user work stays ordered.
+    """
+
+    def __init__(self, max_workers: int = 1, name: str = "background") -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self._queue: asyncio.Queue | None = None
+        self._workers: List[asyncio.Task] = []
+        self._active_keys: set[str] = set()
+        self._deferred: Dict[str, Deque[Tuple[str, object]]] = defaultdict(deque)
+        self._running: Dict[str, Tuple[str, datetime]] = {}
+        self._closing = False
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "deduped": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+        }
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(idx), name=f"{self.name}-worker-{idx}")
+            for idx in range(self.max_workers)
+        ]
+        print(f"[Background] {self.name}: started {self.max_workers} worker(s)")
+
+    def submit(self, key: str, job_factory, label: str = "", dedupe: bool = False) -> bool:
+        """Queue ``job_factory()`` (a coroutine factory) under ``key``.
+
+        Returns False if the job was dropped (shutting down, or ``dedupe`` and the
+        key already has work in flight).
+        """
+        if self._closing:
+            return False
+        self.start()
+
+        label = label or key
+        if key in self._active_keys:
+            if dedupe:
+                self.stats["deduped"] += 1
+                print(f"[Background] {self.name}: {label} already in flight, skipping")
+                return False
+            self._deferred[key].append((label, job_factory))
+        else:
+            self._active_keys.add(key)
+            self._queue.put_nowait((key, label, job_factory))
+        self.stats["submitted"] += 1
+        return True
+
+    def is_busy(self, key: str) -> bool:
+        return key in self._active_keys
+
+    async def _worker(self, idx: int) -> None:
+        assert self._queue is not None
+        while True:
+            key, label, job_factory = await self._queue.get()
+            self._running[key] = (label, datetime.now())
+            try:
+                await job_factory()
+                self.stats["completed"] += 1
+            except asyncio.CancelledError:
+                self.stats["cancelled"] += 1
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[Background] {self.name}: {label} failed: {e}")
+            finally:
+                self._running.pop(key, None)
+                self._release(key)
+                self._queue.task_done()
+
+    def _release(self, key: str) -> None:
+        pending = self._deferred.get(key)
+        if pending and not self._closing:
+            label, job_factory = pending.popleft()
+            if not pending:
+                self._deferred.pop(key, None)
+            self._queue.put_nowait((key, label, job_factory))
+            return
+        self._deferred.pop(key, None)
+        self._active_keys.discard(key)
+
+    def status(self) -> Dict[str, object]:
+        now = datetime.now()
+        return {
+            "workers": self.max_workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "deferred": sum(len(items) for items in self._deferred.values()),
+            "running": [
+                {"label": label, "seconds": int((now - started).total_seconds())}
+                for label, started in self._running.values()
+            ],
+            **self.stats,
+        }
+
+    async def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop accepting work, give running jobs ``timeout`` seconds, then cancel."""
+        if not self._workers:
+            return
+        self._closing = True
+        dropped = (self._queue.qsize() if self._queue else 0) + sum(
+            len(items) for items in self._deferred.values()
+        )
+        self._deferred.clear()
+        if self._queue:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                self._queue.task_done()
+        self.stats["cancelled"] += dropped
+
+        if self._running:
+            print(f"[Background] {self.name}: waiting up to {timeout:.0f}s for {len(self._running)} running job(s)")
+            deadline = asyncio.get_running_loop().time() + timeout
+            while self._running and asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(0.2)
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._active_keys.clear()
+        print(f"[Background] {self.name}: stopped ({self.status()})")
+
+
+class ConsolidationPlanner:
+    """Spreads the nightly dream cycles across a time window.
+
+    Users get evenly spaced start slots over most of the window (the tail is
+    kept free for stragglers), plus random jitter within each slot, and run
+    with bounded concurrency so one LLM backend isn't hit by every user at once.
+    """
+
+    TAIL_FRACTION = 0.25
+
+    def __init__(self, window_minutes: float = 120.0, concurrency: int = 2, jitter: float = 0.5) -> None:
+        self.window_seconds = max(0.0, float(window_minutes) * 60.0)
+        self.concurrency = max(1, int(concurrency))
+        self.jitter = max(0.0, min(1.0, float(jitter)))
+        self._reset(0)
+
+    def _reset(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.running = 0
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._durations: List[float] = []
+
+    def plan(self, user_ids: List[str]) -> List[Tuple[str, float]]:
+        """Return (user_id, start offset in seconds) pairs in start order."""
+        users = list(user_ids)
+        random.shuffle(users)
+        if not users:
+            return []
+        spread = self.window_seconds * (1.0 - self.TAIL_FRACTION)
+        slot = spread / len(users)
+        return [(user_id, idx * slot + random.uniform(0.0, slot * self.jitter)) for idx, user_id in enumerate(users)]
+
+    async def run(self, user_ids: List[str], job) -> Dict[str, object]:
+        """Run ``await job(user_id)`` for every user according to plan()."""
+        schedule = self.plan(user_ids)
+        self._reset(len(schedule))
+        if not schedule:
+            return self.status()
+
+        loop = asyncio.get_running_loop()
+        self.started_at = loop.time()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        print(
+            f"[Consolidation] Planned {self.total} dream cycle(s) over "
+            f"{self.window_seconds / 60:.0f} min, concurrency={self.concurrency}"
+        )
+
+        async def run_one(user_id: str, offset: float) -> None:
+            await asyncio.sleep(offset)
+            async with semaphore:
+                self.running += 1
+                began = loop.time()
+                try:
+                    await job(user_id)
+                    self.done += 1
+                except Exception as e:
+                    self.failed += 1
+                    print(f"[Consolidation] user={user_id} failed: {e}")
+                finally:
+                    self.running -= 1
+                    self._durations.append(loop.time() - began)
+            finished = self.done + self.failed
+            if finished % max(1, self.total // 10) == 0 or finished == self.total:
+                print(f"[Consolidation] Progress: {self.status()}")
+
+        await asyncio.gather(*(run_one(user_id, offset) for user_id, offset in schedule))
+        self.finished_at = loop.time()
+        summary = self.status()
+        if self.window_seconds and summary["elapsed_seconds"] > self.window_seconds:
+            print(
+                f"[Consolidation] Overran the {self.window_seconds / 60:.0f} min window — "
+                "raise CONSOLIDATION_CONCURRENCY or CONSOLIDATION_WINDOW_MINUTES."
+            )
+        print(f"[Consolidation] Finished: {summary}")
+        return summary
+
+    def status(self) -> Dict[str, object]:
+        finished = self.done + self.failed
+        elapsed = 0.0
+        if self.started_at is not None:
+            end = self.finished_at if self.finished_at is not None else asyncio.get_running_loop().time()
+            elapsed = end - self.started_at
+        remaining = self.total - finished
+        eta = 0.0
+        if remaining and self._durations:
+            avg = sum(self._durations) / len(self._durations)
+            # Whichever is later: the planned start of the last user, or draining the backlog.
+            planned_end = max(0.0, self.window_seconds * (1.0 - self.TAIL_FRACTION) - elapsed)
+            eta = max(planned_end, remaining * avg / self.concurrency)
+        return {
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "running": self.running,
+            "remaining": remaining,
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": round(eta, 1),
+        }
+
+
 memory_engine = MemoryEngine()
+# Async front end: memory calls from handlers and jobs run on its own thread pool.
+memory = AsyncMemory(
+    memory_engine,
+    workers=get_memory_workers(),
+    batch_wait_ms=get_memory_batch_wait_ms(),
+    max_batch=get_memory_max_batch(),
+)
 emotional_core = EmotionalCore()
 brain = Brain(
     model=OPENAI_MODEL,
@@ -268,7 +554,21 @@ brain = Brain(
     memory_engine=memory_engine,
     emotional_core=emotional_core,
 )
-telegram_app: Application | None = None
+# Every Application running in this process, by bot name (one, or all with --all-bots).
+# The engines above are shared; each bot keeps its own scheduler and job store.
+bot_apps: Dict[str, Application] = {}
+dream_runner = BackgroundWorkRunner(max_workers=get_background_workers(), name="dreams")
+spontaneity_slots = asyncio.Semaphore(get_spontaneity_concurrency())
+inflight_loop_topics: set[str] = set()
+consolidation_planner = ConsolidationPlanner(
+    window_minutes=get_consolidation_window_minutes(),
+    concurrency=get_consolidation_concurrency(),
+    jitter=get_consolidation_jitter(),
+)
+
+
+def bot_name_of(app: Application) -> str:
+    return str(app.bot_data.get("bot_name", ""))
 
 
 def is_allowed_user(user_id: str) -> bool:
@@ -297,9 +597,20 @@ async def reminder_callback(
     context: ContextTypes.DEFAULT_TYPE | None = None,
     chat_id: int | None = None,
     task: str = "your reminder",
+    reminder_id: int | None = None,
+    app: Application | None = None,
 ) -> None:
     resolved_chat_id: int | None = chat_id
     resolved_task = task
+    row: Dict[str, object] | None = None
+
+    if reminder_id is not None:
+        # The reminders table is the source of truth; skip anything cancelled meanwhile.
+        row = get_reminder(reminder_id)
+        if not row or row.get("status") != "scheduled":
+            return
+        resolved_chat_id = int(row["chat_id"]) if row.get("chat_id") else resolved_chat_id
+        resolved_task = str(row.get("reminder_text") or resolved_task)
 
     if context and context.job:
         job_data = context.job.data if context.job else None
@@ -312,10 +623,160 @@ async def reminder_callback(
 
     if context:
         await context.bot.send_message(chat_id=resolved_chat_id, text=f"⏰ Reminder: {resolved_task}")
+    elif app:
+        await app.bot.send_message(chat_id=resolved_chat_id, text=f"⏰ Reminder: {resolved_task}")
+
+    if row:
+        if row.get("recurrence") == "daily":
+            fired = datetime.fromisoformat(str(row["trigger_time"]))
+            next_time = fired + timedelta(days=max(1, (datetime.now() - fired).days + 1))
+            update_reminder(int(row["id"]), trigger_time=next_time.isoformat())
+        else:
+            update_reminder(int(row["id"]), status="sent")
+
+
+def arm_reminder(app: Application, row: Dict[str, object]) -> None:
+    """Register the in-memory job for a reminders row (overdue one-offs fire right away)."""
+    scheduler = app.job_queue.scheduler
+    trigger_time = datetime.fromisoformat(str(row["trigger_time"]))
+    job_id = str(row.get("job_id") or f"reminder:{row['id']}")
+    if row.get("recurrence") == "daily":
+        scheduler.add_job(
+            reminder_callback,
+            trigger="cron",
+            hour=trigger_time.hour,
+            minute=trigger_time.minute,
+            id=job_id,
+            replace_existing=True,
+            jobstore="memory",
+            kwargs={"reminder_id": int(row["id"]), "app": app},
+        )
+        return
+    scheduler.add_job(
+        reminder_callback,
+        trigger="date",
+        run_date=max(trigger_time, datetime.now()),
+        id=job_id,
+        replace_existing=True,
+        jobstore="memory",
+        misfire_grace_time=None,
+        kwargs={"reminder_id": int(row["id"]), "app": app},
+    )
+
+
+def migrate_legacy_reminder_jobs(scheduler: AsyncIOScheduler, bot_name: str) -> int:
+    """Move reminder jobs from the persistent APScheduler store into the reminders table."""
+    migrated = 0
+    for job in scheduler.get_jobs(jobstore="default"):
+        if not job.id.startswith("reminder:"):
+            continue
+        kwargs = job.kwargs or {}
+        chat_id = kwargs.get("chat_id")
+        if chat_id and job.next_run_time:
+            parts = job.id.split(":")
+            user_id = parts[2] if len(parts) > 2 else str(chat_id)
+            add_reminder(
+                user_id=user_id,
+                chat_id=int(chat_id),
+                reminder_text=str(kwargs.get("task", "your reminder")),
+                trigger_time=job.next_run_time.replace(tzinfo=None).isoformat(),
+                recurrence="daily" if job.id.startswith("reminder:daily:") else None,
+                bot_name=bot_name,
+            )
+            migrated += 1
+        scheduler.remove_job(job.id, jobstore="default")
+    return migrated
+
+
+def rearm_reminders(app: Application) -> int:
+    """Re-arm this bot's daily, overdue and near-term reminders at startup.
+
+    One-offs beyond the arm horizon stay in the table; arm_upcoming_reminders
+    picks them up as they come into range.
+    """
+    bot_name = bot_name_of(app)
+    migrated = migrate_legacy_reminder_jobs(app.job_queue.scheduler, bot_name)
+    now = datetime.now()
+    horizon = now + timedelta(hours=get_reminder_arm_horizon_hours())
+    rows = get_scheduled_reminders(bot_name=bot_name, before=horizon.isoformat())
+    for row in rows:
+        arm_reminder(app, row)
+    overdue = sum(1 for row in rows if not row.get("recurrence") and str(row["trigger_time"]) <= now.isoformat())
+    print(f"[Reminders] {bot_name}: re-armed {len(rows)} reminder(s) ({overdue} overdue, {migrated} migrated)")
+    return len(rows)
+
+
+async def arm_upcoming_reminders(app: Application) -> None:
+    """Periodic sweep: arm one-offs that have come within the horizon since the last run."""
+    scheduler = app.job_queue.scheduler
+    now = datetime.now()
+    rows = get_scheduled_reminders(
+        bot_name=bot_name_of(app),
+        after=now.isoformat(),
+        before=(now + timedelta(hours=get_reminder_arm_horizon_hours())).isoformat(),
+    )
+    for row in rows:
+        # Already armed (at startup, on creation or by an earlier sweep).
+        if not scheduler.get_job(str(row.get("job_id") or f"reminder:{row['id']}"), jobstore="memory"):
+            arm_reminder(app, row)
+
+
+def format_reminder(row: Dict[str, object]) -> str:
+    when = datetime.fromisoformat(str(row["trigger_time"]))
+    if row.get("recurrence") == "daily":
+        schedule = f"every day at {when.strftime('%H:%M')}"
+    else:
+        schedule = when.strftime("%a %b %d, %H:%M")
+    return f"#{row['id']} — {row['reminder_text']} ({schedule})"
+
+
+async def reminders_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """List the user's scheduled reminders"""
+    if not update.effective_user or not update.message:
         return
 
-    if telegram_app:
-        await telegram_app.bot.send_message(chat_id=resolved_chat_id, text=f"⏰ Reminder: {resolved_task}")
+    user_id = str(update.effective_user.id)
+    if not is_allowed_user(user_id):
+        await update.message.reply_text("Unauthorized user.")
+        return
+
+    rows = list_reminders(user_id)
+    if not rows:
+        await update.message.reply_text("No reminders set. ⏰")
+        return
+    lines = "\n".join(format_reminder(row) for row in rows)
+    await update.message.reply_text(f"⏰ Your reminders:\n{lines}\n\nCancel one with /cancelreminder [id]")
+
+
+async def cancel_reminder_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Cancel one of the user's reminders by id"""
+    if not update.effective_user or not update.message:
+        return
+
+    user_id = str(update.effective_user.id)
+    if not is_allowed_user(user_id):
+        await update.message.reply_text("Unauthorized user.")
+        return
+
+    args = context.args
+    try:
+        reminder_id = int(str(args[0]).lstrip("#")) if args else None
+    except ValueError:
+        reminder_id = None
+    if reminder_id is None:
+        await update.message.reply_text("Usage: /cancelreminder [id]\nSee ids with /reminders")
+        return
+
+    if not cancel_reminder(user_id, reminder_id):
+        await update.message.reply_text(f"I couldn't find an active reminder #{reminder_id}.")
+        return
+
+    # The reminder may have been set through another bot running in this process.
+    for application in bot_apps.values() or [context.application]:
+        job = application.job_queue.scheduler.get_job(f"reminder:{reminder_id}", jobstore="memory")
+        if job:
+            job.remove()
+    await update.message.reply_text(f"Cancelled reminder #{reminder_id}. ✅")
 
 
 # Track users who need to provide their name
@@ -398,6 +859,54 @@ async def test_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.message.reply_text("Tap a button to test callbacks:", reply_markup=reply_markup)
 
 
+async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Report background work (dream cycles) in flight."""
+    if not update.effective_user or not update.message:
+        return
+
+    user_id = str(update.effective_user.id)
+    if not is_allowed_user(user_id):
+        await update.message.reply_text("Unauthorized user.")
+        return
+
+    dreams = dream_runner.status()
+    nightly = consolidation_planner.status()
+    llm = brain.admission.status()
+    cache = memory_engine.embedding_cache.status() if memory_engine.embedding_cache else None
+    cache_line = (
+        f"- Embedding cache: {cache['hit_rate']:.0%} hits, {cache['disk_mb']} MB on disk"
+        if cache
+        else "- Embedding cache: off"
+    )
+    workers = memory.status()
+    workers_line = (
+        f"- Memory workers: {workers['in_flight']} in flight on {workers['workers']} thread(s), "
+        f"queue {workers['queued']} (max {workers['max_queue_depth']}), "
+        f"avg batch {workers['avg_batch']}, wait {workers['avg_wait_ms']} ms, run {workers['avg_run_ms']} ms"
+    )
+    results = memory_engine.result_cache.status()
+    results_line = (
+        f"- Retrieval cache: {results['served_from_cache']}/{results['lookups']} turns served "
+        f"({results['hit_rate']:.0%}), {results['entries']} entries"
+    )
+    running = ", ".join(f"{item['label']} ({item['seconds']}s)" for item in dreams["running"]) or "none"
+    await update.message.reply_text(
+        "🛠️ Background work\n"
+        f"- Dream workers: {dreams['workers']}\n"
+        f"- Running: {running}\n"
+        f"- Queued: {dreams['queued']} (+{dreams['deferred']} waiting on same user)\n"
+        f"- Done: {dreams['completed']}, failed: {dreams['failed']}, skipped: {dreams['deduped']}\n"
+        f"- Nightly consolidation: {nightly['done']}/{nightly['total']} done, "
+        f"{nightly['running']} running, ETA {int(nightly['eta_seconds'] // 60)} min\n"
+        f"- LLM: running {llm['running'] or 'none'}, waiting {llm['waiting'] or 'none'}, "
+        f"shed {llm['shed']}, deferred {llm['deferred']}\n"
+        f"{cache_line}\n"
+        f"{results_line}\n"
+        f"{workers_line}\n"
+        f"- Memory engine: {'ready' if memory_engine.ready.is_set() else 'warming up'}"
+    )
+
+
 async def location_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Set user location for weather tracking"""
     if not update.effective_user or not update.message:
@@ -428,6 +937,37 @@ async def location_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     await update.message.reply_text(f"Got it. I'll keep track of the weather in {city} now. 🌤️")
 
 
+async def timezone_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Set user time zone for quiet hours and check-in timing"""
+    if not update.effective_user or not update.message:
+        return
+
+    user_id = str(update.effective_user.id)
+    if not is_allowed_user(user_id):
+        await update.message.reply_text("Unauthorized user.")
+        return
+
+    args = context.args
+    if not args:
+        current = str(get_user_profile(user_id).get("timezone", "") or "").strip()
+        await update.message.reply_text(
+            f"Your time zone is: {current or 'server local time'}\n"
+            "To change, use: /timezone [Area/City] (e.g. /timezone Europe/London)"
+        )
+        return
+
+    name = args[0].strip()
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        await update.message.reply_text("I don't know that time zone. Try something like America/New_York.")
+        return
+
+    update_user_timezone(user_id, name)
+    schedule_spontaneity_check(context.application, user_id)
+    await update.message.reply_text(f"Got it. I'll keep to your clock in {name} now. 🕰️")
+
+
 async def handle_voice_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     print(f"[Voice Callback] Received: query={query}, data={query.data if query else 'None'}")
@@ -614,7 +1154,7 @@ async def process_user_text(
     # Handle new user name collection
     if user_id in pending_name_users:
         # Use LLM to extract names from their response
-        extracted_names = brain.extract_names_from_text(user_text)
+        extracted_names = await asyncio.to_thread(brain.extract_names_from_text, user_text)
         if extracted_names:
             user_name = extracted_names.get("user_name", "").strip()
             bot_name = extracted_names.get("bot_name", "").strip()
@@ -673,9 +1213,15 @@ async def process_user_text(
                 user_id=user_id,
                 day_iso=datetime.now().date().isoformat(),
             )
-        if logs_for_reflection:
-            brain.run_dream_cycle(chat_logs=logs_for_reflection, user_id=user_id)
-        short_term_memory[user_id].clear()
+        # Queued behind any overflow dream for this user (like the overflow branch),
+        # never dropped; keep short-term memory unless the dream was accepted.
+        accepted = not logs_for_reflection or dream_runner.submit(
+            f"dream:{user_id}",
+            lambda: run_goodnight_dream(user_id=user_id, logs=logs_for_reflection),
+            label=f"goodnight dream user={user_id}",
+        )
+        if accepted:
+            short_term_memory[user_id].clear()
         return
 
     if user_text.startswith(PERSONA_PREFIX):
@@ -707,7 +1253,7 @@ async def process_user_text(
         return
 
     if user_id in pending_custom_persona_users:
-        custom_prompt = brain.generate_custom_persona_prompt(user_text)
+        custom_prompt = await asyncio.to_thread(brain.generate_custom_persona_prompt, user_text)
         update_persona_prompt("Custom", custom_prompt)
         set_active_mode(user_id, "Custom", custom_description=user_text)
         pending_custom_persona_users.discard(user_id)
@@ -720,7 +1266,7 @@ async def process_user_text(
         "relationship_status", "We are getting to know each other."
     )
 
-    extracted_location = brain.extract_location(user_text)
+    extracted_location = await asyncio.to_thread(brain.extract_location, user_text)
     if extracted_location:
         upsert_user_profile(
             user_id=user_id,
@@ -736,7 +1282,7 @@ async def process_user_text(
             "relationship_status", "We are getting to know each other."
         )
 
-    reminder = brain.detect_reminder(user_text)
+    reminder = await asyncio.to_thread(brain.detect_reminder, user_text)
     if reminder:
         parsed_time = dateparser.parse(
             reminder["time"],
@@ -747,30 +1293,39 @@ async def process_user_text(
             if parsed_time <= now:
                 parsed_time = parsed_time + timedelta(days=1)
 
-            if reminder.get("type") == "recurring" and reminder.get("interval") == "daily":
-                task_id = f"reminder:daily:{user_id}:{reminder['task'].strip().lower().replace(' ', '_')}:{parsed_time.hour}:{parsed_time.minute}"
-                context.job_queue.scheduler.add_job(
-                    reminder_callback,
-                    trigger="cron",
-                    hour=parsed_time.hour,
-                    minute=parsed_time.minute,
-                    id=task_id,
-                    replace_existing=True,
-                    kwargs={"chat_id": update.effective_chat.id, "task": reminder["task"]},
+            recurrence = (
+                "daily"
+                if reminder.get("type") == "recurring" and reminder.get("interval") == "daily"
+                else None
+            )
+            existing = None
+            if recurrence:
+                # Same task at the same time of day replaces rather than duplicates.
+                for row in list_reminders(user_id):
+                    row_time = datetime.fromisoformat(str(row["trigger_time"]))
+                    if (
+                        row.get("recurrence") == "daily"
+                        and str(row["reminder_text"]).strip().lower() == reminder["task"].strip().lower()
+                        and (row_time.hour, row_time.minute) == (parsed_time.hour, parsed_time.minute)
+                    ):
+                        existing = row
+                        break
+            if not existing:
+                row = add_reminder(
+                    user_id=user_id,
+                    chat_id=update.effective_chat.id,
+                    reminder_text=reminder["task"],
+                    trigger_time=parsed_time.replace(tzinfo=None).isoformat(),
+                    recurrence=recurrence,
+                    bot_name=bot_name_of(context.application),
                 )
+                arm_reminder(context.application, row)
+
+            if recurrence:
                 await update.message.reply_text(
                     f"Bet. I'll text you every day at {reminder['time']} to {reminder['task']}. 🔄"
                 )
             else:
-                task_id = f"reminder:one_off:{user_id}:{int(parsed_time.timestamp())}"
-                context.job_queue.scheduler.add_job(
-                    reminder_callback,
-                    trigger="date",
-                    run_date=parsed_time,
-                    id=task_id,
-                    replace_existing=True,
-                    kwargs={"chat_id": update.effective_chat.id, "task": reminder["task"]},
-                )
                 await update.message.reply_text(f"Got it. Set an alarm for {reminder['time']}. ⏰")
             return
 
@@ -809,13 +1364,13 @@ async def process_user_text(
         if not location:
             await update.message.reply_text("I don't know where we are yet! 🌍 Tell me your city so I can check.")
             return
-        weather_data = get_weather(location)
+        weather_data = await weather_service.aget(location)
         current_weather = weather_data
         weather_system_data = (
             f"[SYSTEM DATA: Current Weather in {location} is {weather_data}. Advice the user accordingly.]"
         )
     elif location:
-        current_weather = get_weather(location)
+        current_weather = await weather_service.aget(location)
 
     short_term_memory[user_id].append(
         {"role": "user", "content": user_text, "created_at": now_iso()}
@@ -833,7 +1388,8 @@ async def process_user_text(
             for row in recent_logs
         ]
 
-    retrieved_context = memory_engine.retrieve_relevant_context(query=user_text, user_id=user_id)
+    # On the memory pool, batched with other users' retrievals arriving now.
+    retrieved_context = await memory.retrieve_relevant_context(user_text, user_id=user_id)
     if weather_system_data:
         retrieved_context = f"{retrieved_context}\n\n{weather_system_data}".strip()
 
@@ -878,12 +1434,14 @@ async def process_user_text(
     if len(short_term_memory[user_id]) > OVERFLOW_TRIGGER:
         overflow_logs = list(short_term_memory[user_id])[:OVERFLOW_DREAM_CHUNK]
         if overflow_logs:
-            asyncio.create_task(
-                run_dream_cycle_for_logs(
+            dream_runner.submit(
+                f"dream:{user_id}",
+                lambda: run_dream_cycle_for_logs(
                     user_id=user_id,
                     logs=overflow_logs,
                     clear_short_term=False,
-                )
+                ),
+                label=f"overflow dream user={user_id}",
             )
         short_term_memory[user_id] = deque(
             list(short_term_memory[user_id])[-SHORT_TERM_TURNS:],
@@ -892,6 +1450,7 @@ async def process_user_text(
 
     log_chat(user_id, "user", user_text)
     log_chat(user_id, "assistant", reply)
+    schedule_spontaneity_check(context.application, user_id, last_time=datetime.now(timezone.utc))
 
     await deliver_reply(
         update,
@@ -949,7 +1508,7 @@ async def handle_audio_message(update: Update, context: ContextTypes.DEFAULT_TYP
     )
 
 
-async def heartbeat_job() -> None:
+async def heartbeat_job(app: Application) -> None:
     # Reload environment to get latest settings from .env file
     reload_env()
     
@@ -967,10 +1526,10 @@ async def heartbeat_job() -> None:
     except Exception:
         healthy = False
 
-    if not healthy and telegram_app:
+    if not healthy:
         for user_id in list_users_with_logs():
             try:
-                await telegram_app.bot.send_message(
+                await app.bot.send_message(
                     chat_id=int(user_id),
                     text="⚠️ Brain offline. Please check server.",
                 )
@@ -978,53 +1537,316 @@ async def heartbeat_job() -> None:
                 continue
 
 
-async def spontaneity_job() -> None:
-    for user_id in list_users_with_logs():
-        profile = get_user_profile(user_id)
-        emotional_state = emotional_core.load()
-        attachment_level = float(emotional_state.get("attachment_level", 5.0))
-        mood = str(emotional_state.get("current_mood", "warm and attentive"))
+async def spontaneity_for_user(
+    app: Application,
+    user_id: str,
+    last_time: datetime | None = None,
+    now: datetime | None = None,
+    loops_only: bool = False,
+) -> str:
+    """Evaluate one user for a spontaneous message sent through ``app``.
+
+    ``now`` is the user's local time
+    (aware, see to_user_local). ``loops_only`` stops after the open
+    loop follow-up path. Returns the furthest stage reached: "skipped", "shed"
+    (LLM busy, optional work dropped), "generated" (thought made but not
+    delivered) or "sent". Blocking LLM/vector calls run in worker threads.
+    """
+    profile = get_user_profile(user_id)
+    emotional_state = emotional_core.load()
+    attachment_level = float(emotional_state.get("attachment_level", 5.0))
+    mood = str(emotional_state.get("current_mood", "warm and attentive"))
+    if last_time is None:
         last_time = get_last_interaction_time(user_id)
 
-        due_loop = brain.get_due_open_loop()
-        if due_loop:
-            topic = str(due_loop.get("topic", "")).strip()
+    due_loop = brain.get_due_open_loop(user_id=user_id)
+    if due_loop:
+        topic = str(due_loop.get("topic", "")).strip()
+        claim = topic.lower()
+        # Open loops are shared, so only one concurrent evaluation may follow up on each.
+        if claim in inflight_loop_topics:
+            return "skipped"
+        inflight_loop_topics.add(claim)
+        try:
             expected_time = str(due_loop.get("expected_time", "soon")).strip() or "soon"
-            thought = brain.generate_loop_followup(topic=topic, expected_time=expected_time)
-            if thought and telegram_app:
-                try:
-                    await telegram_app.bot.send_message(chat_id=int(user_id), text=thought)
-                    log_chat(user_id, "assistant", thought)
-                    emotional_core.close_loop(topic)
-                except Exception:
-                    pass
-            continue
+            thought = await to_thread_with_priority(
+                PRIORITY_LOOP_FOLLOWUP,
+                brain.generate_loop_followup,
+                topic=topic,
+                expected_time=expected_time,
+            )
+            if not thought:
+                return "skipped"
+            try:
+                await app.bot.send_message(chat_id=int(user_id), text=thought)
+                log_chat(user_id, "assistant", thought)
+                emotional_core.close_loop(topic)
+                schedule_spontaneity_check(app, user_id)
+                return "sent"
+            except Exception:
+                return "generated"
+        finally:
+            inflight_loop_topics.discard(claim)
 
-        if not brain.decide_to_message(last_time, attachment_level):
-            continue
+    if loops_only:
+        return "skipped"
 
-        location = profile.get("location", "").strip()
-        weather = get_weather(location) if location else "Unknown"
-        gap = format_gap_since(last_time)
+    if not brain.decide_to_message(last_time, attachment_level, now=now, user_id=user_id):
+        return "skipped"
+
+    location = profile.get("location", "").strip()
+    weather = await weather_service.aget(location) if location else "Unknown"
+    gap = format_gap_since(last_time)
 
-        thought = ""
+    thought = ""
+    try:
         if not emotional_core.get_pending_loops() and random.random() < 0.05:
-            memory_summary = memory_engine.get_random_memory_summary(user_id=user_id)
+            memory_summary = await memory.call(memory_engine.get_random_memory_summary, user_id=user_id)
             if memory_summary:
-                thought = brain.generate_reminiscence_thought(memory_summary)
+                thought = await to_thread_with_priority(
+                    PRIORITY_SPONTANEITY, brain.generate_reminiscence_thought, memory_summary
+                )
 
         if not thought:
-            thought = brain.generate_spontaneous_thought(gap=gap, mood=mood, weather=weather)
+            thought = await to_thread_with_priority(
+                PRIORITY_SPONTANEITY,
+                brain.generate_spontaneous_thought,
+                gap=gap,
+                mood=mood,
+                weather=weather,
+            )
+    except LLMShedError as e:
+        print(f"[Spontaneity] user={user_id} shed: {e}")
+        return "shed"
 
-        if not thought:
-            continue
+    if not thought:
+        return "skipped"
 
-        if telegram_app:
+    try:
+        await app.bot.send_message(chat_id=int(user_id), text=thought)
+        log_chat(user_id, "assistant", thought)
+        schedule_spontaneity_check(app, user_id)
+        return "sent"
+    except Exception:
+        return "generated"
+
+
+async def legacy_loop_followups(app: Application) -> None:
+    """Follow up on due open loops that have no owning user (saved before loops
+    recorded one) by offering them to every known user. Regular check-ins are
+    per-user date jobs; owned loops go straight to their user."""
+    if not brain.get_due_open_loop():
+        return
+
+    activity = get_user_last_activity()
+    if not activity:
+        return
+
+    last_times = {user_id: brain._parse_timestamp(value) for user_id, value in activity.items()}
+    users = list(last_times)
+
+    semaphore = spontaneity_slots
+    timeout = get_spontaneity_user_timeout()
+    summary = {
+        "evaluated": len(users),
+        "skipped": 0,
+        "shed": 0,
+        "generated": 0,
+        "sent": 0,
+        "timed_out": 0,
+        "failed": 0,
+    }
+    started = time.monotonic()
+
+    async def evaluate(user_id: str) -> None:
+        async with semaphore:
             try:
-                await telegram_app.bot.send_message(chat_id=int(user_id), text=thought)
-                log_chat(user_id, "assistant", thought)
-            except Exception:
-                continue
+                outcome = await asyncio.wait_for(
+                    spontaneity_for_user(
+                        app,
+                        user_id,
+                        last_time=last_times.get(user_id),
+                        loops_only=True,
+                    ),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                summary["timed_out"] += 1
+                print(f"[Spontaneity] user={user_id} timed out after {timeout:.0f}s")
+                return
+            except Exception as e:
+                summary["failed"] += 1
+                print(f"[Spontaneity] user={user_id} failed: {e}")
+                return
+            if outcome in ("skipped", "shed"):
+                summary[outcome] += 1
+                return
+            summary["generated"] += 1
+            if outcome == "sent":
+                summary["sent"] += 1
+
+    await asyncio.gather(*(evaluate(user_id) for user_id in users))
+    elapsed = time.monotonic() - started
+    print(
+        f"[Open Loops] Legacy follow-up run finished in {elapsed:.1f}s ({len(users)} candidate(s)): "
+        + ", ".join(f"{key}={value}" for key, value in summary.items())
+    )
+
+
+def resolve_user_timezone(user_id: str) -> ZoneInfo | None:
+    """The user's configured time zone, or None for server local time."""
+    name = str(get_user_profile(user_id).get("timezone", "") or "").strip()
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def to_user_local(value: datetime | None, tz: ZoneInfo | None) -> datetime | None:
+    """Convert to an aware datetime in the user's zone (the server's if unknown).
+
+    The only place check-in times change zone. Timestamps are aware UTC (see
+    Brain._parse_timestamp); a naive value is taken as UTC too, like the
+    SQLite CURRENT_TIMESTAMP strings it would have come from.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(tz)
+
+
+def schedule_spontaneity_check(
+    app: Application,
+    user_id: str,
+    last_time: datetime | None = None,
+    not_before: datetime | None = None,
+) -> None:
+    """(Re)register the single date job that evaluates this user for a check-in.
+
+    The run time is the first moment decide_to_message could say yes (past the
+    minimum gap, outside quiet hours in the user's time zone), so idle users
+    cost nothing until then. Called on every interaction.
+    """
+    if not app.job_queue:
+        return
+    if last_time is None:
+        last_time = get_last_interaction_time(user_id)
+
+    tz = resolve_user_timezone(user_id)
+    now_local = to_user_local(datetime.now(timezone.utc), tz)
+    earliest = to_user_local(not_before, tz) if not_before else now_local
+    run_at = brain.next_eligible_check_time(to_user_local(last_time, tz), now=max(earliest, now_local))
+
+    app.job_queue.scheduler.add_job(
+        spontaneity_check_job,
+        "date",
+        run_date=run_at,
+        id=f"spontaneity:{user_id}",
+        replace_existing=True,
+        jobstore="memory",
+        kwargs={"app": app, "user_id": user_id},
+        misfire_grace_time=3600,
+    )
+
+
+async def spontaneity_check_job(app: Application, user_id: str) -> None:
+    tz = resolve_user_timezone(user_id)
+    last_time = get_last_interaction_time(user_id)
+    outcome = "skipped"
+    try:
+        async with spontaneity_slots:
+            outcome = await asyncio.wait_for(
+                spontaneity_for_user(
+                    app,
+                    user_id,
+                    last_time=to_user_local(last_time, tz),
+                    now=to_user_local(datetime.now(timezone.utc), tz),
+                ),
+                timeout=get_spontaneity_user_timeout(),
+            )
+    except asyncio.TimeoutError:
+        print(f"[Spontaneity] user={user_id} timed out")
+    except Exception as e:
+        print(f"[Spontaneity] user={user_id} failed: {e}")
+
+    if outcome != "sent":
+        # Not chosen this time: roll again later, like the old hourly sweep did.
+        schedule_spontaneity_check(
+            app,
+            user_id,
+            last_time=last_time,
+            not_before=datetime.now(timezone.utc) + timedelta(minutes=get_spontaneity_recheck_minutes()),
+        )
+
+
+def schedule_loop_followup(app: Application, backoff: bool = False) -> None:
+    """Arm one date job for the earliest pending open loop's due time.
+
+    Due times are parsed once when a loop is added, so this fires exactly when
+    a follow-up is owed (pushed out of quiet hours) instead of polling hourly.
+    """
+    if not app.job_queue:
+        return
+    scheduler = app.job_queue.scheduler
+    due_at = emotional_core.next_due_time()
+    if due_at is None:
+        if scheduler.get_job("loop_followup", jobstore="memory"):
+            scheduler.remove_job("loop_followup", jobstore="memory")
+        return
+
+    now = datetime.now()
+    if due_at <= now:
+        # Already due: run now, or after a back-off if we just tried and failed.
+        due_at = now + timedelta(minutes=get_spontaneity_recheck_minutes()) if backoff else now
+    run_at = brain.next_eligible_check_time(None, now=due_at).astimezone()
+    scheduler.add_job(
+        loop_followup_job,
+        "date",
+        run_date=run_at,
+        id="loop_followup",
+        replace_existing=True,
+        jobstore="memory",
+        kwargs={"app": app},
+        misfire_grace_time=3600,
+    )
+
+
+def schedule_loop_followups() -> None:
+    """Re-arm the open-loop job on every bot after loops were added."""
+    for app in bot_apps.values():
+        schedule_loop_followup(app)
+
+
+async def loop_followup_job(app: Application) -> None:
+    due_loops = emotional_core.get_due_loops()
+    owners = {str(loop.get("user_id", "") or "") for loop in due_loops}
+    for user_id in sorted(owner for owner in owners if owner):
+        try:
+            await spontaneity_for_user(app, user_id, loops_only=True)
+        except Exception as e:
+            print(f"[Open Loops] Follow-up failed for user={user_id}: {e}")
+    if "" in owners:
+        await legacy_loop_followups(app)
+
+    # Anything still due failed to send; retry after a back-off rather than spinning.
+    schedule_loop_followup(app, backoff=bool(emotional_core.get_due_loops()))
+
+
+def seed_spontaneity_schedule(app: Application) -> None:
+    """Register a check for every known user once at startup."""
+    activity = get_user_last_activity()
+    for user_id, value in activity.items():
+        schedule_spontaneity_check(app, user_id, last_time=brain._parse_timestamp(value))
+    print(f"[Spontaneity] {bot_name_of(app)}: scheduled check-ins for {len(activity)} user(s)")
+
+
+async def weather_refresh_job() -> None:
+    refreshed = await weather_service.refresh_known()
+    if refreshed:
+        print(f"[Weather] Refreshed {refreshed} location(s) in background ({weather_service.stats})")
 
 
 async def consolidate_memory_job() -> None:
@@ -1040,7 +1862,9 @@ async def run_dream_cycle(user_id: str) -> None:
         print(f"[Dream Cycle] No logs found for user={user_id}. Skipping.")
         return
 
-    dream_summary = brain.run_dream_cycle(chat_logs=day_logs, user_id=user_id, date=day_iso)
+    dream_summary = await to_thread_with_priority(
+        PRIORITY_CONSOLIDATION, brain.run_dream_cycle, chat_logs=day_logs, user_id=user_id, date=day_iso
+    )
     print(f"[Dream Cycle] Summary generated for user={user_id}.")
 
     current_profile = get_user_profile(user_id)
@@ -1070,8 +1894,40 @@ async def run_dream_cycle(user_id: str) -> None:
 
 
 async def run_dream_cycle_for_all_users() -> None:
+    dedup_before = dict(memory_engine.dedup_stats)
+    await consolidation_planner.run(list_users_with_logs(), run_dream_cycle)
+    dedup = {key: value - dedup_before.get(key, 0) for key, value in memory_engine.dedup_stats.items()}
+    if dedup["incoming"]:
+        rate = (dedup["merged"] + dedup["skipped"]) / dedup["incoming"]
+        print(f"[Consolidation] Fact dedup: {dedup} ({rate:.0%} deduplicated)")
+    schedule_loop_followups()
+
+
+async def compact_memory_job() -> None:
+    """Roll old daily journals into weekly/monthly summaries, one user at a time."""
+    totals = {"users": 0, "week": 0, "month": 0, "archived": 0}
     for user_id in list_users_with_logs():
-        await run_dream_cycle(user_id)
+        try:
+            stats = await to_thread_with_priority(PRIORITY_CONSOLIDATION, brain.compact_journals, user_id)
+        except Exception as e:
+            print(f"[Compaction] Failed for user={user_id}: {e}")
+            continue
+        if stats["archived"]:
+            totals["users"] += 1
+            for key in ("week", "month", "archived"):
+                totals[key] += stats[key]
+    print(
+        f"[Compaction] {totals['week']} weekly and {totals['month']} monthly summaries for "
+        f"{totals['users']} user(s); {totals['archived']} journal entries moved to the archive"
+    )
+
+
+async def run_goodnight_dream(user_id: str, logs: List[Dict[str, str]]) -> None:
+    await to_thread_with_priority(
+        PRIORITY_CONSOLIDATION, brain.run_dream_cycle, chat_logs=logs, user_id=user_id
+    )
+    # The dream may have opened new loops.
+    schedule_loop_followups()
 
 
 async def run_dream_cycle_for_logs(
@@ -1083,7 +1939,9 @@ async def run_dream_cycle_for_logs(
         return
 
     day_iso = datetime.now().date().isoformat()
-    dream_summary = brain.run_dream_cycle(chat_logs=logs, user_id=user_id, date=day_iso)
+    dream_summary = await to_thread_with_priority(
+        PRIORITY_CONSOLIDATION, brain.run_dream_cycle, chat_logs=logs, user_id=user_id, date=day_iso
+    )
     current_profile = get_user_profile(user_id)
     merged_summary = "\n".join(
         [
@@ -1104,6 +1962,8 @@ async def run_dream_cycle_for_logs(
         day_summary=dream_summary,
     )
 
+    schedule_loop_followups()
+
     if clear_short_term:
         short_term_memory[user_id].clear()
 
@@ -1114,15 +1974,20 @@ def get_db_path(bot_name: str = "pebble") -> str:
     return f"sqlite:///data/{bot_name.lower()}.db"
 
 
-def setup_scheduler(app: Application, bot_name: str = "pebble") -> AsyncIOScheduler:
-    """Setup scheduler with bot-specific database."""
+def setup_scheduler(app: Application, bot_name: str = "pebble", shared_jobs: bool = True) -> AsyncIOScheduler:
+    """Setup scheduler with bot-specific database.
+
+    ``shared_jobs`` registers the process-wide jobs (nightly consolidation,
+    weather refresh). With several bots in one process only the first bot's
+    scheduler runs them, since the memory and weather cache are shared.
+    """
     scheduler = app.job_queue.scheduler
     scheduler.configure(
         jobstores={
             "default": SQLAlchemyJobStore(url=get_db_path(bot_name)),
             "memory": MemoryJobStore(),
         },
-        timezone="America/Los_Angeles",
+        timezone=get_scheduler_timezone(),
     )
     scheduler.add_job(
         heartbeat_job,
@@ -1131,24 +1996,49 @@ def setup_scheduler(app: Application, bot_name: str = "pebble") -> AsyncIOSchedu
         id="heartbeat",
         replace_existing=True,
         jobstore="memory",
+        kwargs={"app": app},
     )
+    # Half the horizon, so every reminder is armed at least one sweep before it is due.
     scheduler.add_job(
-        consolidate_memory_job,
-        "cron",
-        hour=4,
-        minute=0,
-        id="dream_cycle",
-        replace_existing=True,
-        jobstore="memory",
-    )
-    scheduler.add_job(
-        spontaneity_job,
+        arm_upcoming_reminders,
         "interval",
-        minutes=60,
-        id="spontaneity",
+        minutes=get_reminder_arm_horizon_hours() * 30,
+        id="reminder_sweep",
         replace_existing=True,
         jobstore="memory",
+        kwargs={"app": app},
     )
+    if shared_jobs:
+        scheduler.add_job(
+            consolidate_memory_job,
+            "cron",
+            hour=4,
+            minute=0,
+            id="dream_cycle",
+            replace_existing=True,
+            jobstore="memory",
+        )
+        if get_memory_compaction_enabled():
+            scheduler.add_job(
+                compact_memory_job,
+                "cron",
+                day_of_week="sun",
+                hour=5,
+                minute=0,
+                id="memory_compaction",
+                replace_existing=True,
+                jobstore="memory",
+            )
+        scheduler.add_job(
+            weather_refresh_job,
+            "interval",
+            minutes=get_weather_refresh_minutes(),
+            id="weather_refresh",
+            replace_existing=True,
+            jobstore="memory",
+        )
+    # Check-ins and open-loop follow-ups are event-driven date jobs, see
+    # schedule_spontaneity_check and schedule_loop_followup.
     scheduler.start()
     return scheduler
 
@@ -1156,6 +2046,7 @@ def setup_scheduler(app: Application, bot_name: str = "pebble") -> AsyncIOSchedu
 # Graceful shutdown handler
 def graceful_shutdown(sig, frame):
     print("\n[Shutdown] Caught interrupt — cleaning up...")
+    memory.executor.shutdown(wait=False, cancel_futures=True)
     sys.exit(0)
 
 # Register signal handlers
@@ -1163,33 +2054,46 @@ signal.signal(signal.SIGINT, graceful_shutdown)
 signal.signal(signal.SIGTERM, graceful_shutdown)
 
 
-async def run(bot_name: str = "pebble") -> None:
-    """Run the bot with a specific bot name.
-    
-    Args:
-        bot_name: The name of the bot configuration to use (from bots_config.json)
-    """
+def build_application(bot_token: str, update_mode: str = "polling") -> Application:
+    """Build the telegram Application with ingestion settings from config."""
+    builder = ApplicationBuilder().token(bot_token)
+
+    api_base_url = get_telegram_api_base_url().rstrip("/")
+    if api_base_url:
+        # Lets the bot talk to a local/fake Bot API server (e.g. for tests).
+        builder = builder.base_url(f"{api_base_url}/bot").base_file_url(f"{api_base_url}/file/bot")
+
+    concurrent_updates = get_concurrent_updates()
+    if concurrent_updates > 1:
+        builder = builder.concurrent_updates(concurrent_updates)
+
+    if update_mode == "webhook":
+        # Updates are pushed onto app.update_queue by webhook_server instead.
+        builder = builder.updater(None)
+
+    return builder.build()
+
+
+def resolve_bot_token(bot_name: str) -> str:
     from tools import get_bot_config
-    
-    # Get bot configuration
+
     bot_config = get_bot_config(bot_name)
     if not bot_config:
         raise RuntimeError(f"Bot '{bot_name}' not found in bots_config.json. Please add it first in the GUI.")
-    
+
     bot_token = bot_config.get("token")
     if not bot_token:
         raise RuntimeError(f"Bot '{bot_name}' has no token configured. Please add it in the GUI.")
-    
-    if not bot_token:
-        raise RuntimeError("TELEGRAM_BOT_TOKEN is missing. Set it in your environment.")
+    return bot_token
 
-    global telegram_app
 
-    print(f"[Bot] Starting bot: {bot_name}")
-    init_db()
-    app = ApplicationBuilder().token(bot_token).build()
-    telegram_app = app
-    setup_scheduler(app, bot_name)
+async def start_bot(bot_name: str, mode: str, shared_jobs: bool = True) -> Application:
+    """Build, wire and start one bot's Application (polling starts here too)."""
+    app = build_application(resolve_bot_token(bot_name), update_mode=mode)
+    app.bot_data["bot_name"] = bot_name
+    bot_apps[bot_name] = app
+    setup_scheduler(app, bot_name, shared_jobs=shared_jobs)
+    rearm_reminders(app)
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("reset", reset_command))
@@ -1197,7 +2101,11 @@ async def run(bot_name: str = "pebble") -> None:
     app.add_handler(CommandHandler("voice", voice_command))
     app.add_handler(CommandHandler("test", test_command))
     app.add_handler(CommandHandler("location", location_command))
+    app.add_handler(CommandHandler("timezone", timezone_command))
+    app.add_handler(CommandHandler("reminders", reminders_command))
+    app.add_handler(CommandHandler("cancelreminder", cancel_reminder_command))
     app.add_handler(CommandHandler("resetnames", resetnames_command))
+    app.add_handler(CommandHandler("status", status_command))
     # Debug: catch ALL callbacks first
     app.add_handler(CallbackQueryHandler(handle_voice_callback))
     # app.add_handler(CallbackQueryHandler(handle_voice_callback, pattern=r"^voice_(mode|sel):"))
@@ -1217,14 +2125,122 @@ async def run(bot_name: str = "pebble") -> None:
             BotCommand("new", "Clear short-term chat memory"),
             BotCommand("voice", "Open voice mode and voice preset controls"),
             BotCommand("resetnames", "Reset bot and user names"),
+            BotCommand("status", "Show background work status"),
+            BotCommand("reminders", "List your reminders"),
+            BotCommand("cancelreminder", "Cancel a reminder by id"),
         ]
     )
     await app.start()
-    await app.updater.start_polling()
+    if mode == "polling":
+        await app.updater.start_polling()
+    print(f"[Bot] {bot_name} started ({mode})")
+    return app
+
+
+def _report_memory_warmup(task: asyncio.Task) -> None:
+    """Log a warm-up task that died (e.g. the pool shut down); the engine still loads lazily."""
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"[Memory Engine] Warm-up task failed: {error!r}")
+
+
+def _report_webhook_server_exit(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"[Webhook] Server crashed: {error!r}")
+
+
+async def _stop_webhook_server(server, webhook_task: asyncio.Task, apps: List[Application]) -> None:
+    """Stop uvicorn and tell Telegram to stop sending updates to it."""
+    server.should_exit = True
+    try:
+        await asyncio.wait_for(asyncio.shield(webhook_task), timeout=10)
+    except asyncio.TimeoutError:
+        webhook_task.cancel()
+    except Exception:
+        pass  # already reported by _report_webhook_server_exit
+    for app in apps:
+        try:
+            await app.bot.delete_webhook()
+        except Exception as e:
+            print(f"[Webhook] Failed to delete webhook for {app.bot_data.get('bot_name')}: {e}")
+
+
+async def run(bot_names: str | List[str] = "pebble", update_mode: str | None = None) -> None:
+    """Run one or more bots in this process.
+    
+    Args:
+        bot_names: Bot name(s) from bots_config.json. Several bots share the
+            embedder, vector store, emotional state and LLM pool; each keeps
+            its own scheduler job store.
+        update_mode: 'polling' or 'webhook'; defaults to TELEGRAM_UPDATE_MODE
+    """
+    names = [bot_names] if isinstance(bot_names, str) else list(bot_names)
+    if not names:
+        raise RuntimeError("No bots to run. Add one in the GUI first.")
+
+    mode = (update_mode or get_telegram_update_mode()).strip().lower()
+    if mode not in {"polling", "webhook"}:
+        raise RuntimeError(f"Unknown update mode '{mode}'. Use 'polling' or 'webhook'.")
+
+    print(f"[Bot] Starting bot(s): {', '.join(names)} ({mode})")
+    init_db()
+    for index, bot_name in enumerate(names):
+        await start_bot(bot_name, mode, shared_jobs=index == 0)
+
+    server = None
+    webhook_task: Optional[asyncio.Task] = None
+    registered: List[Application] = []
+    if mode == "webhook":
+        from webhook_server import build_webhook_server, register_webhook
+
+        secret = get_webhook_secret()
+        max_connections = get_webhook_max_connections()
+        # One server for every bot; each is routed by /telegram/<bot>.
+        server = build_webhook_server(
+            dict(bot_apps),
+            host=get_webhook_listen_host(),
+            port=get_webhook_listen_port(),
+            secret=secret,
+            max_connections=max_connections,
+        )
+        webhook_task = asyncio.create_task(server.serve())
+        webhook_task.add_done_callback(_report_webhook_server_exit)
+        for bot_name, app in bot_apps.items():
+            if await register_webhook(
+                app,
+                bot_name,
+                get_webhook_public_url(),
+                secret=secret,
+                max_connections=max_connections,
+            ):
+                registered.append(app)
+
+    # Load the embedder and open Chroma in the background; polling is already running.
+    memory_warmup = asyncio.create_task(memory.call(memory_engine.warm_up))
+    memory_warmup.add_done_callback(_report_memory_warmup)
+    dream_runner.start()
+    for app in bot_apps.values():
+        seed_spontaneity_schedule(app)
+        schedule_loop_followup(app)
 
     print("[Bot Ready] Pebble online ❤️")
-    while True:
-        await asyncio.sleep(3600)
+    try:
+        if webhook_task is None:
+            while True:
+                await asyncio.sleep(3600)
+        # uvicorn sets should_exit itself when it handles SIGINT/SIGTERM.
+        await asyncio.shield(webhook_task)
+        if not server.should_exit:
+            raise RuntimeError("Webhook server stopped unexpectedly")
+    finally:
+        if webhook_task is not None:
+            await _stop_webhook_server(server, webhook_task, registered)
+        await dream_runner.shutdown()
 
 
 if __name__ == "__main__":
@@ -1237,10 +2253,28 @@ if __name__ == "__main__":
         default="Pebble",
         help="Name of the bot to run (from bots_config.json)"
     )
+    parser.add_argument(
+        "--mode",
+        choices=["polling", "webhook"],
+        default=None,
+        help="How to receive updates (default: TELEGRAM_UPDATE_MODE or polling)",
+    )
+    parser.add_argument(
+        "--all-bots",
+        action="store_true",
+        help="Run every bot with a token in bots_config.json in this one process",
+    )
     args = parser.parse_args()
+
+    if args.all_bots:
+        from tools import get_bots_config
+
+        bot_names = [name for name, cfg in get_bots_config().items() if cfg.get("token")]
+    else:
+        bot_names = [args.bot_name]
     
     try:
-        asyncio.run(run(args.bot_name))
+        asyncio.run(run(bot_names, update_mode=args.mode))
     except KeyboardInterrupt:
         print("[Shutdown] Keyboard interrupt — exiting cleanly")
         sys.exit(0)
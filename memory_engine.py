@@ -2,37 +2,748 @@ from __future__ import annotations
 
 import os
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date as date_type
+from datetime import timedelta
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
 
 os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
 
-import chromadb
-from sentence_transformers import SentenceTransformer
+import httpx
+import numpy as np
+
+from config import (
+    get_embedding_backend,
+    get_embedding_batch_size,
+    get_embedding_dim,
+    get_embedding_cache_enabled,
+    get_embedding_cache_max_mb,
+    get_embedding_cache_memory_items,
+    get_embedding_model,
+    get_embedding_service_timeout,
+    get_embedding_service_url,
+    get_memory_dedup_threshold,
+    get_memory_hybrid_search,
+    get_memory_mmr_lambda,
+    get_memory_recency_floor,
+    get_memory_recency_half_life_days,
+    get_memory_rerank,
+    get_memory_rerank_overfetch,
+    get_memory_result_cache_similarity,
+    get_memory_result_cache_size,
+    get_memory_result_cache_ttl_seconds,
+    get_memory_retrieval_mode,
+    get_memory_rrf_k,
+    get_vector_store,
+)
+from embedding_backends import EmbeddingBackend, load_backend, truncate_embeddings
+from embedding_cache import EmbeddingCache, cache_tag
+from lexical_index import LexicalIndex, rrf_fuse
+from memory_rerank import mmr_select, recency_weights
+from retrieval_cache import RetrievalCache
+from vector_store import (
+    STORE_NAMES,
+    ChromaVectorStore,
+    NpyVectorStore,
+    StoreInUseError,
+    copy_collection,
+    open_vector_store,
+)
 
 
 BASE_DIR = Path(__file__).resolve().parent
 CHROMA_DIR = BASE_DIR / "data" / "chroma"
 
+UNIFIED_COLLECTION = "memories"
+KIND_DAILY_SUMMARY = "daily_summary"
+KIND_FACT = "fact"
+
+# Compacted journals keep kind=daily_summary and carry a "level" (no level = day).
+LEVEL_DAY = "day"
+LEVEL_WEEK = "week"
+LEVEL_MONTH = "month"
+
+# Relevance bonus for candidates that also matched on keywords (cosine scale).
+KEYWORD_MATCH_BONUS = 0.05
+
+
+class EmbeddingServiceClient:
+    """Client for embedding_service's /embed endpoint.
+
+    Returns None when the service can't be reached so the caller can embed
+    in-process; after a failure the service is skipped for a minute.
+    """
+
+    RETRY_AFTER_SECONDS = 60.0
+
+    def __init__(self, base_url: str, timeout: float = 10.0) -> None:
+        self.url = base_url.rstrip("/") + "/embed"
+        self._client = httpx.Client(timeout=timeout)
+        self._down_until = 0.0
+        # Cache tag (model + backend) of the vectors the service returns; None until it answers.
+        self.tag: Optional[str] = None
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            response = self._client.post(self.url, json={"texts": texts})
+            response.raise_for_status()
+            body = response.json()
+            embeddings = body["embeddings"]
+        except Exception as e:
+            print(f"[Memory Engine] Embedding service unavailable ({e}), embedding in-process")
+            self._down_until = time.monotonic() + self.RETRY_AFTER_SECONDS
+            return None
+        if len(embeddings) != len(texts):
+            print("[Memory Engine] Embedding service returned the wrong count, embedding in-process")
+            return None
+        # Services that predate the backend field get a tag of their own.
+        self.tag = cache_tag(str(body.get("model", "")), str(body.get("backend", "service")))
+        return embeddings
+
 
 class MemoryEngine:
-    def __init__(self, chroma_path: Path | None = None) -> None:
+    """Vector memory over Chroma, or the npy store (VECTOR_STORE, see vector_store.py).
+
+    Construction is cheap: the Chroma client, collections and embedding model
+    are opened on first use, or ahead of time by warm_up() (``ready`` is set
+    once that finishes), so importing/constructing never blocks startup.
+    """
+
+    def __init__(
+        self,
+        chroma_path: Path | None = None,
+        embedding_service_url: str | None = None,
+        embedding_dim: int | None = None,
+        vector_store: str | None = None,
+    ) -> None:
         self.chroma_path = chroma_path or CHROMA_DIR
         self.chroma_path.mkdir(parents=True, exist_ok=True)
+        self.vector_store = (vector_store or get_vector_store()).strip().lower()
+        if self.vector_store not in STORE_NAMES:
+            # Fail at startup rather than on the first (lazy) store open.
+            raise ValueError(f"Unknown VECTOR_STORE '{self.vector_store}'. Use one of: {', '.join(STORE_NAMES)}")
 
-        self.client = chromadb.PersistentClient(path=str(self.chroma_path))
-        self.embedder = SentenceTransformer(
-            "nomic-ai/nomic-embed-text-v1.5", trust_remote_code=True
+        self.embedding_model = get_embedding_model()
+        self.embedding_backend = get_embedding_backend()
+        self.embedding_batch_size = get_embedding_batch_size()
+        # Matryoshka output width (0 = the model's native width). Each width
+        # has its own collections, e.g. memories_256.
+        self.embedding_dim = get_embedding_dim() if embedding_dim is None else max(0, int(embedding_dim))
+        self.embedding_stats = {"texts": 0, "seconds": 0.0}
+        # Quantized backends give slightly different vectors; the cache keeps them apart.
+        self.embedding_tag = cache_tag(self.embedding_model, self.embedding_backend)
+        self.embedding_cache = (
+            EmbeddingCache(
+                self.embedding_tag,
+                dim=self.embedding_dim,
+                memory_items=get_embedding_cache_memory_items(),
+                max_disk_bytes=int(get_embedding_cache_max_mb() * 1024 * 1024),
+            )
+            if get_embedding_cache_enabled()
+            else None
         )
 
-        self.daily_journals = self.client.get_or_create_collection("daily_journals")
-        self.facts_and_goals = self.client.get_or_create_collection("facts_and_goals")
+        # With EMBEDDING_SERVICE_URL set, the model lives in the shared service
+        # and is only loaded here if the service is down.
+        service_url = get_embedding_service_url() if embedding_service_url is None else embedding_service_url
+        self.embedding_service = (
+            EmbeddingServiceClient(service_url, timeout=get_embedding_service_timeout()) if service_url else None
+        )
+        self.embedder: EmbeddingBackend | None = None
+        self._embedder_lock = threading.Lock()
+
+        # "unified": both kinds in one collection, usually one query per turn.
+        # "split": legacy per-kind collections, queried concurrently. Only
+        # honoured until something has been written to the unified collection.
+        self.unified = get_memory_retrieval_mode() == "unified"
+        self._query_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-query")
+        self._store_lock = threading.Lock()
+        self._store_open = False
+        self._client = None
+        self._daily_journals = None
+        self._facts_and_goals = None
+        self._memories = None
+        self._journal_archive = None
+        self.ready = threading.Event()
+
+        # BM25 keyword index over the same documents, fused with vector hits.
+        self.lexical = LexicalIndex() if get_memory_hybrid_search() else None
+        self.rrf_k = get_memory_rrf_k()
+
+        # Facts at or above this cosine similarity to a stored fact are folded into it.
+        self.dedup_threshold = get_memory_dedup_threshold()
+        self.dedup_stats = {"incoming": 0, "added": 0, "merged": 0, "skipped": 0}
+
+        # Recency-weighted MMR over an over-fetched candidate pool.
+        self.rerank = get_memory_rerank()
+        self.rerank_overfetch = get_memory_rerank_overfetch()
+        self.recency_half_life_days = get_memory_recency_half_life_days()
+        self.recency_floor = get_memory_recency_floor()
+        self.mmr_lambda = get_memory_mmr_lambda()
+
+        # Recent results per user; archive_day/archive_facts invalidate them.
+        self.result_cache = RetrievalCache(
+            max_entries=get_memory_result_cache_size(),
+            ttl_seconds=get_memory_result_cache_ttl_seconds(),
+            similarity=get_memory_result_cache_similarity(),
+        )
+
+    def _open_store(self, rebuild: bool = True) -> None:
+        """Open the store and collections, migrating or rebuilding them on first start.
+
+        ``rebuild=False`` skips the first-start rebuild at a new width, for
+        rebuild_for_dimension, which is about to do it anyway.
+        """
+        if self._store_open:
+            return
+        with self._store_lock:
+            if self._store_open:
+                return
+            self._client = open_vector_store(
+                self.vector_store, self.chroma_path if self.vector_store != "npy" else None
+            )
+            self._daily_journals = self._client.get_or_create_collection(self._collection_name("daily_journals"))
+            self._facts_and_goals = self._client.get_or_create_collection(self._collection_name("facts_and_goals"))
+            self._memories = self._client.get_or_create_collection(self._collection_name(UNIFIED_COLLECTION))
+            # Cold storage for journals rolled up by compaction; never queried per turn.
+            self._journal_archive = self._client.get_or_create_collection(self._collection_name("journal_archive"))
+            if not self.unified and self._memories.count():
+                # The unified collection is the only one written to after migration, so
+                # going back to split would hide every memory saved since. One-way switch.
+                print(
+                    "[Memory Engine] MEMORY_RETRIEVAL_MODE=split ignored: memories were already "
+                    "moved to the unified collection"
+                )
+                self.unified = True
+            if (
+                isinstance(self._client, NpyVectorStore)
+                and self._memories.count() + self._daily_journals.count() + self._facts_and_goals.count() == 0
+                and (self.chroma_path / "chroma.sqlite3").exists()
+            ):
+                # First start on the npy store: bring the existing Chroma memories along.
+                self.import_from_chroma()
+            target_empty = (
+                self._memories.count() == 0
+                if self.unified
+                else self._daily_journals.count() + self._facts_and_goals.count() == 0
+            )
+            if self.unified and target_empty and (self._daily_journals.count() or self._facts_and_goals.count()):
+                self.migrate_to_unified()
+            elif rebuild and self.embedding_dim and target_empty:
+                # First start at a new width: derive it from the full-width vectors.
+                self.rebuild_for_dimension()
+            if self.lexical is not None and self.lexical.count() == 0:
+                self._backfill_lexical()
+            self._store_open = True
+
+    @property
+    def client(self):
+        self._open_store()
+        return self._client
+
+    @property
+    def daily_journals(self):
+        self._open_store()
+        return self._daily_journals
+
+    @property
+    def facts_and_goals(self):
+        self._open_store()
+        return self._facts_and_goals
+
+    @property
+    def memories(self):
+        self._open_store()
+        return self._memories
+
+    @property
+    def journal_archive(self):
+        self._open_store()
+        return self._journal_archive
+
+    def warm_up(self) -> None:
+        """Open Chroma and load the embedder now instead of on the first message."""
+        started = time.perf_counter()
+        try:
+            self._open_store()
+            # Bypasses the cache so the model (or the service) is actually exercised.
+            self._encode(["warm up"])
+        except Exception as e:
+            print(f"[Memory Engine] Warm-up failed, will load on first use: {e}")
+            return
+        self.ready.set()
+        print(f"[Memory Engine] Ready in {time.perf_counter() - started:.1f}s")
+
+    def _local_embedder(self) -> EmbeddingBackend:
+        with self._embedder_lock:
+            if self.embedder is None:
+                self.embedder = load_backend(self.embedding_backend, model_id=self.embedding_model)
+            return self.embedder
+
+    def _cache_tag(self) -> Optional[str]:
+        """Cache tag of the vectors _encode would return now; None if that isn't known yet."""
+        if self.embedding_service is not None and self.embedding_service.available():
+            return self.embedding_service.tag
+        return self.embedding_tag
+
+    def _encode(self, texts: List[str]) -> Tuple[List[List[float]], str]:
+        """Vectors for texts, and the cache tag of whichever backend produced them."""
+        matrix = None
+        tag = self.embedding_tag
+        if self.embedding_service is not None:
+            vectors = self.embedding_service.embed(texts)
+            if vectors is not None:
+                matrix = np.asarray(vectors, dtype=np.float32)
+                tag = self.embedding_service.tag or tag
+        if matrix is None:
+            matrix = self._local_embedder().encode(texts, batch_size=self.embedding_batch_size)
+        if self.embedding_dim:
+            matrix = truncate_embeddings(matrix, self.embedding_dim)
+        return matrix.tolist(), tag
 
     def _embed(self, text: str) -> List[float]:
-        vector = self.embedder.encode(text, convert_to_numpy=True, normalize_embeddings=True)
-        return vector.tolist()
+        lookup_tag = self._cache_tag()
+        if self.embedding_cache is not None and lookup_tag:
+            cached = self.embedding_cache.get_many([text], tag=lookup_tag)[0]
+            if cached is not None:
+                return cached
+        vectors, tag = self._encode([text])
+        if self.embedding_cache is not None:
+            self.embedding_cache.put_many([text], vectors, tag=tag)
+        return vectors[0]
+
+    def _embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed many texts in batches; every write path and batched retrieval goes through here.
+
+        Texts are sorted by length so each batch pads to similar sizes, and the
+        results are returned in the original order.
+        """
+        if not texts:
+            return []
+
+        started = time.perf_counter()
+        lookup_tag = self._cache_tag()
+        if self.embedding_cache is not None and lookup_tag:
+            cached = self.embedding_cache.get_many(texts, tag=lookup_tag)
+        else:
+            cached = [None] * len(texts)
+        vectors: List[List[float]] = [vector or [] for vector in cached]
+        missing = [idx for idx, vector in enumerate(cached) if vector is None]
+        if not missing:
+            return vectors
+
+        order = sorted(missing, key=lambda idx: len(texts[idx]))
+        for start in range(0, len(order), self.embedding_batch_size):
+            chunk = order[start : start + self.embedding_batch_size]
+            chunk_texts = [texts[i] for i in chunk]
+            chunk_vectors, tag = self._encode(chunk_texts)
+            for idx, vector in zip(chunk, chunk_vectors):
+                vectors[idx] = vector
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(chunk_texts, chunk_vectors, tag=tag)
+
+        elapsed = time.perf_counter() - started
+        self.embedding_stats["texts"] += len(missing)
+        self.embedding_stats["seconds"] += elapsed
+        rate = len(missing) / elapsed if elapsed > 0 else 0.0
+        print(
+            f"[Memory Engine] Embedded {len(missing)} text(s) in {elapsed:.2f}s "
+            f"({rate:.1f} emb/s, batch={self.embedding_batch_size}, "
+            f"{len(texts) - len(missing)} cached)"
+        )
+        return vectors
+
+    def _collection_name(self, base: str) -> str:
+        return f"{base}_{self.embedding_dim}" if self.embedding_dim else base
+
+    def _target_for(self, kind: str):
+        # Private attributes: also used while the store is being opened.
+        if self.unified:
+            return self._memories
+        return self._daily_journals if kind == KIND_DAILY_SUMMARY else self._facts_and_goals
+
+    def _collection_for(self, kind: str):
+        self._open_store()
+        return self._target_for(kind)
+
+    def _copy_into_store(self, source, default_kind: str, reembed: bool = False, page_size: int = 500) -> int:
+        """Upsert every record of ``source`` into this engine's collection(s), keeping ids.
+
+        Stored vectors are reused (truncated to embedding_dim if wider), unless
+        ``reembed`` is set or the source has none, in which case the documents
+        are embedded again.
+        """
+        copied = 0
+        offset = 0
+        while True:
+            batch = source.get(
+                include=["documents", "embeddings", "metadatas"],
+                limit=page_size,
+                offset=offset,
+            )
+            ids = batch.get("ids") or []
+            if not ids:
+                break
+            documents = [str(doc) for doc in batch["documents"]]
+            metadatas = [
+                {**(metadata or {}), "kind": (metadata or {}).get("kind") or default_kind}
+                for metadata in batch["metadatas"]
+            ]
+            embeddings = batch.get("embeddings")
+            if reembed or embeddings is None or len(embeddings) != len(ids):
+                vectors = self._embed_many(documents)
+            else:
+                matrix = np.asarray(embeddings, dtype=np.float32)
+                if self.embedding_dim and matrix.shape[1] > self.embedding_dim:
+                    matrix = truncate_embeddings(matrix, self.embedding_dim)
+                vectors = matrix.tolist()
+
+            by_target: Dict[int, tuple] = {}
+            for idx, metadata in enumerate(metadatas):
+                target = self._target_for(str(metadata["kind"]))
+                by_target.setdefault(id(target), (target, []))[1].append(idx)
+            for target, indices in by_target.values():
+                target.upsert(
+                    ids=[ids[i] for i in indices],
+                    documents=[documents[i] for i in indices],
+                    embeddings=[vectors[i] for i in indices],
+                    metadatas=[metadatas[i] for i in indices],
+                )
+            copied += len(ids)
+            offset += len(ids)
+        return copied
+
+    def import_from_chroma(self) -> int:
+        """Copy this width's collections, ids and vectors as-is, from Chroma into the current store."""
+        try:
+            source = ChromaVectorStore(self.chroma_path)
+        except ImportError:
+            print("[Memory Engine] chromadb is not installed; starting the npy store empty")
+            return 0
+        available = set(source.list_collection_names())
+        copied = 0
+        for base in ("daily_journals", "facts_and_goals", UNIFIED_COLLECTION, "journal_archive"):
+            name = self._collection_name(base)
+            if name in available:
+                copied += copy_collection(
+                    source.get_or_create_collection(name), self._client.get_or_create_collection(name)
+                )
+        print(f"[Memory Engine] Imported {copied} memories from Chroma into the {self.vector_store} store")
+        return copied
+
+    def migrate_to_unified(self, page_size: int = 500) -> int:
+        """Copy both legacy collections (with their stored embeddings) into `memories`.
+
+        Idempotent: ids are kept, so re-running only upserts. The legacy
+        collections are left in place as a backup but no longer written, so
+        the switch is one-way: split mode is ignored once `memories` has data.
+        """
+        if self._memories is None:
+            self._open_store()
+        migrated = self._copy_into_store(self._daily_journals, KIND_DAILY_SUMMARY, page_size=page_size)
+        migrated += self._copy_into_store(self._facts_and_goals, KIND_FACT, page_size=page_size)
+        print(f"[Memory Engine] Migrated {migrated} memories into the unified collection")
+        return migrated
+
+    def _backfill_lexical(self, page_size: int = 500) -> int:
+        """Index everything already in the vector store (first start with hybrid search)."""
+        targets = [self._memories] if self.unified else [self._daily_journals, self._facts_and_goals]
+        indexed = 0
+        for collection in targets:
+            offset = 0
+            while True:
+                batch = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                ids = batch.get("ids") or []
+                if not ids:
+                    break
+                self.lexical.add(ids, batch["documents"], batch["metadatas"])
+                indexed += len(ids)
+                offset += len(ids)
+        if indexed:
+            print(f"[Memory Engine] Built keyword index for {indexed} memories")
+        return indexed
+
+    def rebuild_for_dimension(self, reembed: bool = False) -> int:
+        """Fill this width's collections from the full-width ones.
+
+        By default the stored 768-d vectors are Matryoshka-truncated (no model
+        needed); ``reembed`` runs the documents through the model again, e.g.
+        after changing EMBEDDING_MODEL. With embedding_dim 0 and ``reembed``,
+        the full-width collections are re-embedded in place.
+        """
+        if self._client is None:
+            # Opening would otherwise run this same rebuild first (truncating, even for reembed).
+            self._open_store(rebuild=False)
+        full_unified = self._client.get_or_create_collection(UNIFIED_COLLECTION)
+        if full_unified.count():
+            sources = [(full_unified, KIND_FACT)]
+        else:
+            sources = [
+                (self._client.get_or_create_collection("daily_journals"), KIND_DAILY_SUMMARY),
+                (self._client.get_or_create_collection("facts_and_goals"), KIND_FACT),
+            ]
+        rebuilt = sum(self._copy_into_store(source, kind, reembed=reembed) for source, kind in sources)
+        self.result_cache.clear()
+        width = self.embedding_dim or "full"
+        print(f"[Memory Engine] Rebuilt {rebuilt} memories at dim={width} ({'re-embedded' if reembed else 'truncated'})")
+        return rebuilt
+
+    @staticmethod
+    def _hits_from(results: dict) -> List[Dict[str, object]]:
+        ids = (results.get("ids") or [[]])[0]
+        documents = (results.get("documents") or [[]])[0]
+        metadatas = (results.get("metadatas") or [[]])[0]
+        distances = (results.get("distances") or [[]])[0]
+        # Only present when the query asked for them; may be a NumPy array.
+        embeddings = results.get("embeddings")
+        embeddings = embeddings[0] if embeddings is not None and len(embeddings) else None
+        hits: List[Dict[str, object]] = []
+        for idx, document in enumerate(documents):
+            metadata = metadatas[idx] if idx < len(metadatas) and metadatas[idx] else {}
+            hit = {
+                "id": ids[idx] if idx < len(ids) else "",
+                "kind": metadata.get("kind", ""),
+                "document": document,
+                "distance": float(distances[idx]) if idx < len(distances) else 0.0,
+                "date": metadata.get("date", ""),
+                "user_id": metadata.get("user_id", ""),
+            }
+            if embeddings is not None and idx < len(embeddings):
+                hit["embedding"] = embeddings[idx]
+            hits.append(hit)
+        return hits
+
+    def _search(
+        self,
+        query_embedding: List[float],
+        k: int,
+        where: dict | None,
+        with_embeddings: bool = False,
+    ) -> List[Dict[str, object]]:
+        """Up to k nearest hits of each kind, nearest first.
+
+        Unified layout: one query over-fetching 2k, plus a kind-filtered query
+        only for a kind that came back short while more rows may exist. Legacy
+        layout: one query per collection, run concurrently. With
+        ``with_embeddings`` each hit also carries its stored vector.
+        """
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if with_embeddings else [])
+
+        def run(collection, kind: str | None, n_results: int) -> List[Dict[str, object]]:
+            clauses = ([where] if where else []) + ([{"kind": kind}] if kind and self.unified else [])
+            kwargs = {"where": clauses[0] if len(clauses) == 1 else {"$and": clauses}} if clauses else {}
+            found = self._hits_from(
+                collection.query(query_embeddings=[query_embedding], n_results=n_results, include=include, **kwargs)
+            )
+            for hit in found:
+                hit["kind"] = hit["kind"] or kind or ""
+            return found
+
+        if self.unified:
+            hits = run(self.memories, None, k * 2)
+            if len(hits) == k * 2:
+                # A full page: a kind that got fewer than k may have been crowded out.
+                seen = {str(hit["id"]) for hit in hits}
+                for kind in (KIND_DAILY_SUMMARY, KIND_FACT):
+                    if sum(1 for hit in hits if hit["kind"] == kind) < k:
+                        hits += [hit for hit in run(self.memories, kind, k) if str(hit["id"]) not in seen]
+        else:
+            futures = [
+                self._query_pool.submit(run, self.daily_journals, KIND_DAILY_SUMMARY, k),
+                self._query_pool.submit(run, self.facts_and_goals, KIND_FACT, k),
+            ]
+            hits = [hit for future in futures for hit in future.result()]
+
+        hits.sort(key=lambda hit: hit["distance"])
+        per_kind: Dict[str, int] = {}
+        capped: List[Dict[str, object]] = []
+        for hit in hits:
+            kind = str(hit["kind"])
+            if per_kind.get(kind, 0) >= k:
+                continue
+            per_kind[kind] = per_kind.get(kind, 0) + 1
+            capped.append(hit)
+        return capped
+
+    def _fuse(
+        self,
+        dense: List[Dict[str, object]],
+        lexical: List[Dict[str, object]],
+        k: int,
+    ) -> List[Dict[str, object]]:
+        """Reciprocal-rank fusion of vector and keyword hits, capped at k per kind.
+
+        Each hit gains a ``score`` (RRF); keyword-only hits have distance None.
+        """
+        if not lexical:
+            return dense
+        scores = rrf_fuse([[str(hit["id"]) for hit in dense], [str(hit["id"]) for hit in lexical]], k=self.rrf_k)
+        by_id: Dict[str, Dict[str, object]] = {}
+        for hit in lexical:
+            by_id[str(hit["id"])] = {**hit, "distance": None}
+        for hit in dense:
+            by_id[str(hit["id"])] = {**by_id.get(str(hit["id"]), {}), **hit}
+
+        fused = sorted(by_id.values(), key=lambda hit: scores[str(hit["id"])], reverse=True)
+        per_kind: Dict[str, int] = {}
+        capped: List[Dict[str, object]] = []
+        for hit in fused:
+            kind = str(hit["kind"])
+            if per_kind.get(kind, 0) >= k:
+                continue
+            per_kind[kind] = per_kind.get(kind, 0) + 1
+            hit["score"] = round(scores[str(hit["id"])], 5)
+            capped.append(hit)
+        return capped
+
+    def _stored_embeddings(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Stored vectors by id, for candidates that came from the keyword index."""
+        if not ids:
+            return {}
+        collections = [self.memories] if self.unified else [self.daily_journals, self.facts_and_goals]
+        found: Dict[str, List[float]] = {}
+        for collection in collections:
+            try:
+                data = collection.get(ids=ids, include=["embeddings"])
+            except Exception as e:
+                print(f"[Memory Engine] Could not load candidate embeddings: {e}")
+                continue
+            embeddings = data.get("embeddings")
+            if embeddings is None:
+                continue
+            for doc_id, embedding in zip(data.get("ids") or [], embeddings):
+                found[str(doc_id)] = embedding
+        return found
+
+    def _rerank(
+        self,
+        query_embedding: List[float],
+        hits: List[Dict[str, object]],
+        k: int,
+    ) -> List[Dict[str, object]]:
+        """Pick up to k hits per kind by recency-weighted relevance and MMR diversity.
+
+        Relevance is cosine similarity to the query (plus a small bonus for
+        keyword matches), scaled by recency_weights(). Each kept hit gains a
+        ``relevance``; near-duplicates are dropped, so fewer than k may remain.
+        """
+        missing = [str(hit["id"]) for hit in hits if hit.get("embedding") is None]
+        if missing:
+            stored = self._stored_embeddings(missing)
+            for hit in hits:
+                if hit.get("embedding") is None and str(hit["id"]) in stored:
+                    hit["embedding"] = stored[str(hit["id"])]
+        hits = [hit for hit in hits if hit.get("embedding") is not None]
+        if not hits:
+            return []
+
+        matrix = np.asarray([hit.pop("embedding") for hit in hits], dtype=np.float32)
+        matrix /= np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+
+        keyword = np.asarray([1.0 if "bm25" in hit else 0.0 for hit in hits], dtype=np.float32)
+        relevance = (matrix @ query + KEYWORD_MATCH_BONUS * keyword) * recency_weights(
+            [str(hit.get("date") or "") for hit in hits],
+            date_type.today(),
+            half_life_days=self.recency_half_life_days,
+            floor=self.recency_floor,
+        )
+        order = mmr_select(
+            matrix,
+            relevance,
+            [str(hit["kind"]) for hit in hits],
+            per_kind=k,
+            mmr_lambda=self.mmr_lambda,
+        )
+        reranked = []
+        for idx in order:
+            hits[idx]["relevance"] = round(float(relevance[idx]), 4)
+            reranked.append(hits[idx])
+        return reranked
+
+    def retrieve_hits(self, query: str, user_id: str, k: int = 5) -> List[Dict[str, object]]:
+        """Structured retrieval: dicts with id, kind, document, distance, date, user_id.
+
+        Up to k daily summaries and k facts for the user, best first. With
+        hybrid search on, vector and BM25 keyword hits are rank-fused. With
+        reranking on, a larger candidate pool is narrowed by _rerank(). Falls
+        back to a small unfiltered vector search when the user has nothing yet.
+        Results for a repeated or near-identical query come from result_cache.
+        """
+        result = self.retrieve_hits_many([(query, user_id, k)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def retrieve_hits_many(self, requests: List[tuple]) -> List[List[Dict[str, object]] | Exception]:
+        """retrieve_hits for several (query, user_id, k) requests, in order.
+
+        Used when messages from different users arrive together: queries that
+        miss the result cache are embedded in one batch, then each request
+        runs its own filtered search. A request that fails gets its exception
+        in its slot instead of hits, so it can't fail the rest of the batch.
+        """
+        results: List[List[Dict[str, object]] | Exception] = [[] for _ in requests]
+        pending: List[int] = []
+        for idx, (query, user_id, k) in enumerate(requests):
+            if not query.strip():
+                continue
+            cached = self.result_cache.get_text(user_id, k, query)
+            if cached is not None:
+                results[idx] = cached
+            else:
+                pending.append(idx)
+        if not pending:
+            return results
+
+        embeddings: List[List[float] | None] = [None] * len(pending)
+        if len(pending) > 1:
+            try:
+                embeddings = self._embed_many([requests[idx][0] for idx in pending])
+            except Exception as e:
+                print(f"[Memory Engine] Batch query embedding failed, embedding one by one: {e}")
+        for idx, query_embedding in zip(pending, embeddings):
+            query, user_id, k = requests[idx]
+            try:
+                if query_embedding is None:
+                    query_embedding = self._embed(query)
+                results[idx] = self._hits_for(query, user_id, k, query_embedding)
+            except Exception as e:
+                results[idx] = e
+        return results
+
+    def _hits_for(self, query: str, user_id: str, k: int, query_embedding: List[float]) -> List[Dict[str, object]]:
+        generation = self.result_cache.generation(user_id)
+        cached = self.result_cache.get_similar(user_id, k, query_embedding)
+        if cached is not None:
+            return cached
+
+        pool = k * self.rerank_overfetch if self.rerank else k
+        hits = self._search(query_embedding, pool, where={"user_id": user_id}, with_embeddings=self.rerank)
+        if self.lexical is not None:
+            hits = self._fuse(hits, self.lexical.search(query, user_id=user_id, limit=pool * 2), pool)
+        if self.rerank and hits:
+            hits = self._rerank(query_embedding, hits, k)
+        if hits:
+            self.result_cache.put(user_id, k, query, query_embedding, hits, generation=generation)
+            return hits
+
+        print("[Memory Engine] No user-specific memories found, attempting broader search...")
+        try:
+            return self._search(query_embedding, 2, where=None)
+        except Exception as e:
+            print(f"[Memory Engine] Broader search failed: {e}")
+            return []
 
     def retrieve_relevant_context(self, query: str, user_id: str, k: int = 5) -> str:
         if not query.strip():
@@ -40,42 +751,15 @@ class MemoryEngine:
             return "[Past Related Events]: None\n[Relevant Facts]: None"
 
         print(f"[Memory Engine] Searching for relevant context (k={k}) for user: {user_id}")
-        query_embedding = [self._embed(query)]
-
-        event_results = self.daily_journals.query(
-            query_embeddings=query_embedding,
-            n_results=k,
-            where={"user_id": user_id},
-        )
-        fact_results = self.facts_and_goals.query(
-            query_embeddings=query_embedding,
-            n_results=k,
-            where={"user_id": user_id},
-        )
+        return self.format_context(self.retrieve_hits(query, user_id=user_id, k=k))
 
-        events = (event_results.get("documents") or [[]])[0]
-        facts = (fact_results.get("documents") or [[]])[0]
+    def format_context(self, hits: List[Dict[str, object]]) -> str:
+        """Render hits as the prompt's [Past Related Events] / [Relevant Facts] block."""
+        events = [str(hit["document"]) for hit in hits if hit["kind"] == KIND_DAILY_SUMMARY]
+        facts = [str(hit["document"]) for hit in hits if hit["kind"] != KIND_DAILY_SUMMARY]
 
         # Verbose logging of retrieval results
         print(f"[Memory Engine] Found {len(events)} events and {len(facts)} facts from vector search")
-        
-        # Fallback: if no results found, try without user filter to get any memories
-        if not events and not facts:
-            print("[Memory Engine] No user-specific memories found, attempting broader search...")
-            try:
-                broader_event_results = self.daily_journals.query(
-                    query_embeddings=query_embedding,
-                    n_results=2,
-                )
-                broader_fact_results = self.facts_and_goals.query(
-                    query_embeddings=query_embedding,
-                    n_results=2,
-                )
-                events = (broader_event_results.get("documents") or [[]])[0] or events
-                facts = (broader_fact_results.get("documents") or [[]])[0] or facts
-                print(f"[Memory Engine] Broader search found {len(events)} events and {len(facts)} facts")
-            except Exception as e:
-                print(f"[Memory Engine] Broader search failed: {e}")
 
         events_block = "\n- " + "\n- ".join(events) if events else " None"
         facts_block = "\n- " + "\n- ".join(facts) if facts else " None"
@@ -89,34 +773,310 @@ class MemoryEngine:
             return
 
         date_str = date.isoformat() if isinstance(date, date_type) else str(date)
-        self.daily_journals.add(
-            ids=[f"journal-{user_id}-{date_str}-{uuid4().hex[:8]}"],
+        ids = [f"journal-{user_id}-{date_str}-{uuid4().hex[:8]}"]
+        metadatas = [{"user_id": user_id, "date": date_str, "kind": KIND_DAILY_SUMMARY}]
+        self._collection_for(KIND_DAILY_SUMMARY).add(
+            ids=ids,
             documents=[summary_text],
-            embeddings=[self._embed(summary_text)],
-            metadatas=[{"user_id": user_id, "date": date_str, "kind": "daily_summary"}],
+            embeddings=self._embed_many([summary_text]),
+            metadatas=metadatas,
         )
+        if self.lexical is not None:
+            self.lexical.add(ids, [summary_text], metadatas)
+        self.result_cache.invalidate(user_id)
+
+    @staticmethod
+    def _similarity(collection, distance: float) -> float:
+        """Cosine similarity from a Chroma distance (vectors are unit length)."""
+        space = str((getattr(collection, "metadata", None) or {}).get("hnsw:space", "l2"))
+        if space in ("cosine", "ip"):
+            return 1.0 - float(distance)
+        # Chroma's default is squared L2, which is 2 - 2cos for unit vectors.
+        return 1.0 - float(distance) / 2.0
+
+    def archive_facts(self, facts: List[str], date: str | date_type, user_id: str) -> Dict[str, int]:
+        """Store facts, folding near-duplicates into what's already stored.
 
-    def archive_facts(self, facts: List[str], date: str | date_type, user_id: str) -> None:
+        Each new fact is compared (one batched query) with the user's nearest
+        stored fact. At or above MEMORY_DEDUP_THRESHOLD it is not added again.
+        Identical text only bumps seen_count/last_seen ("skipped"), and a new
+        phrasing replaces the stored one ("merged"). Near-duplicates within the
+        batch are dropped too. Returns the counts for this call.
+        """
         clean_facts = [fact.strip() for fact in facts if fact and fact.strip()]
+        stats = {"incoming": len(clean_facts), "added": 0, "merged": 0, "skipped": 0}
         if not clean_facts:
-            return
+            return stats
 
         date_str = date.isoformat() if isinstance(date, date_type) else str(date)
-        ids = [f"fact-{user_id}-{date_str}-{uuid4().hex[:8]}-{idx}" for idx, _ in enumerate(clean_facts)]
-        embeddings = [self._embed(item) for item in clean_facts]
-        metadatas = [{"user_id": user_id, "date": date_str, "kind": "fact"} for _ in clean_facts]
+        embeddings = self._embed_many(clean_facts)
+        collection = self._collection_for(KIND_FACT)
+        threshold = self.dedup_threshold
 
-        self.facts_and_goals.add(
-            ids=ids,
-            documents=clean_facts,
-            embeddings=embeddings,
-            metadatas=metadatas,
+        keep = list(range(len(clean_facts)))
+        matches: Dict[int, tuple] = {}
+        if threshold > 0:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            pairwise = matrix @ matrix.T
+            keep = []
+            for idx in range(len(clean_facts)):
+                if any(pairwise[idx, other] >= threshold for other in keep):
+                    stats["skipped"] += 1
+                    continue
+                keep.append(idx)
+
+            where = (
+                {"$and": [{"user_id": user_id}, {"kind": KIND_FACT}]}
+                if self.unified
+                else {"user_id": user_id}
+            )
+            try:
+                results = collection.query(
+                    query_embeddings=[embeddings[idx] for idx in keep],
+                    n_results=1,
+                    where=where,
+                    include=["documents", "metadatas", "distances"],
+                )
+            except Exception as e:
+                print(f"[Memory Engine] Dedup lookup failed, storing facts as new: {e}")
+                results = {}
+            for pos, idx in enumerate(keep):
+                hit_ids = (results.get("ids") or [])[pos] if pos < len(results.get("ids") or []) else []
+                if not hit_ids:
+                    continue
+                distance = results["distances"][pos][0]
+                if self._similarity(collection, distance) >= threshold:
+                    matches[idx] = (hit_ids[0], str(results["documents"][pos][0]), results["metadatas"][pos][0] or {})
+
+        new_idx = [idx for idx in keep if idx not in matches]
+        if new_idx:
+            ids = [f"fact-{user_id}-{date_str}-{uuid4().hex[:8]}-{idx}" for idx in new_idx]
+            metadatas = [
+                {"user_id": user_id, "date": date_str, "kind": KIND_FACT, "seen_count": 1} for _ in new_idx
+            ]
+            documents = [clean_facts[idx] for idx in new_idx]
+            collection.add(
+                ids=ids,
+                documents=documents,
+                embeddings=[embeddings[idx] for idx in new_idx],
+                metadatas=metadatas,
+            )
+            if self.lexical is not None:
+                self.lexical.add(ids, documents, metadatas)
+            stats["added"] = len(new_idx)
+
+        seen_ids: List[str] = []
+        seen_metadatas: List[dict] = []
+        merged_ids: List[str] = []
+        merged_documents: List[str] = []
+        merged_embeddings: List[List[float]] = []
+        merged_metadatas: List[dict] = []
+        for idx, (existing_id, existing_doc, metadata) in matches.items():
+            updated = {
+                **metadata,
+                "first_seen": metadata.get("first_seen") or metadata.get("date", date_str),
+                "last_seen": date_str,
+                "seen_count": int(metadata.get("seen_count", 1)) + 1,
+            }
+            if existing_doc.strip().lower() == clean_facts[idx].lower():
+                seen_ids.append(existing_id)
+                seen_metadatas.append(updated)
+                continue
+            # Newer phrasing wins; it is usually the more current version of the fact.
+            merged_ids.append(existing_id)
+            merged_documents.append(clean_facts[idx])
+            merged_embeddings.append(embeddings[idx])
+            merged_metadatas.append({**updated, "date": date_str})
+        if seen_ids:
+            collection.update(ids=seen_ids, metadatas=seen_metadatas)
+            stats["skipped"] += len(seen_ids)
+        if merged_ids:
+            collection.update(
+                ids=merged_ids,
+                documents=merged_documents,
+                embeddings=merged_embeddings,
+                metadatas=merged_metadatas,
+            )
+            if self.lexical is not None:
+                self.lexical.add(merged_ids, merged_documents, merged_metadatas)
+            stats["merged"] = len(merged_ids)
+        if stats["added"] or stats["merged"]:
+            self.result_cache.invalidate(user_id)
+
+        for key, value in stats.items():
+            self.dedup_stats[key] += value
+        deduped = stats["merged"] + stats["skipped"]
+        print(
+            f"[Memory Engine] Facts for user={user_id}: {stats['incoming']} in, {stats['added']} added, "
+            f"{stats['merged']} merged, {stats['skipped']} skipped "
+            f"(dedup {deduped / stats['incoming']:.0%})"
+        )
+        return stats
+
+    def _journal_where(self, user_id: str) -> dict:
+        if self.unified:
+            return {"$and": [{"user_id": user_id}, {"kind": KIND_DAILY_SUMMARY}]}
+        return {"user_id": user_id}
+
+    @staticmethod
+    def _period_for(day: date_type, level: str) -> tuple:
+        """(start, end) of the week or calendar month containing ``day``.
+
+        Weeks run Monday-Sunday but are cut at month boundaries, so every
+        weekly rollup falls inside exactly one month.
+        """
+        month_start = day.replace(day=1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        if level == LEVEL_WEEK:
+            monday = day - timedelta(days=day.weekday())
+            return max(monday, month_start), min(monday + timedelta(days=6), month_end)
+        return month_start, month_end
+
+    @staticmethod
+    def _entry_day(metadata: dict) -> Optional[date_type]:
+        """The day an entry counts toward when grouping.
+
+        Weekly rollups from before weeks were cut at month ends may span two
+        months; they count toward the middle of their span, i.e. the month
+        holding most of their days.
+        """
+        try:
+            day = date_type.fromisoformat(str(metadata.get("date", ""))[:10])
+        except ValueError:
+            return None
+        if str(metadata.get("level", LEVEL_DAY)) == LEVEL_WEEK:
+            try:
+                end = date_type.fromisoformat(str(metadata.get("period_end", ""))[:10])
+            except ValueError:
+                return day
+            day += (end - day) / 2
+        return day
+
+    def compaction_groups(self, user_id: str, level: str, cutoff: date_type) -> List[Dict[str, object]]:
+        """Hot journal entries that can be rolled up into one ``level`` summary each.
+
+        Weekly groups are daily entries; monthly groups are daily and weekly
+        entries. Only periods that ended before ``cutoff`` and hold at least
+        two entries are returned, oldest first. Each group is a dict with
+        start, end, ids, documents, embeddings, metadatas.
+
+        Metadata is scanned first; documents and embeddings are only fetched
+        for the entries that are actually rolled up.
+        """
+        sources = (LEVEL_DAY,) if level == LEVEL_WEEK else (LEVEL_DAY, LEVEL_WEEK)
+        collection = self._collection_for(KIND_DAILY_SUMMARY)
+        try:
+            listing = collection.get(where=self._journal_where(user_id), include=["metadatas"])
+        except Exception as e:
+            print(f"[Memory Engine] Could not load journals for compaction (user={user_id}): {e}")
+            return []
+
+        periods: Dict[date_type, tuple] = {}
+        members: Dict[date_type, List[str]] = {}
+        for doc_id, metadata in zip(listing.get("ids") or [], listing.get("metadatas") or []):
+            metadata = metadata or {}
+            if str(metadata.get("level", LEVEL_DAY)) not in sources:
+                continue
+            day = self._entry_day(metadata)
+            if day is None:
+                continue
+            start, end = self._period_for(day, level)
+            if end >= cutoff:
+                continue
+            periods[start] = (start, end)
+            members.setdefault(start, []).append(str(doc_id))
+        ready_starts = sorted(start for start, ids in members.items() if len(ids) >= 2)
+        if not ready_starts:
+            return []
+
+        wanted = [doc_id for start in ready_starts for doc_id in members[start]]
+        try:
+            data = collection.get(ids=wanted, include=["documents", "metadatas", "embeddings"])
+        except Exception as e:
+            print(f"[Memory Engine] Could not load journals for compaction (user={user_id}): {e}")
+            return []
+        embeddings = data.get("embeddings")
+        rows = {
+            str(doc_id): (
+                str((data.get("documents") or [])[idx]),
+                embeddings[idx] if embeddings is not None else None,
+                (data.get("metadatas") or [])[idx] or {},
+            )
+            for idx, doc_id in enumerate(data.get("ids") or [])
+        }
+
+        ready: List[Dict[str, object]] = []
+        for start in ready_starts:
+            # Chronological order for the summarizer.
+            ids = sorted(
+                (doc_id for doc_id in members[start] if doc_id in rows),
+                key=lambda doc_id: str(rows[doc_id][2].get("date", "")),
+            )
+            if len(ids) < 2:
+                continue
+            ready.append(
+                {
+                    "start": periods[start][0],
+                    "end": periods[start][1],
+                    "ids": ids,
+                    "documents": [rows[doc_id][0] for doc_id in ids],
+                    "embeddings": [rows[doc_id][1] for doc_id in ids],
+                    "metadatas": [rows[doc_id][2] for doc_id in ids],
+                }
+            )
+        return ready
+
+    def store_rollup(self, user_id: str, level: str, group: Dict[str, object], summary_text: str) -> int:
+        """Store a weekly/monthly summary and move the entries it covers to journal_archive.
+
+        The rollup is written before the originals are removed, so an
+        interrupted run leaves a duplicate rather than a gap. Returns the
+        number of entries moved.
+        """
+        if not summary_text.strip() or not group["ids"]:
+            return 0
+        start = group["start"].isoformat()
+        rollup_id = f"{level}-{user_id}-{start}-{uuid4().hex[:8]}"
+        rollup_metadata = {
+            "user_id": user_id,
+            "date": start,
+            "period_end": group["end"].isoformat(),
+            "kind": KIND_DAILY_SUMMARY,
+            "level": level,
+            "source_count": len(group["ids"]),
+        }
+        hot = self._collection_for(KIND_DAILY_SUMMARY)
+        hot.add(
+            ids=[rollup_id],
+            documents=[summary_text],
+            embeddings=self._embed_many([summary_text]),
+            metadatas=[rollup_metadata],
         )
 
+        ids = list(group["ids"])
+        archive_kwargs = {
+            "ids": ids,
+            "documents": list(group["documents"]),
+            "metadatas": [{**metadata, "compacted_into": rollup_id} for metadata in group["metadatas"]],
+        }
+        if all(embedding is not None for embedding in group["embeddings"]):
+            archive_kwargs["embeddings"] = list(group["embeddings"])
+        else:
+            archive_kwargs["embeddings"] = self._embed_many(archive_kwargs["documents"])
+        self.journal_archive.upsert(**archive_kwargs)
+        hot.delete(ids=ids)
+
+        if self.lexical is not None:
+            self.lexical.delete(ids)
+            self.lexical.add([rollup_id], [summary_text], [rollup_metadata])
+        self.result_cache.invalidate(user_id)
+        return len(ids)
+
     def get_random_memory_summary(self, user_id: str) -> str:
         snippets: List[str] = []
 
-        for collection in (self.daily_journals, self.facts_and_goals):
+        collections = (self.memories,) if self.unified else (self.daily_journals, self.facts_and_goals)
+        for collection in collections:
             try:
                 result = collection.get(where={"user_id": user_id}, limit=25)
                 docs = result.get("documents", []) if isinstance(result, dict) else []
@@ -129,3 +1089,29 @@ class MemoryEngine:
 
         picked = random.choice(snippets)
         return picked[:240].strip()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MemoryEngine maintenance")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Fill the collections for --dim (default EMBEDDING_DIM) from the full-width memories",
+    )
+    parser.add_argument("--dim", type=int, default=None, help="Target width, e.g. 512/256/128 (0 = full)")
+    parser.add_argument("--reembed", action="store_true", help="Run documents through the model instead of truncating")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+        raise SystemExit(0)
+
+    engine = MemoryEngine(embedding_dim=args.dim)
+    started = time.perf_counter()
+    try:
+        count = engine.rebuild_for_dimension(reembed=args.reembed)
+    except StoreInUseError as e:
+        raise SystemExit(f"[Memory Engine] {e}")
+    print(f"Done: {count} memories in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,80 @@
+"""Recency decay and maximal-marginal-relevance selection for retrieved memories.
+
+MemoryEngine over-fetches candidates, then calls these to keep a smaller set
+that is relevant, recent and non-redundant. Everything is vectorized in NumPy
+over the candidate embedding matrix.
+"""
+from __future__ import annotations
+
+from datetime import date as date_type
+from typing import List, Sequence
+
+import numpy as np
+
+
+def recency_weights(
+    dates: Sequence[str],
+    today: date_type,
+    half_life_days: float = 45.0,
+    floor: float = 0.3,
+) -> np.ndarray:
+    """Exponential decay by age: 1.0 today, halving every ``half_life_days``.
+
+    Old memories keep at least ``floor`` of their weight, so a strong match
+    from a year ago still beats a weak one from yesterday. Undated entries
+    are not decayed.
+    """
+    ages = np.zeros(len(dates), dtype=np.float32)
+    dated = np.zeros(len(dates), dtype=bool)
+    for idx, value in enumerate(dates):
+        try:
+            ages[idx] = max(0, (today - date_type.fromisoformat(str(value)[:10])).days)
+            dated[idx] = True
+        except ValueError:
+            continue
+    if half_life_days <= 0:
+        return np.ones(len(dates), dtype=np.float32)
+    decay = np.exp(-np.log(2.0) * ages / half_life_days)
+    weights = floor + (1.0 - floor) * decay
+    return np.where(dated, weights, 1.0).astype(np.float32)
+
+
+def mmr_select(
+    embeddings: np.ndarray,
+    relevance: np.ndarray,
+    kinds: Sequence[str],
+    per_kind: int,
+    mmr_lambda: float = 0.7,
+    duplicate_similarity: float = 0.95,
+) -> List[int]:
+    """Greedy MMR: pick max ``lambda * relevance - (1 - lambda) * redundancy``.
+
+    Redundancy is the highest cosine similarity to anything already picked.
+    Near-duplicates of a picked memory (>= ``duplicate_similarity``) are
+    dropped outright, and at most ``per_kind`` items of each kind are
+    returned. Returns candidate indices in pick order.
+    """
+    count = len(relevance)
+    if count == 0:
+        return []
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    pairwise = matrix @ matrix.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    redundancy = np.zeros(count, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    taken = {kind: 0 for kind in set(kinds)}
+    picked: List[int] = []
+    while available.any():
+        scores = mmr_lambda * relevance - (1.0 - mmr_lambda) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+        kind = kinds[best]
+        if taken[kind] >= per_kind:
+            continue
+        taken[kind] += 1
+        picked.append(best)
+        redundancy = np.maximum(redundancy, pairwise[best])
+        available &= pairwise[best] < duplicate_similarity
+    return picked
@@ -0,0 +1,151 @@
+"""Async front end for MemoryEngine on a dedicated worker pool.
+
+Query embedding and vector search are CPU-bound and would block the event
+loop, or tie up the default executor that LLM calls also use. Requests are
+queued here and run on the pool's own threads. Retrievals that arrive within
+MEMORY_BATCH_WAIT_MS of each other (usually different users) are sent as one
+batch, so their queries share a single embedding call.
+
+Threads rather than processes: torch, ONNX Runtime and Chroma release the
+GIL for the heavy work, and a process pool would hold a second copy of the
+model and a second Chroma client over the same files.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from memory_engine import MemoryEngine
+
+
+class AsyncMemory:
+    def __init__(
+        self,
+        engine: MemoryEngine,
+        workers: int = 2,
+        batch_wait_ms: float = 5.0,
+        max_batch: int = 16,
+    ) -> None:
+        """
+        Args:
+            engine: The MemoryEngine whose blocking calls run on the pool.
+            workers: Threads in the dedicated pool.
+            batch_wait_ms: How long the first queued retrieval waits for others to join its batch.
+            max_batch: Max retrievals per batch.
+        """
+        self.engine = engine
+        self.workers = max(1, int(workers))
+        self.batch_wait = max(0.0, float(batch_wait_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="memory-worker")
+
+        self._queue: Optional["asyncio.Queue[Tuple[Tuple[str, str, int], asyncio.Future, float]]"] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.in_flight = 0
+        self.stats: Dict[str, float] = {
+            "requests": 0,
+            "batches": 0,
+            "calls": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+            "wait_seconds": 0.0,
+            "run_seconds": 0.0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        # Only the dispatcher is restarted; requests already queued stay queued.
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def call(self, func, /, *args, **kwargs):
+        """Run any blocking MemoryEngine call on the pool."""
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.stats["calls"] += 1
+        try:
+            return await loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+    async def retrieve_hits(self, query: str, user_id: str, k: int = 5) -> List[Dict[str, object]]:
+        self._ensure_started()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((query, user_id, k), future, time.perf_counter()))
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._queue.qsize())
+        return await future
+
+    async def retrieve_relevant_context(self, query: str, user_id: str, k: int = 5) -> str:
+        if not query.strip():
+            return self.engine.retrieve_relevant_context(query, user_id=user_id, k=k)
+        print(f"[Memory Engine] Searching for relevant context (k={k}) for user: {user_id}")
+        return self.engine.format_context(await self.retrieve_hits(query, user_id=user_id, k=k))
+
+    async def _dispatch_loop(self) -> None:
+        """Collect queued retrievals into batches and hand each batch to the pool."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Run the batch without waiting for it, so the next one can form meanwhile.
+            task = asyncio.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Tuple[str, str, int], asyncio.Future, float]]) -> None:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.stats["wait_seconds"] += sum(started - queued_at for _, _, queued_at in batch)
+        self.in_flight += 1
+        try:
+            results = await loop.run_in_executor(
+                self.executor, self.engine.retrieve_hits_many, [request for request, _, _ in batch]
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.in_flight -= 1
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["run_seconds"] += time.perf_counter() - started
+
+        for (_, future, _), hits in zip(batch, results):
+            if isinstance(hits, Exception):
+                self.stats["errors"] += 1
+                if not future.done():
+                    future.set_exception(hits)
+            elif not future.done():
+                future.set_result(hits)
+
+    def status(self) -> Dict[str, object]:
+        requests = self.stats["requests"]
+        batches = self.stats["batches"]
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": int(self.stats["max_queue_depth"]),
+            "requests": int(requests),
+            "batches": int(batches),
+            "calls": int(self.stats["calls"]),
+            "errors": int(self.stats["errors"]),
+            "avg_batch": round(requests / batches, 2) if batches else 0.0,
+            "avg_wait_ms": round(self.stats["wait_seconds"] / requests * 1000, 1) if requests else 0.0,
+            "avg_run_ms": round(self.stats["run_seconds"] / batches * 1000, 1) if batches else 0.0,
+        }
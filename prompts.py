@@ -75,6 +75,14 @@ def load_dream_prompt() -> str:
     return "You are {bot_name}, reflecting offline in dream cycle."
 
 
+def load_compaction_prompt() -> str:
+    """Load the journal compaction prompt from Compaction.md"""
+    path = BASE_DIR / "Compaction.md"
+    if path.exists():
+        return path.read_text(encoding='utf-8').strip()
+    return "Condense these diary entries from {period} into one first-person diary entry. Return plain text only."
+
+
 def load_spontaneous_prompt() -> str:
     """Load the spontaneous check-in prompt from Spontaneous.md"""
     path = BASE_DIR / "Spontaneous.md"
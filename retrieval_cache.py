@@ -0,0 +1,163 @@
+"""Short-lived per-user cache of memory retrieval results.
+
+Consecutive messages in one conversation tend to retrieve the same memories.
+Entries are looked up by normalized query text first, then by query
+embedding: a cached query at or above ``similarity`` cosine to the new one
+is reused. Everything cached for a user is dropped as soon as MemoryEngine
+writes new memories for them, and entries expire after ``ttl_seconds`` as a
+backstop for writes made by another process. Callers take generation()
+before searching and pass it to put(), so a search that raced a write can't
+re-cache what the write made stale.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+_SPACE_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text.lower())).strip()
+
+
+class RetrievalCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0, similarity: float = 0.97) -> None:
+        """
+        Args:
+            max_entries: Max cached results across all users (LRU).
+            ttl_seconds: How long a result may be reused.
+            similarity: Query-embedding cosine at which a cached result is reused
+                (0 = only exact normalized text).
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.similarity = float(similarity)
+
+        self._lock = threading.Lock()
+        # (user_id, k, normalized query) -> (stored_at, query vector, hits)
+        self._entries: "OrderedDict[Tuple[str, int, str], Tuple[float, np.ndarray, List[dict]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "lookups": 0,
+            "text_hits": 0,
+            "vector_hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "stale_puts": 0,
+        }
+        # Bumped by invalidate() (per user) and clear() (everyone).
+        self._counter = 0
+        self._generations: Dict[str, int] = {}
+        self._cleared_at = 0
+
+    @staticmethod
+    def _copy(hits: Sequence[dict]) -> List[dict]:
+        return [dict(hit) for hit in hits]
+
+    def _expired(self, stored_at: float) -> bool:
+        return time.monotonic() - stored_at > self.ttl_seconds
+
+    def get_text(self, user_id: str, k: int, query: str) -> Optional[List[dict]]:
+        """Cached hits for the same normalized query text, counted as a lookup."""
+        if not self.max_entries:
+            return None
+        key = (user_id, int(k), normalize_query(query))
+        with self._lock:
+            self.stats["lookups"] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0]):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.stats["text_hits"] += 1
+            return self._copy(entry[2])
+
+    def get_similar(self, user_id: str, k: int, query_embedding: Sequence[float]) -> Optional[List[dict]]:
+        """Cached hits for a near-identical query embedding; call after get_text() missed."""
+        if not self.max_entries:
+            return None
+        with self._lock:
+            if self.similarity > 0:
+                candidates = [
+                    (key, entry)
+                    for key, entry in self._entries.items()
+                    if key[0] == user_id and key[1] == int(k) and not self._expired(entry[0])
+                ]
+                if candidates:
+                    query = np.asarray(query_embedding, dtype=np.float32)
+                    query /= max(float(np.linalg.norm(query)), 1e-12)
+                    scores = np.vstack([entry[1] for _, entry in candidates]) @ query
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity:
+                        key, entry = candidates[best]
+                        self._entries.move_to_end(key)
+                        self.stats["vector_hits"] += 1
+                        return self._copy(entry[2])
+            self.stats["misses"] += 1
+            return None
+
+    def generation(self, user_id: str) -> int:
+        """Changes whenever the user's cached results are invalidated."""
+        with self._lock:
+            return max(self._generations.get(user_id, 0), self._cleared_at)
+
+    def put(
+        self,
+        user_id: str,
+        k: int,
+        query: str,
+        query_embedding: Sequence[float],
+        hits: Sequence[dict],
+        generation: int | None = None,
+    ) -> None:
+        """Cache hits; skipped if ``generation`` (taken before the search) is no longer current."""
+        if not self.max_entries:
+            return
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        key = (user_id, int(k), normalize_query(query))
+        with self._lock:
+            if generation is not None and generation != max(self._generations.get(user_id, 0), self._cleared_at):
+                self.stats["stale_puts"] += 1
+                return
+            self._entries[key] = (time.monotonic(), vector, self._copy(hits))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop every cached result for the user (their memories changed)."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == user_id]
+            for key in stale:
+                del self._entries[key]
+            self._counter += 1
+            self._generations[user_id] = self._counter
+            self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counter += 1
+            self._cleared_at = self._counter
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            served = self.stats["text_hits"] + self.stats["vector_hits"]
+            lookups = self.stats["lookups"]
+            return {
+                "entries": len(self._entries),
+                "served_from_cache": served,
+                "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+                **self.stats,
+            }
@@ -0,0 +1,4 @@
+#!/bin/bash
+echo "🧠 Starting Pebble's shared embedding service..."
+# Run on Port 8082; set EMBEDDING_SERVICE_URL=http://localhost:8082 for bots and the control panel
+python -m uvicorn embedding_service:app --host 127.0.0.1 --port 8082 --log-level info
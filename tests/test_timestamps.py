@@ -0,0 +1,35 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from brain import Brain, now_iso
+
+
+@pytest.fixture(params=["America/Los_Angeles", "Europe/Athens", "UTC"])
+def server_tz(request):
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = request.param
+    time.tzset()
+    yield request.param
+    if previous is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def test_now_iso_round_trips_as_zero_gap(server_tz):
+    brain = Brain.__new__(Brain)
+    history = [{"role": "user", "content": "hi", "created_at": now_iso()}]
+    gap = brain._format_time_since_last_interaction(history, datetime.now().astimezone())
+    assert gap == "0 minutes"
+
+
+def test_sqlite_timestamps_are_read_as_utc(server_tz):
+    brain = Brain.__new__(Brain)
+    sqlite_now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    history = [{"role": "user", "content": "hi", "created_at": sqlite_now}]
+    gap = brain._format_time_since_last_interaction(history, datetime.now().astimezone())
+    assert gap in {"0 minutes", "1 minute"}
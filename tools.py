@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import threading
+import time
 import httpx
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import get_weather_ttl_minutes
 
 
 VOICE_CONFIG_PATH = Path(__file__).resolve().parent / "voice_config.json"
@@ -190,6 +195,158 @@ def get_current_weather(city: str) -> str:
         return "unknown weather"
 
 
-# Alias for backwards compatibility
+# =============================================================================
+# WEATHER CACHE
+# =============================================================================
+
+WEATHER_UNKNOWN = "unknown weather"
+
+
+class WeatherService:
+    """Per-location TTL cache in front of get_current_weather.
+
+    - Fresh entries are served from memory.
+    - Concurrent lookups for the same location share one fetch (threads via a
+      per-location lock, coroutines via a shared in-flight task).
+    - Failed fetches are cached briefly and fall back to the last good report.
+    - refresh_known() re-fetches recently used locations in the background so
+      hot turns never wait on wttr.in.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 1200.0,
+        failure_ttl_seconds: float = 60.0,
+        forget_after_seconds: float = 86400.0,
+        fetcher: Callable[[str], str] | None = None,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.forget_after_seconds = forget_after_seconds
+        self._fetcher = fetcher or get_current_weather
+        # key -> (report, fetched_at, expires_at)
+        self._cache: Dict[str, Tuple[str, float, float]] = {}
+        # key -> original location string, last access time
+        self._known: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0, "refreshed": 0, "failures": 0}
+
+    @staticmethod
+    def _key(location: str) -> str:
+        return " ".join(location.strip().lower().split())
+
+    def _touch(self, key: str, location: str) -> None:
+        with self._lock:
+            self._known[key] = (location.strip(), time.monotonic())
+
+    def peek(self, location: str, allow_stale: bool = False) -> Optional[str]:
+        """Return the cached report without fetching (None if missing/expired)."""
+        key = self._key(location)
+        with self._lock:
+            entry = self._cache.get(key)
+        if not entry:
+            return None
+        report, _, expires_at = entry
+        if allow_stale or time.monotonic() < expires_at:
+            return report
+        return None
+
+    def _fetch_and_store(self, location: str) -> str:
+        key = self._key(location)
+        report = self._fetcher(location)
+        now = time.monotonic()
+        if not report or report == WEATHER_UNKNOWN:
+            self.stats["failures"] += 1
+            with self._lock:
+                previous = self._cache.get(key)
+                if previous and previous[0] != WEATHER_UNKNOWN:
+                    # Keep serving the last good report, retry soon.
+                    self._cache[key] = (previous[0], previous[1], now + self.failure_ttl_seconds)
+                    return previous[0]
+                self._cache[key] = (WEATHER_UNKNOWN, now, now + self.failure_ttl_seconds)
+            return WEATHER_UNKNOWN
+        with self._lock:
+            self._cache[key] = (report, now, now + self.ttl_seconds)
+        return report
+
+    def get(self, location: str) -> str:
+        """Blocking lookup; safe to call from worker threads."""
+        if not location or not location.strip():
+            return WEATHER_UNKNOWN
+        key = self._key(location)
+        self._touch(key, location)
+
+        cached = self.peek(location)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have fetched while we waited.
+            cached = self.peek(location)
+            if cached is not None:
+                self.stats["coalesced"] += 1
+                return cached
+            self.stats["misses"] += 1
+            return self._fetch_and_store(location)
+
+    async def aget(self, location: str) -> str:
+        """Async lookup; concurrent callers for one location share a single fetch."""
+        if not location or not location.strip():
+            return WEATHER_UNKNOWN
+        key = self._key(location)
+        self._touch(key, location)
+
+        cached = self.peek(location)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(asyncio.to_thread(self.get, location))
+        self._inflight[key] = task
+        task.add_done_callback(
+            lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None
+        )
+        return await asyncio.shield(task)
+
+    def known_locations(self) -> List[str]:
+        """Locations looked up recently enough to keep warm."""
+        cutoff = time.monotonic() - self.forget_after_seconds
+        with self._lock:
+            for key in [k for k, (_, seen) in self._known.items() if seen < cutoff]:
+                self._known.pop(key, None)
+                self._cache.pop(key, None)
+                self._key_locks.pop(key, None)
+            return [location for location, _ in self._known.values()]
+
+    async def refresh_known(self, locations: List[str] | None = None) -> int:
+        """Re-fetch known locations concurrently. Returns how many were refreshed."""
+        targets = locations if locations is not None else self.known_locations()
+        if not targets:
+            return 0
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self._fetch_and_store, location) for location in targets),
+            return_exceptions=True,
+        )
+        refreshed = sum(1 for item in results if isinstance(item, str) and item != WEATHER_UNKNOWN)
+        self.stats["refreshed"] += refreshed
+        return refreshed
+
+
+weather_service = WeatherService(
+    ttl_seconds=get_weather_ttl_minutes() * 60.0,
+)
+
+
+# Alias for backwards compatibility (now served from the weather cache)
 def get_weather(city: str) -> str:
-    return get_current_weather(city)
+    return weather_service.get(city)
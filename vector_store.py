@@ -0,0 +1,976 @@
+"""Vector stores behind MemoryEngine.
+
+MemoryEngine talks to collections through the subset of the Chroma
+collection API it needs (add/upsert/update/get/query/delete/count), so any
+store whose collections follow that contract can be swapped in:
+
+- ``chroma``: Chroma's PersistentClient (SQLite + HNSW), the default.
+- ``npy``: an in-process store for single-host deployments. Each user's
+  vectors are float16 rows in a memory-mapped ``.npy`` shard, with ids,
+  documents and metadata in a per-collection SQLite table. Queries filtered
+  on user_id read just that user's shard, and top-k is an exact NumPy
+  matmul. There is no index to load or rebuild. One process at a time may
+  open it.
+
+Compare the two on this machine with:
+
+    python vector_store.py --benchmark
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Set, Tuple
+
+import numpy as np
+
+from config import get_vector_store
+
+
+BASE_DIR = Path(__file__).resolve().parent
+CHROMA_DIR = BASE_DIR / "data" / "chroma"
+NPY_DIR = BASE_DIR / "data" / "vectors"
+
+STORE_NAMES = ("chroma", "npy")
+DEFAULT_STORE = "chroma"
+
+SHARED_SHARD = "_shared"
+# Metadata keys with a per-shard slot index, so equality filters on them
+# (MemoryEngine's user_id and kind) never reach the per-row _matches check.
+INDEXED_KEYS = ("user_id", "kind")
+_SCALARS = (str, int, float, bool)
+_UNSAFE_CHARS = re.compile(r"[^\w.-]")
+
+
+class VectorCollection(Protocol):
+    """The collection contract MemoryEngine relies on (a Chroma Collection subset).
+
+    ``get`` returns flat lists under ids/documents/metadatas (plus an
+    ``embeddings`` array when included); ``query`` returns one list per
+    query embedding, with squared-L2 ``distances``. ``where`` filters use
+    Chroma syntax: ``{"key": value}``, ``$eq``/``$ne``/``$gt``/``$gte``/``$lt``/``$lte``/
+    ``$in``/``$nin``, ``$and``/``$or``.
+    """
+
+    name: str
+    metadata: Dict[str, object]
+
+    def count(self) -> int: ...
+
+    def add(self, ids, embeddings=None, metadatas=None, documents=None) -> None: ...
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None) -> None: ...
+
+    def update(self, ids, embeddings=None, metadatas=None, documents=None) -> None: ...
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None) -> dict: ...
+
+    def query(self, query_embeddings, n_results: int = 10, where=None, include=None) -> dict: ...
+
+    def delete(self, ids=None, where=None) -> None: ...
+
+
+class VectorStore(Protocol):
+    name: str
+
+    def get_or_create_collection(self, name: str) -> VectorCollection: ...
+
+    def list_collection_names(self) -> List[str]: ...
+
+
+class ChromaVectorStore:
+    """Chroma's PersistentClient; its collections already meet the contract."""
+
+    name = "chroma"
+
+    def __init__(self, path: Path | None = None) -> None:
+        import chromadb
+
+        self.path = path or CHROMA_DIR
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.client = chromadb.PersistentClient(path=str(self.path))
+
+    def get_or_create_collection(self, name: str):
+        return self.client.get_or_create_collection(name)
+
+    def list_collection_names(self) -> List[str]:
+        return [getattr(item, "name", item) for item in self.client.list_collections()]
+
+
+_COMPARISONS = {
+    "$eq": lambda value, expected: value == expected,
+    "$ne": lambda value, expected: value != expected,
+    "$gt": lambda value, expected: value is not None and value > expected,
+    "$gte": lambda value, expected: value is not None and value >= expected,
+    "$lt": lambda value, expected: value is not None and value < expected,
+    "$lte": lambda value, expected: value is not None and value <= expected,
+    "$in": lambda value, expected: value in expected,
+    "$nin": lambda value, expected: value not in expected,
+}
+
+
+def _matches(metadata: dict, where: dict | None) -> bool:
+    """Evaluate a Chroma ``where`` filter; unsupported operators raise ValueError."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported where operator {key}")
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, expected in condition.items():
+                if op not in _COMPARISONS:
+                    raise ValueError(f"Unsupported where operator {op} on {key}")
+                try:
+                    if not _COMPARISONS[op](value, expected):
+                        return False
+                except TypeError:
+                    # Chroma only orders numbers; anything else just doesn't match.
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _pinned_user(where: dict | None) -> Optional[str]:
+    """The user_id a filter requires, if any, so only that shard is scanned."""
+    if not where:
+        return None
+    value = where.get("user_id")
+    if isinstance(value, dict):
+        value = value.get("$eq")
+    if value is not None and not isinstance(value, (dict, list)):
+        return str(value)
+    for clause in where.get("$and", []):
+        pinned = _pinned_user(clause)
+        if pinned is not None:
+            return pinned
+    return None
+
+
+def _equality(condition) -> Tuple[bool, object]:
+    """(True, value) if ``condition`` is a plain or ``$eq`` equality."""
+    if not isinstance(condition, dict):
+        return True, condition
+    if set(condition) == {"$eq"}:
+        return True, condition["$eq"]
+    return False, None
+
+
+def _split_indexed(where: dict | None) -> Tuple[List[Tuple[str, object]], Optional[dict]]:
+    """Split ``where`` into equality clauses on INDEXED_KEYS and the rest of the filter.
+
+    The equality clauses are answered from each shard's slot index; only the
+    rest is evaluated row by row with _matches.
+    """
+    if not where:
+        return [], None
+    indexed: List[Tuple[str, object]] = []
+    rest: Dict[str, object] = {}
+    rest_clauses: List[dict] = []
+    for key, condition in where.items():
+        if key == "$and":
+            for clause in condition:
+                clause_indexed, clause_rest = _split_indexed(clause)
+                indexed.extend(clause_indexed)
+                if clause_rest:
+                    rest_clauses.append(clause_rest)
+            continue
+        is_equality, value = _equality(condition)
+        if key in INDEXED_KEYS and is_equality and isinstance(value, _SCALARS):
+            indexed.append((key, value))
+        else:
+            rest[key] = condition
+    if rest_clauses:
+        rest["$and"] = rest_clauses
+    return indexed, rest or None
+
+
+def _shard_name(user_id: str) -> str:
+    if not user_id:
+        return SHARED_SHARD
+    safe = _UNSAFE_CHARS.sub("_", user_id)
+    if safe != user_id or safe == SHARED_SHARD:
+        safe = f"{safe}-{hashlib.sha1(user_id.encode('utf-8')).hexdigest()[:8]}"
+    return safe
+
+
+class _Shard:
+    """One user's vectors: a float16 memmap with spare capacity.
+
+    Vectors only ever go into fresh slots past the last live one, and the
+    records table is pointed at them afterwards. Deleting or replacing a
+    record leaves a dead slot instead of moving rows, so a crash can't leave
+    a committed record pointing at the wrong vector. Once dead slots
+    outnumber live ones, compact() copies the live rows into the next
+    generation's file and repoints them in one transaction. Once a shard is
+    queried, a float32 copy of its slots and their squared norms is kept in
+    memory (widening float16 on every query costs more than the matmul).
+    """
+
+    def __init__(self, directory: Path, dim: int = 0, generation: int = 0) -> None:
+        self.directory = directory
+        self.name = directory.name
+        self.dim = dim
+        self.generation = generation
+        # Slot-indexed; None marks a dead slot.
+        self.ids: List[Optional[str]] = []
+        self.documents: List[Optional[str]] = []
+        self.metadatas: List[Optional[dict]] = []
+        # id -> slot
+        self.rows: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._working: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._live: Optional[np.ndarray] = None
+        # (key, value) -> slots holding it, for INDEXED_KEYS; masks are built from it on demand.
+        self._index: Dict[Tuple[str, object], Set[int]] = {}
+        self._masks: Dict[Tuple[str, object], np.ndarray] = {}
+
+    def _vectors_file(self, generation: int) -> Path:
+        return self.directory / ("vectors.npy" if generation == 0 else f"vectors.{generation}.npy")
+
+    @property
+    def vectors_path(self) -> Path:
+        return self._vectors_file(self.generation)
+
+    @property
+    def slots(self) -> int:
+        return len(self.ids)
+
+    @property
+    def count(self) -> int:
+        return len(self.rows)
+
+    def remove_stale_files(self) -> None:
+        """Drop vector files left by an interrupted grow or compaction."""
+        for path in self.directory.glob("vectors*.npy"):
+            if path != self.vectors_path:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def vectors(self) -> np.ndarray:
+        """Every slot, live or dead (memory-mapped, float16)."""
+        if self._vectors is None:
+            if not self.vectors_path.exists():
+                return np.zeros((0, self.dim), dtype=np.float16)
+            self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+        return self._vectors[: self.slots]
+
+    def working_set(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(float32 rows, squared norms) for every slot, built on first use."""
+        if self._working is None or len(self._working[0]) != self.slots:
+            matrix = np.asarray(self.vectors(), dtype=np.float32)
+            self._working = (matrix, np.einsum("ij,ij->i", matrix, matrix))
+        return self._working
+
+    def live_mask(self) -> np.ndarray:
+        if self._live is None:
+            self._live = np.fromiter((doc_id is not None for doc_id in self.ids), dtype=bool, count=self.slots)
+        return self._live
+
+    def mask_for(self, clauses: Sequence[Tuple[str, object]]) -> np.ndarray:
+        """Live slots whose metadata equals every (key, value) clause (keys in INDEXED_KEYS)."""
+        mask = self.live_mask()
+        for clause in clauses:
+            cached = self._masks.get(clause)
+            if cached is None:
+                cached = np.zeros(self.slots, dtype=bool)
+                slots = self._index.get(clause)
+                if slots:
+                    cached[list(slots)] = True
+                self._masks[clause] = cached
+            mask = mask & cached
+        return mask
+
+    def _reindex(self, slot: int, old: Optional[dict], new: Optional[dict]) -> None:
+        for key in INDEXED_KEYS:
+            if old is not None and isinstance(old.get(key), _SCALARS):
+                self._index.get((key, old[key]), set()).discard(slot)
+            if new is not None and isinstance(new.get(key), _SCALARS):
+                self._index.setdefault((key, new[key]), set()).add(slot)
+        self._masks = {}
+
+    def set_record(self, slot: int, document: str, metadata: dict) -> None:
+        self._reindex(slot, self.metadatas[slot], metadata)
+        self.documents[slot] = document
+        self.metadatas[slot] = metadata
+
+    def _ensure_capacity(self, rows: int, dim: int) -> np.ndarray:
+        if self.dim and dim != self.dim:
+            raise ValueError(f"Embedding dimension {dim} does not match collection dimension {self.dim}")
+        self.dim = dim
+        self.vectors()
+        # A file of another width is an orphan of an uncommitted write; start over.
+        capacity = self._vectors.shape[0] if self._vectors is not None and self._vectors.shape[1] == dim else 0
+        if rows <= capacity:
+            return self._vectors
+        self.directory.mkdir(parents=True, exist_ok=True)
+        new_capacity = max(rows, capacity * 2, 64)
+        tmp_path = self.directory / "vectors.tmp.npy"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16, shape=(new_capacity, dim))
+        if capacity and self.slots:
+            grown[: self.slots] = self._vectors[: self.slots]
+        grown.flush()
+        # Close both maps before the swap (Windows can't replace a mapped file).
+        del grown
+        self._vectors = None
+        os.replace(tmp_path, self.vectors_path)
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+        return self._vectors
+
+    def write_slots(self, embeddings: np.ndarray) -> List[int]:
+        """Write vectors into fresh slots after the last one and return the slots.
+
+        Nothing refers to them until the caller commits records pointing there.
+        """
+        start = self.slots
+        matrix = self._ensure_capacity(start + len(embeddings), int(embeddings.shape[1]))
+        matrix[start : start + len(embeddings)] = embeddings.astype(np.float16)
+        matrix.flush()
+        if self._working is not None and start < len(self._working[0]):
+            self._working = None
+        return list(range(start, start + len(embeddings)))
+
+    def place(self, slot: int, doc_id: str, document: str, metadata: dict) -> None:
+        while self.slots <= slot:
+            self.ids.append(None)
+            self.documents.append(None)
+            self.metadatas.append(None)
+        self.ids[slot] = doc_id
+        self.documents[slot] = document
+        self.metadatas[slot] = metadata
+        self.rows[doc_id] = slot
+        self._reindex(slot, None, metadata)
+        self._live = None
+
+    def kill(self, doc_id: str) -> None:
+        slot = self.rows.pop(doc_id)
+        self._reindex(slot, self.metadatas[slot], None)
+        self.ids[slot] = None
+        self.documents[slot] = None
+        self.metadatas[slot] = None
+        # Trailing dead slots are simply reused by the next write.
+        while self.ids and self.ids[-1] is None:
+            self.ids.pop()
+            self.documents.pop()
+            self.metadatas.pop()
+        self._live = None
+
+    def needs_compaction(self) -> bool:
+        return self.slots - self.count > max(64, self.count)
+
+    def compact(self, conn: sqlite3.Connection) -> None:
+        live = [slot for slot, doc_id in enumerate(self.ids) if doc_id is not None]
+        generation = self.generation + 1
+        packed = np.lib.format.open_memmap(
+            self._vectors_file(generation), mode="w+", dtype=np.float16, shape=(max(len(live), 64), self.dim)
+        )
+        if live:
+            packed[: len(live)] = self.vectors()[live]
+        packed.flush()
+        del packed
+        with conn:
+            conn.executemany(
+                "UPDATE records SET slot = ? WHERE id = ?",
+                [(slot, self.ids[old]) for slot, old in enumerate(live)],
+            )
+            conn.execute("UPDATE shards SET generation = ? WHERE name = ?", (generation, self.name))
+
+        previous = self.vectors_path
+        self._vectors = None
+        self._working = None
+        self._live = None
+        self.generation = generation
+        self.ids = [self.ids[slot] for slot in live]
+        self.documents = [self.documents[slot] for slot in live]
+        self.metadatas = [self.metadatas[slot] for slot in live]
+        self.rows = {doc_id: slot for slot, doc_id in enumerate(self.ids)}
+        self._index = {}
+        for slot, metadata in enumerate(self.metadatas):
+            self._reindex(slot, None, metadata)
+        try:
+            previous.unlink()
+        except OSError:
+            pass  # Removed on the next open.
+
+
+class NpyCollection:
+    """Vectors in per-user ``_Shard`` files; ids, documents and metadata in SQLite.
+
+    Every write commits its records in one transaction after the vectors are
+    on disk, so the records table is what decides what exists.
+    """
+
+    metadata = {"hnsw:space": "l2"}
+
+    def __init__(self, directory: Path) -> None:
+        self.name = directory.name
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.directory / "records.sqlite"), check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS shards (
+                name TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL DEFAULT 0,
+                dim INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                id TEXT PRIMARY KEY,
+                shard TEXT NOT NULL,
+                slot INTEGER NOT NULL,
+                document TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            """
+        )
+        self._import_sidecars()
+
+        self._shards: Dict[str, _Shard] = {}
+        # id -> shard name
+        self._owners: Dict[str, str] = {}
+        for name, generation, dim in self._conn.execute("SELECT name, generation, dim FROM shards"):
+            self._shards[name] = _Shard(self.directory / name, dim=int(dim), generation=int(generation))
+        for doc_id, shard_name, slot, document, metadata in self._conn.execute(
+            "SELECT id, shard, slot, document, metadata FROM records ORDER BY shard, slot"
+        ):
+            self._shards[shard_name].place(int(slot), doc_id, document, json.loads(metadata))
+            self._owners[doc_id] = shard_name
+        for shard in self._shards.values():
+            shard.remove_stale_files()
+
+    def _import_sidecars(self) -> None:
+        """Move shards from the older meta.json sidecar layout into the records table."""
+        known = {name for (name,) in self._conn.execute("SELECT name FROM shards")}
+        for meta_path in sorted(self.directory.glob("*/meta.json")):
+            name = meta_path.parent.name
+            if name not in known:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                records = zip(meta.get("ids", []), meta.get("documents", []), meta.get("metadatas", []))
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT INTO shards (name, generation, dim) VALUES (?, 0, ?)", (name, int(meta.get("dim", 0)))
+                    )
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO records (id, shard, slot, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (str(doc_id), name, slot, str(document), json.dumps(metadata or {}, ensure_ascii=False))
+                            for slot, (doc_id, document, metadata) in enumerate(records)
+                        ],
+                    )
+            meta_path.unlink()
+
+    def _shard(self, name: str) -> _Shard:
+        if name not in self._shards:
+            self._shards[name] = _Shard(self.directory / name)
+        return self._shards[name]
+
+    def _locate(self, doc_id: str) -> Tuple[_Shard, int]:
+        shard = self._shards[self._owners[doc_id]]
+        return shard, shard.rows[doc_id]
+
+    def _compact(self, shard_names: Iterable[str]) -> None:
+        for name in shard_names:
+            shard = self._shards[name]
+            if shard.needs_compaction():
+                shard.compact(self._conn)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._owners)
+
+    @staticmethod
+    def _as_matrix(embeddings) -> np.ndarray:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+    def _write(self, ids, embeddings, metadatas, documents, replace: bool) -> None:
+        ids = [str(doc_id) for doc_id in ids]
+        if embeddings is None:
+            raise ValueError("The npy vector store needs embeddings for every record")
+        matrix = self._as_matrix(embeddings)
+        metadatas = [dict(metadata or {}) for metadata in metadatas] if metadatas is not None else [{} for _ in ids]
+        documents = [str(document) for document in documents] if documents is not None else ["" for _ in ids]
+        with self._lock:
+            # Last occurrence wins for ids repeated within one call.
+            latest: Dict[str, int] = {}
+            for idx, doc_id in enumerate(ids):
+                if doc_id in self._owners and not replace:
+                    print(f"[Vector Store] Skipping existing id {doc_id} in {self.name}")
+                    continue
+                latest[doc_id] = idx
+            pending: Dict[str, List[int]] = {}
+            for idx in latest.values():
+                pending.setdefault(_shard_name(str(metadatas[idx].get("user_id", ""))), []).append(idx)
+            if not pending:
+                return
+
+            placed: List[Tuple[_Shard, int, int]] = []
+            for shard_name, indices in pending.items():
+                shard = self._shard(shard_name)
+                placed.extend((shard, slot, idx) for slot, idx in zip(shard.write_slots(matrix[indices]), indices))
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO shards (name, dim) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET dim = excluded.dim",
+                    [(self._shards[name].name, self._shards[name].dim) for name in pending],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO records (id, shard, slot, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (ids[idx], shard.name, slot, documents[idx], json.dumps(metadatas[idx], ensure_ascii=False))
+                        for shard, slot, idx in placed
+                    ],
+                )
+
+            replaced = set()
+            for shard, slot, idx in placed:
+                previous = self._owners.get(ids[idx])
+                if previous is not None:
+                    self._shards[previous].kill(ids[idx])
+                    replaced.add(previous)
+                shard.place(slot, ids[idx], documents[idx], metadatas[idx])
+                self._owners[ids[idx]] = shard.name
+            self._compact(replaced)
+
+    def add(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        self._write(ids, embeddings, metadatas, documents, replace=False)
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        self._write(ids, embeddings, metadatas, documents, replace=True)
+
+    def update(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        matrix = self._as_matrix(embeddings) if embeddings is not None else None
+        with self._lock:
+            changed: List[Tuple[str, str, dict]] = []
+            rewritten: List[Tuple[str, np.ndarray, dict, str]] = []
+            for idx, doc_id in enumerate(str(doc_id) for doc_id in ids):
+                if doc_id not in self._owners:
+                    continue
+                shard, slot = self._locate(doc_id)
+                metadata = {**shard.metadatas[slot], **(metadatas[idx] or {})} if metadatas is not None else shard.metadatas[slot]
+                document = str(documents[idx]) if documents is not None else shard.documents[slot]
+                if matrix is None and _shard_name(str(metadata.get("user_id", ""))) == shard.name:
+                    changed.append((doc_id, document, metadata))
+                    continue
+                # New vector, or user_id changed so the record moves shard: write a fresh slot.
+                vector = matrix[idx] if matrix is not None else np.asarray(shard.vectors()[slot], dtype=np.float32)
+                rewritten.append((doc_id, vector, metadata, document))
+
+            if changed:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE records SET document = ?, metadata = ? WHERE id = ?",
+                        [(document, json.dumps(metadata, ensure_ascii=False), doc_id) for doc_id, document, metadata in changed],
+                    )
+                for doc_id, document, metadata in changed:
+                    shard, slot = self._locate(doc_id)
+                    shard.set_record(slot, document, metadata)
+            if rewritten:
+                self._write(
+                    [doc_id for doc_id, _, _, _ in rewritten],
+                    np.vstack([vector for _, vector, _, _ in rewritten]),
+                    [metadata for _, _, metadata, _ in rewritten],
+                    [document for _, _, _, document in rewritten],
+                    replace=True,
+                )
+
+    def _remove(self, ids: Iterable[str]) -> None:
+        doomed = [doc_id for doc_id in dict.fromkeys(ids) if doc_id in self._owners]
+        if not doomed:
+            return
+        with self._conn:
+            self._conn.executemany("DELETE FROM records WHERE id = ?", [(doc_id,) for doc_id in doomed])
+        touched = set()
+        for doc_id in doomed:
+            shard_name = self._owners.pop(doc_id)
+            self._shards[shard_name].kill(doc_id)
+            touched.add(shard_name)
+        self._compact(touched)
+
+    def delete(self, ids=None, where=None) -> None:
+        with self._lock:
+            targets = [str(doc_id) for doc_id in ids] if ids is not None else list(self._owners)
+            if where:
+                targets = [
+                    doc_id
+                    for doc_id in targets
+                    if doc_id in self._owners and _matches(self._record(doc_id)[2], where)
+                ]
+            self._remove(targets)
+
+    def _record(self, doc_id: str) -> Tuple[_Shard, int, dict]:
+        shard, slot = self._locate(doc_id)
+        return shard, slot, shard.metadatas[slot]
+
+    def _candidate_shards(self, where: dict | None) -> List[str]:
+        pinned = _pinned_user(where)
+        if pinned is None:
+            return sorted(self._shards)
+        name = _shard_name(pinned)
+        return [name] if name in self._shards else []
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None) -> dict:
+        include = include if include is not None else ["documents", "metadatas"]
+        with self._lock:
+            if ids is not None:
+                refs = [self._locate(str(doc_id)) for doc_id in ids if str(doc_id) in self._owners]
+                if where:
+                    refs = [(shard, slot) for shard, slot in refs if _matches(shard.metadatas[slot], where)]
+            else:
+                indexed, rest = _split_indexed(where)
+                refs = [
+                    (shard, int(slot))
+                    for shard in (self._shards[name] for name in self._candidate_shards(where))
+                    for slot in np.flatnonzero(shard.mask_for(indexed))
+                    if not rest or _matches(shard.metadatas[slot], rest)
+                ]
+            start = int(offset or 0)
+            refs = refs[start : start + int(limit)] if limit is not None else refs[start:]
+
+            result: Dict[str, object] = {"ids": [shard.ids[slot] for shard, slot in refs]}
+            result["documents"] = [shard.documents[slot] for shard, slot in refs] if "documents" in include else None
+            result["metadatas"] = (
+                [dict(shard.metadatas[slot]) for shard, slot in refs] if "metadatas" in include else None
+            )
+            if "embeddings" in include:
+                result["embeddings"] = (
+                    np.vstack([np.asarray(shard.vectors()[slot], dtype=np.float32) for shard, slot in refs])
+                    if refs
+                    else np.zeros((0, 0), dtype=np.float32)
+                )
+            else:
+                result["embeddings"] = None
+            return result
+
+    def query(self, query_embeddings, n_results: int = 10, where=None, include=None) -> dict:
+        """Exact nearest neighbours: squared L2 over the matching shards, one matmul each.
+
+        Equality filters on INDEXED_KEYS come from the shards' slot indexes;
+        only other conditions are checked row by row, and only on those rows.
+        """
+        include = include if include is not None else ["documents", "metadatas", "distances"]
+        queries = self._as_matrix(query_embeddings)
+        if int(n_results) <= 0:
+            empty = [[] for _ in range(len(queries))]
+            return {
+                "ids": empty,
+                "documents": empty if "documents" in include else None,
+                "metadatas": empty if "metadatas" in include else None,
+                "distances": empty if "distances" in include else None,
+                "embeddings": [None for _ in range(len(queries))] if "embeddings" in include else None,
+            }
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        indexed, rest = _split_indexed(where)
+        with self._lock:
+            segments: List[Tuple[str, np.ndarray]] = []
+            blocks: List[np.ndarray] = []
+            for name in self._candidate_shards(where):
+                shard = self._shards[name]
+                if not shard.count:
+                    continue
+                if shard.dim != queries.shape[1]:
+                    raise ValueError(
+                        f"Query dimension {queries.shape[1]} does not match collection dimension {shard.dim}"
+                    )
+                # Every row of a user's shard has that user_id; no need to mask on it.
+                clauses = [
+                    (key, value)
+                    for key, value in indexed
+                    if not (key == "user_id" and value and _shard_name(str(value)) == name)
+                ]
+                rows = np.flatnonzero(shard.mask_for(clauses))
+                if rest and len(rows):
+                    matching = (_matches(shard.metadatas[row], rest) for row in rows)
+                    rows = rows[np.fromiter(matching, dtype=bool, count=len(rows))]
+                if not len(rows):
+                    continue
+                matrix, norms = shard.working_set()
+                if len(rows) < shard.slots:
+                    matrix, norms = matrix[rows], norms[rows]
+                blocks.append(norms[:, None] + query_norms[None, :] - 2.0 * (matrix @ queries.T))
+                segments.append((name, rows))
+
+            result: Dict[str, list] = {key: [] for key in ("ids", "documents", "metadatas", "distances", "embeddings")}
+            all_distances = np.vstack(blocks) if blocks else np.zeros((0, len(queries)), dtype=np.float32)
+            starts = np.cumsum([0] + [len(rows) for _, rows in segments])
+            total = int(starts[-1])
+            take = min(int(n_results), total)
+            if 0 < take < total:
+                candidates = np.argpartition(all_distances, take - 1, axis=0)[:take]
+            else:
+                candidates = np.tile(np.arange(total)[:, None], (1, len(queries)))
+            for column in range(len(queries)):
+                scores = all_distances[:, column]
+                top = candidates[:, column]
+                top = top[np.argsort(scores[top], kind="stable")]
+                picked = []
+                for idx in top.tolist():
+                    segment = int(np.searchsorted(starts, idx, side="right")) - 1
+                    name, rows = segments[segment]
+                    picked.append((self._shards[name], int(rows[idx - starts[segment]])))
+                result["ids"].append([shard.ids[row] for shard, row in picked])
+                result["distances"].append([max(0.0, float(scores[idx])) for idx in top])
+                result["documents"].append([shard.documents[row] for shard, row in picked])
+                result["metadatas"].append([dict(shard.metadatas[row]) for shard, row in picked])
+                result["embeddings"].append(
+                    np.vstack([shard.working_set()[0][row] for shard, row in picked])
+                    if picked and "embeddings" in include
+                    else None
+                )
+            for key in ("documents", "metadatas", "distances", "embeddings"):
+                if key not in include:
+                    result[key] = None
+            return result
+
+
+class StoreInUseError(RuntimeError):
+    """Another process holds the npy store lock."""
+
+    def __init__(self, path: Path, pid: Optional[int]) -> None:
+        self.path = path
+        self.pid = pid
+        owner = f"PID {pid}" if pid else "another process"
+        super().__init__(
+            f"The npy vector store at {path} is in use by {owner}; "
+            "stop that process first or use VECTOR_STORE=chroma"
+        )
+
+
+# Store directories this process holds the lock for, and the open lock files.
+_held_locks: Dict[str, object] = {}
+_held_locks_guard = threading.Lock()
+
+
+def _lock_owner(lock_path: Path) -> Optional[int]:
+    try:
+        return int(lock_path.read_text(encoding="utf-8").strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+
+def _lock_store(path: Path) -> None:
+    """Take an exclusive lock on a store directory for the rest of this process.
+
+    The npy store keeps its index in memory, so a second process could not see
+    (and would overwrite) the first one's writes; locking only around writes
+    would not help. The holder's PID is written into the lock file so a second
+    process fails with a StoreInUseError naming it. Opening the store again in
+    the same process is allowed.
+    """
+    key = str(path.resolve())
+    with _held_locks_guard:
+        if key in _held_locks:
+            return
+        lock_path = path / "store.lock"
+        handle = open(lock_path, "a+b")
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            raise StoreInUseError(path, _lock_owner(lock_path)) from None
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()).encode("ascii"))
+        handle.flush()
+        _held_locks[key] = handle
+
+
+class NpyVectorStore:
+    name = "npy"
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or NPY_DIR
+        self.path.mkdir(parents=True, exist_ok=True)
+        _lock_store(self.path)
+        self._lock = threading.Lock()
+        self._collections: Dict[str, NpyCollection] = {}
+
+    def get_or_create_collection(self, name: str) -> NpyCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = NpyCollection(self.path / name)
+            return self._collections[name]
+
+    def list_collection_names(self) -> List[str]:
+        return sorted(path.name for path in self.path.iterdir() if path.is_dir())
+
+
+def open_vector_store(name: str | None = None, path: Path | None = None) -> VectorStore:
+    """Open the configured store (VECTOR_STORE)."""
+    name = (name or get_vector_store()).strip().lower()
+    if name not in STORE_NAMES:
+        raise ValueError(f"Unknown vector store '{name}'. Use one of: {', '.join(STORE_NAMES)}")
+    started = time.perf_counter()
+    store: VectorStore = NpyVectorStore(path) if name == "npy" else ChromaVectorStore(path)
+    print(f"[Vector Store] Opened {store.name} store in {time.perf_counter() - started:.2f}s")
+    return store
+
+
+def copy_collection(source, target, page_size: int = 500) -> int:
+    """Copy every record (ids, vectors, documents, metadata) from one collection to another."""
+    copied = 0
+    offset = 0
+    while True:
+        batch = source.get(include=["documents", "embeddings", "metadatas"], limit=page_size, offset=offset)
+        ids = batch.get("ids") or []
+        if not ids:
+            break
+        target.upsert(
+            ids=ids,
+            embeddings=np.asarray(batch["embeddings"], dtype=np.float32),
+            metadatas=[metadata or {} for metadata in batch["metadatas"]],
+            documents=[str(document) for document in batch["documents"]],
+        )
+        copied += len(ids)
+        offset += len(ids)
+    return copied
+
+
+def _random_unit(rows: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    matrix = rng.standard_normal((rows, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def benchmark(
+    names: Sequence[str],
+    memories: int = 20000,
+    dim: int = 768,
+    users: int = 1,
+    queries: int = 200,
+    k: int = 10,
+) -> List[Dict[str, object]]:
+    """Write, reopen and query latency, plus recall@k vs exact search, for each store.
+
+    Queries carry the same user_id + kind filter the memory engine sends.
+    """
+    rng = np.random.default_rng(0)
+    corpus = _random_unit(memories, dim, rng)
+    # Queries near stored memories, like a follow-up about something on record.
+    picks = rng.integers(0, memories, size=queries)
+    probes = corpus[picks] + 0.3 * _random_unit(queries, dim, rng)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    owners = [f"user{idx % users}" for idx in range(memories)]
+    ids = [f"m{idx}" for idx in range(memories)]
+    target_user = owners[0]
+    kinds = ["fact" if (idx // users) % 3 else "daily_summary" for idx in range(memories)]
+    target_where = {"$and": [{"user_id": target_user}, {"kind": "fact"}]}
+    target_rows = np.asarray(
+        [idx for idx, owner in enumerate(owners) if owner == target_user and kinds[idx] == "fact"]
+    )
+    exact = np.argsort(-(probes @ corpus[target_rows].T), axis=1)[:, :k]
+    exact_ids = [{ids[target_rows[idx]] for idx in row} for row in exact.tolist()]
+
+    results: List[Dict[str, object]] = []
+    for name in names:
+        root = Path(os.environ.get("TMPDIR", "/tmp")) / f"vector_store_bench_{name}_{os.getpid()}"
+        shutil.rmtree(root, ignore_errors=True)
+        try:
+            store = open_vector_store(name, root)
+            collection = store.get_or_create_collection("memories")
+            started = time.perf_counter()
+            for start in range(0, memories, 1000):
+                end = min(start + 1000, memories)
+                collection.add(
+                    ids=ids[start:end],
+                    embeddings=corpus[start:end],
+                    metadatas=[{"user_id": owners[i], "kind": kinds[i]} for i in range(start, end)],
+                    documents=[f"memory {i}" for i in range(start, end)],
+                )
+            write_seconds = time.perf_counter() - started
+            del collection, store
+
+            started = time.perf_counter()
+            store = open_vector_store(name, root)
+            collection = store.get_or_create_collection("memories")
+            collection.query(query_embeddings=[probes[0]], n_results=k, where=target_where)
+            open_seconds = time.perf_counter() - started
+
+            latencies = []
+            hits = 0
+            for row, probe in enumerate(probes):
+                started = time.perf_counter()
+                found = collection.query(
+                    query_embeddings=[probe], n_results=k, where=target_where, include=["distances"]
+                )
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(set(found["ids"][0]) & exact_ids[row])
+            results.append(
+                {
+                    "store": name,
+                    "write_s": round(write_seconds, 2),
+                    "open_first_query_s": round(open_seconds, 3),
+                    "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                    "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                    "recall_at_k": round(hits / (len(probes) * k), 3),
+                }
+            )
+            del collection, store
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vector store tools")
+    parser.add_argument("--benchmark", action="store_true", help="Compare stores on synthetic memories")
+    parser.add_argument("--stores", default=",".join(STORE_NAMES), help="Comma-separated stores to compare")
+    parser.add_argument("--memories", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--users", type=int, default=1, help="Spread the memories over this many users")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--import-chroma",
+        action="store_true",
+        help="Copy every collection from data/chroma into the npy store",
+    )
+    args = parser.parse_args()
+
+    if args.import_chroma:
+        source_store = ChromaVectorStore()
+        try:
+            target_store = NpyVectorStore()
+        except StoreInUseError as e:
+            raise SystemExit(f"[Vector Store] {e}")
+        for collection_name in source_store.list_collection_names():
+            count = copy_collection(
+                source_store.get_or_create_collection(collection_name),
+                target_store.get_or_create_collection(collection_name),
+            )
+            print(f"  {collection_name}: {count} records")
+        raise SystemExit(0)
+
+    if not args.benchmark:
+        parser.print_help()
+        raise SystemExit(0)
+
+    names = [name.strip() for name in args.stores.split(",") if name.strip()]
+    print(f"{args.memories} memories x {args.dim}d over {args.users} user(s), {args.queries} queries, k={args.k}")
+    for row in benchmark(names, args.memories, args.dim, args.users, args.queries, args.k):
+        print("  " + ", ".join(f"{key}={value}" for key, value in row.items()))
@@ -0,0 +1,127 @@
+"""Webhook ingestion for Telegram bots.
+
+Serves a small FastAPI app (same uvicorn stack as senses_service) that accepts
+Telegram webhook POSTs and pushes them straight onto each Application's
+update_queue, so updates arrive as soon as Telegram sends them instead of
+waiting on a long-poll round trip.
+"""
+from __future__ import annotations
+
+import hmac
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from telegram import Update
+from telegram.ext import Application
+
+
+WEBHOOK_PATH_PREFIX = "/telegram"
+
+
+def webhook_key(bot_name: str) -> str:
+    """URL-safe key used in the webhook path for a bot."""
+    return "".join(ch for ch in bot_name.strip().lower() if ch.isalnum() or ch in "-_") or "pebble"
+
+
+def webhook_path(bot_name: str) -> str:
+    return f"{WEBHOOK_PATH_PREFIX}/{webhook_key(bot_name)}"
+
+
+def create_webhook_app(applications: Dict[str, Application], secret: str = "") -> FastAPI:
+    """Build the FastAPI app routing /telegram/<bot> to the matching Application.
+
+    Args:
+        applications: Mapping of bot name -> initialized telegram Application.
+        secret: If set, requests must carry it in X-Telegram-Bot-Api-Secret-Token.
+    """
+    routes = {webhook_key(name): application for name, application in applications.items()}
+    api = FastAPI(title="Pebble Telegram Webhook", version="1.0.0")
+
+    @api.get("/")
+    async def root() -> dict:
+        return {
+            "service": "pebble-webhook",
+            "bots": sorted(routes),
+            "queued": {key: app.update_queue.qsize() for key, app in routes.items()},
+        }
+
+    @api.post(WEBHOOK_PATH_PREFIX + "/{bot_key}")
+    async def receive_update(bot_key: str, request: Request) -> dict:
+        application = routes.get(bot_key)
+        if application is None:
+            raise HTTPException(status_code=404, detail="unknown bot")
+
+        if secret:
+            provided = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(provided, secret):
+                raise HTTPException(status_code=403, detail="bad secret token")
+
+        try:
+            payload = await request.json()
+        except Exception:
+            raise HTTPException(status_code=400, detail="invalid JSON")
+
+        # Anything else would make de_json raise, and a 5xx makes Telegram retry forever.
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=400, detail="update must be a JSON object")
+        try:
+            update = Update.de_json(payload, application.bot)
+        except Exception:
+            raise HTTPException(status_code=400, detail="malformed update")
+        if update is None:
+            raise HTTPException(status_code=400, detail="empty update")
+
+        # Hand off immediately; the Application processes it on its own workers.
+        await application.update_queue.put(update)
+        return {"ok": True}
+
+    return api
+
+
+async def register_webhook(
+    application: Application,
+    bot_name: str,
+    public_url: str,
+    secret: str = "",
+    max_connections: int = 40,
+) -> Optional[str]:
+    """Point Telegram at our endpoint. Returns the registered URL, or None if skipped."""
+    if not public_url:
+        print(
+            f"[Webhook] TELEGRAM_WEBHOOK_URL not set — not calling setWebhook for {bot_name}. "
+            "Register it yourself or rely on a proxy/fake server."
+        )
+        return None
+
+    url = public_url.rstrip("/") + webhook_path(bot_name)
+    await application.bot.set_webhook(
+        url=url,
+        secret_token=secret or None,
+        max_connections=max_connections,
+        allowed_updates=Update.ALL_TYPES,
+    )
+    print(f"[Webhook] Registered {bot_name} -> {url}")
+    return url
+
+
+def build_webhook_server(
+    applications: Dict[str, Application],
+    host: str = "127.0.0.1",
+    port: int = 8443,
+    secret: str = "",
+    max_connections: int = 40,
+) -> uvicorn.Server:
+    """Create (but don't start) a uvicorn server for the webhook app.
+
+    Start it with ``asyncio.create_task(server.serve())`` inside the bot's loop and
+    stop it with ``server.should_exit = True``.
+    """
+    config = uvicorn.Config(
+        create_webhook_app(applications, secret=secret),
+        host=host,
+        port=port,
+        limit_concurrency=max(1, max_connections),
+        log_level="warning",
+    )
+    return uvicorn.Server(config)